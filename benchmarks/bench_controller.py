@@ -0,0 +1,330 @@
+"""Microbenchmarks for the parsing and diffing hot paths.
+
+Generates synthetic IngressRoute and Ingress objects and times host
+extraction, rule parsing, routing object processing, list response
+decoding, monitor file loading and full listings through handle_changes
+against a fake Uptime Kuma client. Results are printed as JSON, and can be
+compared against a previous run with --compare.
+
+    poetry run python -m benchmarks.bench_controller --scales 1000,10000 --output bench.json
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from unittest.mock import MagicMock, patch
+
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.rules import RuleParser
+from kuma_ingress_watcher.workers import WorkQueue
+
+DEFAULT_SCALES = (1000, 10000, 100000)
+KINDS = ("IngressRoute", "Ingress")
+
+
+class FakeKuma:
+    """In-memory Uptime Kuma client counting the calls it receives."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.monitors = {}
+        self.next_id = 1
+
+    def get_monitors(self):
+        self.calls["get_monitors"] += 1
+        return [dict(monitor) for monitor in self.monitors.values()]
+
+    def add_monitor(self, name, **fields):
+        self.calls["add_monitor"] += 1
+        monitor_id = self.next_id
+        self.next_id += 1
+        self.monitors[monitor_id] = dict(fields, id=monitor_id, name=name)
+        return {"monitorID": monitor_id}
+
+    def edit_monitor(self, monitor_id, **fields):
+        self.calls["edit_monitor"] += 1
+        self.monitors[monitor_id].update(fields)
+
+    def delete_monitor(self, monitor_id):
+        self.calls["delete_monitor"] += 1
+        self.monitors.pop(monitor_id, None)
+
+
+def make_item(kind, index, generation=0):
+    namespace = f"team-{index % 50}"
+    name = f"app-{index}"
+    hosts = [f"{name}.{namespace}.example.com", f"www.{name}.{namespace}.example.com"]
+    annotations = {
+        "uptime-kuma.autodiscovery.probe.interval": str(60 + generation),
+        "uptime-kuma.autodiscovery.probe.path": "/healthz",
+        "kubectl.kubernetes.io/last-applied-configuration": "{}" * 64,
+    }
+    if kind == "IngressRoute":
+        spec = {"routes": [{"match": f"Host(`{host}`) && PathPrefix(`/`)", "kind": "Rule"} for host in hosts]}
+    else:
+        backend = {"service": {"name": name, "port": {"number": 80}}}
+        paths = [{"path": "/", "pathType": "Prefix", "backend": backend}]
+        spec = {"rules": [{"host": host, "http": {"paths": paths}} for host in hosts]}
+    return {
+        "metadata": {"name": name, "namespace": namespace, "uid": f"uid-{index}", "annotations": annotations},
+        "spec": spec,
+    }
+
+
+def make_items(kind, scale, generation=0, changed=1.0):
+    """Items of ``kind``; only a ``changed`` fraction of them get ``generation``."""
+    step = max(1, round(1 / changed)) if changed else 0
+    return [
+        make_item(kind, index, generation if step and index % step == 0 else 0)
+        for index in range(scale)
+    ]
+
+
+def make_pages(items, page_size):
+    pages = []
+    for start in range(0, len(items), page_size):
+        last = start + page_size >= len(items)
+        metadata = {"resourceVersion": "1", "continue": None if last else "token"}
+        pages.append({"metadata": metadata, "items": items[start:start + page_size]})
+    return pages
+
+
+def measure(run, calls):
+    """Time ``run()`` and, in a second pass, its peak traced memory."""
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls": calls,
+        "total_seconds": round(elapsed, 6),
+        "latency_us": round(elapsed / calls * 1e6, 3) if calls else None,
+        "throughput_per_s": round(calls / elapsed, 1) if elapsed else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_extract_hosts_from_match(kind, scale):
+    matches = [
+        route["match"]
+        for item in make_items("IngressRoute", scale)
+        for route in item["spec"]["routes"]
+    ]
+    return measure(lambda: [controller.extract_hosts_from_match(match) for match in matches], len(matches))
+
+
+def make_rules(scale):
+    """Traefik rules mixing v2 and v3 syntax, as seen across routes."""
+    templates = (
+        "Host(`{host}`)",
+        "Host(`{host}`) && PathPrefix(`/api`)",
+        "Host(`{host}`, `www.{host}`) && (PathPrefix(`/`) || Path(`/healthz`))",
+        "HostRegexp(`^{host}$`) && !PathPrefix(`/internal`) && Headers(`X-Env`, `prod`)",
+        "(Host(`{host}`) || Host(\"alt.{host}\")) && Method(`GET`, `POST`)",
+    )
+    return [templates[index % len(templates)].format(host=f"app-{index}.example.com") for index in range(scale)]
+
+
+def bench_parse_rule(kind, scale):
+    """Rules parsed from scratch, then served from the cache as on a relist."""
+    rules = make_rules(scale)
+    parser = RuleParser(cache_size=scale)
+
+    def cold():
+        parser.cache_clear()
+        for rule in rules:
+            parser.parse(rule)
+
+    return {
+        "cold": measure(cold, scale),
+        "warm": measure(lambda: [parser.parse(rule) for rule in rules], scale),
+    }
+
+
+def bench_monitor_file(kind, scale):
+    """Loading a monitor file of ``scale`` entries, up to the reconcile."""
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml") as file:
+        for index in range(scale):
+            file.write(
+                f"- name: static-{index}\n"
+                f"  url: https://static-{index}.example.com/healthz\n"
+                f"  interval: 60\n"
+                f"  headers: {{X-Probe: kuma}}\n"
+                f"  accepted-statuscodes: ['200-299']\n"
+            )
+        file.flush()
+
+        def load():
+            controller.reset_desired_monitors()
+            controller.process_monitor_file(file.name)
+
+        with patch("kuma_ingress_watcher.controller.reconcile"):
+            return measure(load, scale)
+
+
+def bench_process_routing_object(kind, scale):
+    items = make_items(kind, scale)
+    return measure(lambda: [controller.process_routing_object(item, kind) for item in items], len(items))
+
+
+def bench_parse_routing_object(kind, scale):
+    items = make_items(kind, scale)
+    return measure(lambda: [controller.parse_routing_object(item, kind) for item in items], len(items))
+
+
+def bench_process_routes(kind, scale):
+    routing_objects = [controller.parse_routing_object(item, kind) for item in make_items(kind, scale)]
+    return measure(lambda: [controller.process_routes(routing_object) for routing_object in routing_objects], len(routing_objects))
+
+
+def bench_list_page(kind, scale, page_size=500):
+    """Decoding and projecting raw list responses, as get_ingress and get_ingressroutes do."""
+    responses = []
+    for page in make_pages(make_items(kind, scale), page_size):
+        response = MagicMock()
+        response.data = json.dumps(page).encode()
+        responses.append(response)
+    return measure(
+        lambda: [controller.project_page(kind, controller.read_json_response(response)) for response in responses],
+        scale,
+    )
+
+
+def bench_handle_changes(kind, scale, page_size=500):
+    """Cold sync, unchanged resync and a resync with 10% of the objects changed."""
+    listings = {
+        "initial": make_pages(make_items(kind, scale), page_size),
+        "unchanged": make_pages(make_items(kind, scale), page_size),
+        "changed_10pct": make_pages(make_items(kind, scale, generation=1, changed=0.1), page_size),
+    }
+    results = {}
+    for phase, pages in listings.items():
+        kuma = FakeKuma()
+        queue = WorkQueue(controller.sync_monitor, workers=controller.KUMA_WRITE_WORKERS, name="bench-kuma-write")
+        timings = []
+        calls = Counter()
+
+        def run():
+            # Each pass starts from the state the phase expects.
+            kuma.monitors.clear()
+            controller.reset_desired_monitors()
+            controller.invalidate_monitor_index()
+            store = controller.new_object_store()
+            with patch.object(controller, "object_store", store):
+                if phase != "initial":
+                    controller.handle_changes(listings["initial"], kind)
+                    queue.join()
+                kuma.calls.clear()
+                start = time.perf_counter()
+                controller.handle_changes(pages, kind)
+                queue.join()
+                timings.append(time.perf_counter() - start)
+                calls.update(kuma.calls)
+
+        with patch.object(controller, "kuma", kuma), patch.object(controller, "kuma_work_queue", queue):
+            result = measure(run, scale)
+        queue.shutdown()
+
+        # measure() ran the phase twice; report the untraced pass only.
+        result["total_seconds"] = round(timings[0], 6)
+        result["latency_us"] = round(timings[0] / scale * 1e6, 3)
+        result["throughput_per_s"] = round(scale / timings[0], 1)
+        result["kuma_calls"] = {name: count // 2 for name, count in sorted(calls.items())}
+        results[phase] = result
+    return results
+
+
+# Benchmarks returning one result per phase.
+PHASED_BENCHMARKS = {"parse_rule", "handle_changes"}
+BENCHMARKS = {
+    "extract_hosts_from_match": (bench_extract_hosts_from_match, ("IngressRoute",)),
+    "parse_rule": (bench_parse_rule, ("IngressRoute",)),
+    "process_routing_object": (bench_process_routing_object, KINDS),
+    "parse_routing_object": (bench_parse_routing_object, KINDS),
+    "process_routes": (bench_process_routes, KINDS),
+    "list_page": (bench_list_page, KINDS),
+    "handle_changes": (bench_handle_changes, KINDS),
+    "monitor_file": (bench_monitor_file, ("File",)),
+}
+
+
+def run_benchmarks(scales, selected=None):
+    results = []
+    for name, (bench, kinds) in BENCHMARKS.items():
+        if selected and name not in selected:
+            continue
+        for kind in kinds:
+            for scale in scales:
+                print(f"Running {name} {kind} x{scale}", file=sys.stderr)
+                outcome = bench(kind, scale)
+                phases = outcome.items() if name in PHASED_BENCHMARKS else [(None, outcome)]
+                for phase, result in phases:
+                    entry = {"benchmark": name if phase is None else f"{name}[{phase}]", "kind": kind, "scale": scale}
+                    entry.setdefault("kuma_calls", {})
+                    entry.update(result)
+                    results.append(entry)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the latency change against ``baseline``; return the regressions."""
+    previous = {(entry["benchmark"], entry["kind"], entry["scale"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        old = previous.get((entry["benchmark"], entry["kind"], entry["scale"]))
+        if not old or not old.get("latency_us") or not entry.get("latency_us"):
+            continue
+        ratio = entry["latency_us"] / old["latency_us"]
+        print(f"{entry['benchmark']:<36} {entry['kind']:<13} {entry['scale']:>7} {ratio:6.2f}x", file=sys.stderr)
+        if ratio > 1 + threshold:
+            regressions.append(entry)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="comma separated object counts")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run only this benchmark (repeatable)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare latencies against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="latency increase counted as a regression (default 0.2)")
+    args = parser.parse_args(argv)
+
+    # Per-object info logs would dominate the timings.
+    logging.disable(logging.INFO)
+    scales = [int(scale) for scale in args.scales.split(",") if scale]
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": run_benchmarks(scales, args.only),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report["results"], json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Stand-in Kubernetes API server for load tests.
+
+Serves paginated list and watch requests for Ingresses and Traefik
+IngressRoutes from an in-memory store. Scenarios mutate the store directly
+through create, update and delete; every change gets a resourceVersion and
+is streamed to open watches.
+"""
+import bisect
+import copy
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RESOURCES = {
+    "networking.k8s.io/v1/ingresses": "Ingress",
+    "traefik.io/v1alpha1/ingressroutes": "IngressRoute",
+    "traefik.containo.us/v1alpha1/ingressroutes": "IngressRoute",
+}
+PATH_PATTERN = re.compile(r"^/apis/(?P<group_version>[^/]+/[^/]+)(?:/namespaces/(?P<namespace>[^/]+))?/(?P<plural>[^/]+)$")
+
+
+class FakeKubernetesServer:
+    """In-memory Kubernetes API for Ingress and IngressRoute list/watch,
+    cluster-wide or per namespace. Label and field selectors are ignored.
+
+    ``event_window`` is how many changes are kept for watches; resuming
+    from an older resourceVersion gets a 410 Gone, like an etcd compaction.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, event_window=100000):
+        self.event_window = event_window
+        self.requests = {"list": 0, "watch": 0}
+        self._objects = {}
+        self._events = []
+        self._resource_version = 1
+        self._uid = 0
+        self._condition = threading.Condition()
+        self._stopped = False
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-kubernetes", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def write_kubeconfig(self, path):
+        kubeconfig = {
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": "fake", "cluster": {"server": self.url}}],
+            "users": [{"name": "fake", "user": {"token": "fake-token"}}],
+            "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake"}}],
+            "current-context": "fake",
+        }
+        with open(path, "w") as f:
+            json.dump(kubeconfig, f)
+        return path
+
+    # Store
+
+    def objects(self, kind=None):
+        with self._condition:
+            return [copy.deepcopy(obj) for (k, _, _), obj in self._objects.items() if kind is None or k == kind]
+
+    def create(self, kind, obj):
+        metadata = obj["metadata"]
+        with self._condition:
+            self._uid += 1
+            metadata.setdefault("uid", f"uid-{self._uid}")
+            self._write("ADDED", kind, obj)
+
+    def update(self, kind, obj):
+        with self._condition:
+            self._write("MODIFIED", kind, obj)
+
+    def delete(self, kind, namespace, name):
+        with self._condition:
+            obj = self._objects.get((kind, namespace, name))
+            if obj is not None:
+                self._write("DELETED", kind, obj)
+
+    def delete_namespace(self, namespace):
+        with self._condition:
+            for key in [key for key in self._objects if key[1] == namespace]:
+                self._write("DELETED", key[0], self._objects[key])
+
+    def _write(self, event_type, kind, obj):
+        self._resource_version += 1
+        obj = copy.deepcopy(obj)
+        obj["metadata"]["resourceVersion"] = str(self._resource_version)
+        key = (kind, obj["metadata"]["namespace"], obj["metadata"]["name"])
+        if event_type == "DELETED":
+            self._objects.pop(key, None)
+        else:
+            self._objects[key] = obj
+        self._events.append((self._resource_version, kind, event_type, obj))
+        if len(self._events) > self.event_window:
+            del self._events[: len(self._events) - self.event_window]
+        self._condition.notify_all()
+
+    # API
+
+    def _list(self, kind, api_version, namespace, query):
+        limit = int(query.get("limit", 0) or 0)
+        start = int(query.get("continue") or 0)
+        with self._condition:
+            items = [obj for (k, ns, _), obj in sorted(self._objects.items()) if k == kind and namespace in (None, ns)]
+            resource_version = str(self._resource_version)
+        end = start + limit if limit else len(items)
+        return {
+            "apiVersion": api_version,
+            "kind": f"{kind}List",
+            "metadata": {
+                "resourceVersion": resource_version,
+                "continue": str(end) if end < len(items) else None,
+            },
+            "items": [dict(obj, apiVersion=api_version, kind=kind) for obj in items[start:end]],
+        }
+
+    def _watch(self, kind, api_version, namespace, query, write):
+        resource_version = int(query.get("resourceVersion") or 0)
+        deadline = time.monotonic() + int(query.get("timeoutSeconds") or 300)
+        while True:
+            with self._condition:
+                if self._events and resource_version < self._events[0][0] - 1:
+                    write({"type": "ERROR", "object": {"kind": "Status", "code": 410, "reason": "Expired", "message": "too old resource version"}})
+                    return
+                start = bisect.bisect_right(self._events, resource_version, key=lambda event: event[0])
+                pending = [
+                    event for event in self._events[start:]
+                    if event[1] == kind and namespace in (None, event[3]["metadata"]["namespace"])
+                ]
+                if start == len(self._events):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stopped:
+                        return
+                    self._condition.wait(min(remaining, 1))
+                    continue
+                resource_version = self._events[-1][0]
+            for _, _, event_type, obj in pending:
+                write({"type": event_type, "object": dict(obj, apiVersion=api_version, kind=kind)})
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Watch events are sent as HTTP/1.1 chunks so clients see them as they happen.
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                match = PATH_PATTERN.match(url.path)
+                kind = match and RESOURCES.get(f"{match['group_version']}/{match['plural']}")
+                if kind is None:
+                    self.send_error(404)
+                    return
+                resource = (kind, match["group_version"], match["namespace"])
+
+                if query.get("watch") in ("true", "1", "True"):
+                    server.requests["watch"] += 1
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+
+                    def write(event):
+                        line = json.dumps(event).encode() + b"\n"
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                        self.wfile.flush()
+
+                    try:
+                        server._watch(*resource, query, write)
+                        self.wfile.write(b"0\r\n\r\n")
+                    except (BrokenPipeError, ConnectionResetError):
+                        self.close_connection = True
+                    return
+
+                server.requests["list"] += 1
+                body = json.dumps(server._list(*resource, query)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
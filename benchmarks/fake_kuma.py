@@ -0,0 +1,163 @@
+"""Stand-in Uptime Kuma socket.io server for load tests.
+
+Implements the handful of events the controller uses (login, loginByToken,
+getSettings, add, getMonitor, editMonitor, deleteMonitor and the
+monitorList push), keeps monitors in memory and counts every call. Latency
+and failures can be injected per event, and ``drop_sessions`` disconnects
+every client and forgets their logins, as a restart would.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import socketio
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeKumaServer:
+    """Uptime Kuma over socket.io long-polling, served from a background thread.
+
+    ``latency`` is a delay in seconds added to every call and ``failure_rate``
+    the probability a write (add, editMonitor, deleteMonitor) is rejected.
+    """
+
+    VERSION = "1.23.16"
+    WRITE_EVENTS = ("add", "editMonitor", "deleteMonitor")
+    LOGIN_EVENTS = ("login", "loginByToken")
+    TOKEN = "fake-token"
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = Counter()
+        self.failures = Counter()
+        self.monitors = {}
+        self.sessions = set()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+        # Upgrades need a WSGI server exposing the raw socket; polling is enough here.
+        self.sio = socketio.Server(async_mode="threading", allow_upgrades=False)
+        self.sio.on("connect", self._connect)
+        for event, handler in (
+            ("login", self._login),
+            ("loginByToken", self._login_by_token),
+            ("getSettings", self._get_settings),
+            ("add", self._add),
+            ("getMonitor", self._get_monitor),
+            ("editMonitor", self._edit_monitor),
+            ("deleteMonitor", self._delete_monitor),
+        ):
+            self.sio.on(event, self._wrap(event, handler))
+
+        self._server = make_server(host, port, socketio.WSGIApp(self.sio), ThreadingWSGIServer, QuietHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-kuma", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_sessions(self):
+        """Disconnect every client and forget who logged in."""
+        with self._lock:
+            sids, self.sessions = list(self.sessions), set()
+        for sid in sids:
+            self.sio.disconnect(sid)
+
+    def snapshot(self):
+        """Monitors by name, as (url, interval) pairs."""
+        with self._lock:
+            return {monitor["name"]: (monitor.get("url"), monitor.get("interval")) for monitor in self.monitors.values()}
+
+    def _wrap(self, event, handler):
+        def on_event(sid, data=None):
+            with self._lock:
+                self.calls[event] += 1
+            if self.latency:
+                time.sleep(self.latency)
+            if event not in self.LOGIN_EVENTS and sid not in self.sessions:
+                return {"ok": False, "msg": "You are not logged in."}
+            if event in self.WRITE_EVENTS and self.failure_rate and self._random.random() < self.failure_rate:
+                with self._lock:
+                    self.failures[event] += 1
+                return {"ok": False, "msg": "Injected failure"}
+            return handler(sid, data)
+        return on_event
+
+    def _monitor_list(self):
+        with self._lock:
+            return {str(monitor_id): dict(monitor) for monitor_id, monitor in self.monitors.items()}
+
+    def _broadcast_monitor_list(self, sid=None):
+        self.sio.emit("monitorList", self._monitor_list(), to=sid)
+
+    def _connect(self, sid, environ):
+        self.sio.emit("info", {"version": self.VERSION, "latestVersion": self.VERSION, "primaryBaseURL": None}, to=sid)
+
+    def _login(self, sid, data):
+        with self._lock:
+            self.sessions.add(sid)
+        self._broadcast_monitor_list(sid)
+        return {"ok": True, "token": self.TOKEN}
+
+    def _login_by_token(self, sid, token):
+        if token != self.TOKEN:
+            return {"ok": False, "msg": "Invalid token"}
+        with self._lock:
+            self.sessions.add(sid)
+        self._broadcast_monitor_list(sid)
+        return {"ok": True}
+
+    def _get_settings(self, sid, data):
+        return {"ok": True, "data": {}}
+
+    def _add(self, sid, data):
+        with self._lock:
+            monitor_id = self._next_id
+            self._next_id += 1
+            self.monitors[monitor_id] = dict(data, id=monitor_id, active=1)
+        self._broadcast_monitor_list()
+        return {"ok": True, "msg": "Added Successfully.", "monitorID": monitor_id}
+
+    def _get_monitor(self, sid, monitor_id):
+        with self._lock:
+            monitor = self.monitors.get(monitor_id)
+        if monitor is None:
+            return {"ok": False, "msg": "Monitor not found"}
+        return {"ok": True, "monitor": dict(monitor)}
+
+    def _edit_monitor(self, sid, data):
+        with self._lock:
+            if data["id"] not in self.monitors:
+                return {"ok": False, "msg": "Monitor not found"}
+            self.monitors[data["id"]].update(data)
+        self._broadcast_monitor_list()
+        return {"ok": True, "msg": "Saved.", "monitorID": data["id"]}
+
+    def _delete_monitor(self, sid, monitor_id):
+        with self._lock:
+            if self.monitors.pop(monitor_id, None) is None:
+                return {"ok": False, "msg": "Monitor not found"}
+        self._broadcast_monitor_list()
+        return {"ok": True, "msg": "Deleted Successfully."}
@@ -0,0 +1,268 @@
+"""End-to-end load harness against a fake Kubernetes API and a fake Uptime Kuma.
+
+Starts both stand-in servers, runs the controller (``main()``) in a
+subprocess pointed at them, and drives scripted churn through the fake
+Kubernetes store. After each phase it waits until the monitors in the fake
+Uptime Kuma match what the routing objects describe, and reports the time
+to convergence, the Kuma calls issued and the controller's CPU time and RSS
+as JSON.
+
+    poetry run python -m benchmarks.load_harness --objects 2000 --kuma-latency 0.005 --output load.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.bench_controller import make_item
+from benchmarks.fake_kubernetes import FakeKubernetesServer
+from benchmarks.fake_kuma import FakeKumaServer
+from kuma_ingress_watcher.controller import process_routing_object, str_to_list
+
+KINDS = ("IngressRoute", "Ingress")
+PHASES = ("mass_create", "rolling_annotation_edit", "restart", "namespace_deletion")
+NAMESPACES = 50
+
+
+def expected_monitors(kubernetes, env):
+    """Monitors by name, as (url, interval), that the watched routing objects describe."""
+    allowed = str_to_list(env.get("WATCH_NAMESPACES"))
+    ignored = str_to_list(env.get("IGNORE_NAMESPACES"))
+    expected = {}
+    for kind in KINDS:
+        for obj in kubernetes.objects(kind):
+            namespace = obj["metadata"]["namespace"]
+            if (allowed and namespace not in allowed) or namespace in ignored:
+                continue
+            for name, monitor in process_routing_object(obj, kind).items():
+                if monitor is not None:
+                    expected[name] = (monitor.url, monitor.interval)
+    return expected
+
+
+def process_usage(pid):
+    """CPU seconds and current/peak RSS of ``pid`` from /proc, or None off Linux."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_bytes": int(status["VmRSS"].split()[0]) * 1024,
+        "peak_rss_bytes": int(status["VmHWM"].split()[0]) * 1024,
+    }
+
+
+def wait_until(predicate, timeout, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+def mass_create(kubernetes, controller, args):
+    for index in range(args.objects):
+        kubernetes.create(KINDS[index % len(KINDS)], make_item(KINDS[index % len(KINDS)], index))
+
+
+def rolling_annotation_edit(kubernetes, controller, args):
+    for batch_start in range(0, args.objects, args.batch_size):
+        for index in range(batch_start, min(batch_start + args.batch_size, args.objects)):
+            kubernetes.update(KINDS[index % len(KINDS)], make_item(KINDS[index % len(KINDS)], index, generation=1))
+        time.sleep(args.batch_interval)
+
+
+def namespace_deletion(kubernetes, controller, args):
+    for namespace in range(max(1, NAMESPACES * args.deleted_namespaces // 100)):
+        kubernetes.delete_namespace(f"team-{namespace}")
+
+
+def restart(kubernetes, controller, args):
+    controller.stop()
+    controller.start()
+
+
+def controller_env(kubernetes, kuma, kubeconfig, args):
+    env = dict(os.environ)
+    env.update(
+        UPTIME_KUMA_URL=kuma.url,
+        UPTIME_KUMA_USER="admin",
+        UPTIME_KUMA_PASSWORD="admin",
+        KUBECONFIG=kubeconfig,
+        KUBERNETES_SERVICE_HOST="",
+        WATCH_MODE=args.mode,
+        WATCH_INTERVAL=str(args.poll_interval),
+        WATCH_INGRESSROUTES="true",
+        WATCH_INGRESS="true",
+        USE_TRAEFIK_V3_CRD_GROUP="true",
+        LOG_LEVEL=args.log_level,
+    )
+    for setting in args.env:
+        key, _, value = setting.partition("=")
+        env[key] = value
+    return env
+
+
+class ControllerProcess:
+    """The controller running ``main()`` in a subprocess."""
+
+    def __init__(self, env, log, kubernetes, kuma, args):
+        self.env = env
+        self.log = log
+        self.kubernetes = kubernetes
+        self.kuma = kuma
+        self.args = args
+        self.process = None
+        self.startup_seconds = []
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def start(self):
+        verb = "watch" if self.args.mode == "watch" else "list"
+        logins = self.kuma.calls["login"]
+        requests = self.kubernetes.requests[verb]
+        started = time.monotonic()
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "kuma_ingress_watcher.controller"],
+            env=self.env,
+            stdout=self.log,
+            stderr=subprocess.STDOUT,
+        )
+        # Ready once it has logged in and has a watch (or a poll) open for both kinds.
+        ready = wait_until(
+            lambda: self.process.poll() is None and self.kuma.calls["login"] > logins and
+            self.kubernetes.requests[verb] >= requests + len(KINDS),
+            self.args.timeout,
+        )
+        self.startup_seconds.append(round(time.monotonic() - started, 3))
+        if not ready:
+            raise RuntimeError(f"Controller did not start, see {self.log.name}")
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def run(args):
+    kubernetes = FakeKubernetesServer().start()
+    kuma = FakeKumaServer(latency=args.kuma_latency, failure_rate=args.kuma_failure_rate, seed=args.seed).start()
+    workdir = tempfile.mkdtemp(prefix="kuma-load-")
+    kubeconfig = kubernetes.write_kubeconfig(os.path.join(workdir, "kubeconfig"))
+    log_path = os.path.join(workdir, "controller.log")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "controller_log": log_path,
+        "phases": [],
+    }
+
+    env = controller_env(kubernetes, kuma, kubeconfig, args)
+    env.setdefault("STATE_FILE", os.path.join(workdir, "state.json"))
+    with open(log_path, "w") as log:
+        controller = ControllerProcess(env, log, kubernetes, kuma, args)
+        try:
+            controller.start()
+            for phase in args.phases:
+                print(f"Running {phase} with {args.objects} objects", file=sys.stderr)
+                report["phases"].append(run_phase(phase, kubernetes, kuma, controller, args))
+        finally:
+            if controller.process:
+                controller.stop()
+            kubernetes.stop()
+            kuma.stop()
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    report["startup_seconds"] = controller.startup_seconds
+    report["controller"] = {
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_bytes": usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+    }
+    report["kuma_calls"] = dict(kuma.calls)
+    report["kuma_failures"] = dict(kuma.failures)
+    return report
+
+
+def run_phase(phase, kubernetes, kuma, controller, args):
+    calls_before = Counter(kuma.calls)
+    pid = controller.pid
+    usage_before = process_usage(pid)
+    started = time.monotonic()
+
+    globals()[phase](kubernetes, controller, args)
+    applied = time.monotonic()
+    expected = expected_monitors(kubernetes, controller.env)
+    converged = wait_until(lambda: kuma.snapshot() == expected, args.timeout)
+    finished = time.monotonic()
+
+    usage_after = process_usage(controller.pid)
+    if controller.pid != pid:
+        # Restarted: the new process used everything it reports.
+        usage_before = {"cpu_seconds": 0}
+    result = {
+        "phase": phase,
+        "converged": converged,
+        "monitors": len(expected),
+        "apply_seconds": round(applied - started, 3),
+        "convergence_seconds": round(finished - applied, 3),
+        "kuma_calls": dict(Counter(kuma.calls) - calls_before),
+    }
+    if not converged:
+        result["missing"] = len(expected.keys() - kuma.snapshot().keys())
+    if usage_before and usage_after:
+        result["controller_cpu_seconds"] = round(usage_after["cpu_seconds"] - usage_before["cpu_seconds"], 3)
+        result["controller_rss_bytes"] = usage_after["rss_bytes"]
+        result["controller_peak_rss_bytes"] = usage_after["peak_rss_bytes"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=1000, help="routing objects to create, split between Ingress and IngressRoute")
+    parser.add_argument("--phases", nargs="+", choices=PHASES, default=list(PHASES), help="phases to run, in order")
+    parser.add_argument("--mode", choices=("watch", "poll"), default="watch", help="controller WATCH_MODE")
+    parser.add_argument("--poll-interval", type=int, default=1, help="controller WATCH_INTERVAL in poll mode")
+    parser.add_argument("--batch-size", type=int, default=100, help="objects edited per batch in rolling_annotation_edit")
+    parser.add_argument("--batch-interval", type=float, default=0.1, help="pause between edit batches, in seconds")
+    parser.add_argument("--deleted-namespaces", type=int, default=10, help="percentage of the namespaces deleted")
+    parser.add_argument("--kuma-latency", type=float, default=0.0, help="delay added to every Uptime Kuma call, in seconds")
+    parser.add_argument("--kuma-failure-rate", type=float, default=0.0, help="probability an Uptime Kuma write fails")
+    parser.add_argument("--seed", type=int, default=0, help="seed for failure injection")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for each phase to converge")
+    parser.add_argument("--log-level", default="WARNING", help="controller LOG_LEVEL")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra controller environment variable")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    # The expected state is derived in-process; keep its logs quiet.
+    logging.disable(logging.INFO)
+    report = run(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0 if all(phase["converged"] for phase in report["phases"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
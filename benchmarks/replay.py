@@ -0,0 +1,158 @@
+"""Replay a recording of Kubernetes changes through the controller.
+
+Plays back a file written with RECORD_EVENTS_FILE: listings go through
+handle_changes and watch events through handle_event, and so through
+process_routing_object, against the in-memory Uptime Kuma client of the
+benchmarks. Changes are fed as fast as possible, or spaced out as they were
+recorded with --speed. The report gives per-change handling latency, the
+Uptime Kuma calls made and a digest of the resulting monitors, so two
+controller versions can be compared on the same input with --compare.
+
+    poetry run python -m benchmarks.replay events.jsonl.gz --output replay.json
+    poetry run python -m benchmarks.replay events.jsonl.gz --compare replay.json --profile replay.prof
+"""
+import argparse
+import cProfile
+import hashlib
+import json
+import logging
+import platform
+import resource
+import sys
+import time
+from collections import defaultdict
+from unittest.mock import patch
+
+from benchmarks.bench_controller import FakeKuma
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.recording import read_recording, replay
+from kuma_ingress_watcher.workers import WorkQueue
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def monitors_digest(kuma):
+    """Hash of the monitors Uptime Kuma ends up with, ignoring their ids."""
+    monitors = sorted(
+        (monitor["name"], sorted((key, str(value)) for key, value in monitor.items() if key != "id"))
+        for monitor in kuma.monitors.values()
+    )
+    return hashlib.sha256(json.dumps(monitors).encode()).hexdigest()
+
+
+def replay_recording(path, speed=0.0, max_gap=None, profile=None):
+    kuma = FakeKuma()
+    queue = WorkQueue(controller.sync_monitor, workers=controller.KUMA_WRITE_WORKERS, name="replay-kuma-write")
+    latencies = defaultdict(list)
+    recorded = []
+
+    def timed(label, change, func, *args):
+        recorded.append(change.time)
+        start = time.perf_counter()
+        func(*args)
+        latencies[label].append(time.perf_counter() - start)
+
+    def on_event(change):
+        timed(change.event_type, change, controller.handle_event, change.event_type, change.object, change.kind)
+
+    def on_listing(change, pages):
+        timed("LIST", change, controller.handle_changes, pages, change.kind, change.namespace)
+
+    controller.reset_desired_monitors()
+    controller.invalidate_monitor_index()
+    profiler = cProfile.Profile() if profile else None
+    with (
+        patch.object(controller, "kuma", kuma),
+        patch.object(controller, "kuma_work_queue", queue),
+        patch.object(controller, "object_store", controller.new_object_store()),
+    ):
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        fed = replay(read_recording(path), on_event, on_listing, speed=speed, max_gap=max_gap)
+        queue.join()
+        if profiler:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+    queue.shutdown()
+    if profiler:
+        profiler.dump_stats(profile)
+
+    return {
+        "recording": str(path),
+        "speed": speed or None,
+        "changes_fed": fed,
+        "recorded_seconds": round(max(recorded) - min(recorded), 3) if recorded else 0,
+        "replay_seconds": round(elapsed, 6),
+        "throughput_per_s": round(fed / elapsed, 1) if elapsed else None,
+        "latency_us": {
+            label: {
+                "count": len(values),
+                "p50": round(percentile(values, 0.5) * 1e6, 1),
+                "p99": round(percentile(values, 0.99) * 1e6, 1),
+                "max": round(max(values) * 1e6, 1),
+            }
+            for label, values in sorted(latencies.items())
+        },
+        "kuma_calls": dict(sorted(kuma.calls.items())),
+        "monitors": len(kuma.monitors),
+        "monitors_digest": monitors_digest(kuma),
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def compare(result, baseline):
+    """Print how ``result`` differs from ``baseline``; return whether both
+    ended with the same monitors."""
+    ratio = result["replay_seconds"] / baseline["replay_seconds"] if baseline["replay_seconds"] else float("nan")
+    print(f"replay time {ratio:6.2f}x ({baseline['replay_seconds']}s -> {result['replay_seconds']}s)", file=sys.stderr)
+    for label, latency in result["latency_us"].items():
+        old = baseline["latency_us"].get(label)
+        if old and old["p99"]:
+            print(f"{label:<9} p99 {latency['p99'] / old['p99']:6.2f}x", file=sys.stderr)
+    if result["kuma_calls"] != baseline["kuma_calls"]:
+        print(f"Uptime Kuma calls differ: {baseline['kuma_calls']} -> {result['kuma_calls']}", file=sys.stderr)
+    same = result["monitors_digest"] == baseline["monitors_digest"]
+    if not same:
+        print(f"Resulting monitors differ ({baseline['monitors']} -> {result['monitors']})", file=sys.stderr)
+    return same
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="file written with RECORD_EVENTS_FILE (.gz files are decompressed)")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay this many times faster than recorded (default: as fast as possible)")
+    parser.add_argument("--max-gap", type=float, default=None, help="with --speed, shorten quiet periods to this many recorded seconds")
+    parser.add_argument("--profile", help="write cProfile stats of the replay to this file")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="JSON report of a previous replay; exits with 1 if the resulting monitors differ")
+    args = parser.parse_args(argv)
+
+    # Per-object info logs would dominate the timings.
+    logging.disable(logging.INFO)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    report.update(replay_recording(args.recording, args.speed, args.max_gap, args.profile))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(report, json.load(f)):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+
+import yaml
+
+from kuma_ingress_watcher.records import ProbeSettings
+from kuma_ingress_watcher.speedups import YamlLoader
+
+HTTP_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+USE_DEFAULT = object()
+
+
+def parse_string(value):
+    value = str(value).strip()
+    if not value:
+        raise ValueError("must not be empty")
+    return value
+
+
+def parse_bool(value):
+    lowered = str(value).strip().lower()
+    if lowered not in ("true", "false"):
+        raise ValueError(f"expected true or false, got {value!r}")
+    return lowered == "true"
+
+
+def parse_interval(value):
+    interval = int(value)
+    if interval <= 0:
+        raise ValueError(f"must be a positive number of seconds, got {value!r}")
+    return interval
+
+
+def parse_port(value):
+    port = int(value)
+    if not 0 < port < 65536:
+        raise ValueError(f"must be between 1 and 65535, got {value!r}")
+    return port
+
+
+def parse_method(value):
+    method = str(value).strip().upper()
+    if method not in HTTP_METHODS:
+        raise ValueError(f"unsupported HTTP method {value!r}")
+    return method
+
+
+def parse_headers(value):
+    try:
+        headers = json.loads(value)
+    except ValueError:
+        raise ValueError(f"must be a JSON object, got {value!r}") from None
+    if not isinstance(headers, dict):
+        raise ValueError(f"must be a JSON object, got {value!r}")
+    return value
+
+
+def parse_statuscodes(value):
+    try:
+        codes = yaml.load(value, Loader=YamlLoader)
+    except yaml.YAMLError:
+        codes = None
+    if type(codes) is not list or not all(isinstance(code, (str, int)) for code in codes):
+        raise ValueError(f"must be a list, got {value!r}")
+    return tuple(codes)
+
+
+def one_of(choices):
+    def parse_choice(value):
+        choice = str(value).strip().lower()
+        if choice not in choices:
+            raise ValueError(f"must be one of {', '.join(sorted(choices))}, got {value!r}")
+        return choice
+    return parse_choice
+
+
+@dataclass(frozen=True, slots=True)
+class AnnotationField:
+    """One annotation of the schema: ``key`` (after the prefix), the
+    ProbeSettings attribute it sets, a converter raising ValueError on
+    invalid input, and the value used when it does (the default unless
+    ``invalid`` is given)."""
+
+    key: str
+    attribute: str
+    converter: object
+    invalid: object = USE_DEFAULT
+
+
+def probe_annotation_schema(probe_types):
+    return (
+        AnnotationField("name", "monitor_name", parse_string),
+        # Anything but "true" used to disable monitoring; keep failing closed.
+        AnnotationField("enabled", "enabled", parse_bool, invalid=False),
+        AnnotationField("interval", "interval", parse_interval),
+        AnnotationField("type", "probe_type", one_of(probe_types)),
+        AnnotationField("headers", "headers", parse_headers),
+        AnnotationField("port", "port", parse_port),
+        AnnotationField("path", "path", parse_string),
+        AnnotationField("host", "host", parse_string),
+        AnnotationField("method", "method", parse_method),
+        AnnotationField("parent", "parent", parse_string),
+        AnnotationField("accepted-statuscodes", "accepted_statuscodes", parse_statuscodes),
+    )
+
+
+class AnnotationParser:
+    """Parses probe annotations into ProbeSettings following a declarative schema.
+
+    The schema is compiled once into a lookup by full annotation key. Results
+    are memoized on the content of the prefixed annotations, so objects
+    sharing an annotation set, as Helm-templated ones usually do, are parsed
+    once and share one ProbeSettings instance.
+
+    Invalid values and unknown prefixed annotations do not raise: they are
+    collected in ``ProbeSettings.errors`` for the caller to report.
+    """
+
+    def __init__(self, prefix, fields, defaults=None, cache_size=4096):
+        self.prefix = prefix
+        self._fields = {f"{prefix}{field.key}": field for field in fields}
+        self._defaults = dict(defaults or {})
+        self._parse = lru_cache(maxsize=cache_size)(self._parse_items)
+
+    def parse(self, annotations):
+        prefix = self.prefix
+        items = tuple(sorted((key, value) for key, value in annotations.items() if key.startswith(prefix)))
+        return self._parse(items)
+
+    def cache_info(self):
+        return self._parse.cache_info()
+
+    def _parse_items(self, items):
+        values = dict(self._defaults)
+        errors = []
+        for key, raw in items:
+            field = self._fields.get(key)
+            if field is None:
+                errors.append(f"{key}: unknown annotation")
+                continue
+            try:
+                values[field.attribute] = field.converter(raw)
+            except (TypeError, ValueError) as e:
+                errors.append(f"{key}: {e}")
+                if field.invalid is not USE_DEFAULT:
+                    values[field.attribute] = field.invalid
+        return ProbeSettings(errors=tuple(errors), **values)
@@ -0,0 +1,178 @@
+import threading
+from collections import defaultdict
+
+
+def object_key(kind, item):
+    metadata = item["metadata"]
+    return (kind, metadata.get("namespace"), metadata["name"])
+
+
+class ObjectStore:
+    """Thread-safe, indexed store holding one value per routing object.
+
+    Objects are keyed by (kind, namespace, name). The stored value is the
+    object itself, or ``transform(kind, item)`` when a transform is given,
+    which lets callers keep a compact record instead of the full object.
+
+    Indexers are called with (kind, value) and return the values the object
+    should be reachable by, e.g. its namespace or its hosts.
+
+    Registered handlers are notified outside of the store lock:
+    ``on_add(key, value)``, ``on_update(key, old_value, new_value, item)`` and
+    ``on_delete(key, old_value)``.
+    """
+
+    def __init__(self, indexers=None, transform=None):
+        self._lock = threading.RLock()
+        self._items = {}
+        self._uids = {}
+        self._transform = transform
+        self._indexers = dict(indexers or {})
+        self._indices = {name: defaultdict(set) for name in self._indexers}
+        self._index_values = {}
+        self._counts = defaultdict(int)
+        self._handlers = []
+
+    def add_event_handler(self, on_add=None, on_update=None, on_delete=None):
+        self._handlers.append((on_add, on_update, on_delete))
+
+    def get(self, key):
+        with self._lock:
+            return self._items.get(key)
+
+    def get_uid(self, key):
+        with self._lock:
+            return self._uids.get(key)
+
+    def keys(self, kind=None):
+        with self._lock:
+            return [key for key in self._items if kind is None or key[0] == kind]
+
+    def by_index(self, index_name, value):
+        with self._lock:
+            return set(self._indices[index_name].get(value, ()))
+
+    def count(self, kind):
+        with self._lock:
+            return self._counts[kind]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def upsert(self, kind, item):
+        key = object_key(kind, item)
+        value = self._transform(kind, item) if self._transform else item
+        with self._lock:
+            events = self._upsert(key, item, value)
+        self._dispatch(events)
+        return key
+
+    def delete(self, key):
+        with self._lock:
+            events = self._delete(key)
+        self._dispatch(events)
+
+    def discard(self, key):
+        """Drop an object without notifying the handlers."""
+        with self._lock:
+            if key in self._items:
+                del self._items[key]
+                self._uids.pop(key, None)
+                self._counts[key[0]] -= 1
+                self._unindex(key)
+
+    def replace(self, kind, items):
+        """Make the objects of ``kind`` match ``items``, which may be any iterable."""
+        seen = set()
+        for item in items:
+            seen.add(self.upsert(kind, item))
+        self.prune(kind, seen)
+
+    def prune(self, kind, keep):
+        """Delete the objects of ``kind`` whose key is not in ``keep``."""
+        for key in self.keys(kind):
+            if key not in keep:
+                self.delete(key)
+
+    def snapshot(self):
+        """(key, value, uid, index values) of every object, for checkpointing."""
+        with self._lock:
+            return [
+                (key, value, self._uids.get(key), {name: list(values) for name, values in self._index_values.get(key, {}).items()})
+                for key, value in self._items.items()
+            ]
+
+    def restore(self, key, value, uid=None, index_values=None):
+        """Load a checkpointed object without notifying the handlers."""
+        with self._lock:
+            if key in self._items:
+                self._unindex(key)
+            else:
+                self._counts[key[0]] += 1
+            self._items[key] = value
+            self._uids[key] = uid
+            values = {name: tuple((index_values or {}).get(name, ())) for name in self._indexers}
+            for name, indexed in values.items():
+                for index_value in indexed:
+                    self._indices[name][index_value].add(key)
+            self._index_values[key] = values
+
+    def _upsert(self, key, item, value):
+        uid = item["metadata"].get("uid")
+        events = []
+
+        if key in self._items and uid and self._uids.get(key) not in (None, uid):
+            # Same name but a different object: it was deleted and recreated.
+            events.extend(self._delete(key))
+
+        exists = key in self._items
+        previous = self._items.get(key)
+        if exists:
+            self._unindex(key)
+        else:
+            self._counts[key[0]] += 1
+        self._items[key] = value
+        self._uids[key] = uid
+        self._index(key, value)
+
+        if exists:
+            events.append((1, key, (previous, value, item)))
+        else:
+            events.append((0, key, (value,)))
+        return events
+
+    def _delete(self, key):
+        if key not in self._items:
+            return []
+        previous = self._items.pop(key)
+        self._uids.pop(key, None)
+        self._counts[key[0]] -= 1
+        self._unindex(key)
+        return [(2, key, (previous,))]
+
+    def _index(self, key, value):
+        values = {}
+        for name, indexer in self._indexers.items():
+            values[name] = tuple(indexer(key[0], value))
+            for index_value in values[name]:
+                self._indices[name][index_value].add(key)
+        self._index_values[key] = values
+
+    def _unindex(self, key):
+        for name, values in self._index_values.pop(key, {}).items():
+            index = self._indices[name]
+            for value in values:
+                keys = index.get(value)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def _dispatch(self, events):
+        for position, key, args in events:
+            for handlers in self._handlers:
+                handler = handlers[position]
+                if handler:
+                    handler(key, *args)
@@ -1,11 +1,29 @@
+import json
 import os
-import re
 import time
 import logging
+import signal
+import socket
 import sys
+import threading
 import yaml
-from uptime_kuma_api import UptimeKumaApi, MonitorType
-from kubernetes import client, config
+from uptime_kuma_api import UptimeKumaApi, MonitorType, Event
+from kubernetes import client, config, watch
+from kubernetes.client.rest import ApiException
+from kuma_ingress_watcher import metrics
+from kuma_ingress_watcher.annotations import HTTP_METHODS, AnnotationParser, probe_annotation_schema
+from kuma_ingress_watcher.cache import ObjectStore, object_key
+from kuma_ingress_watcher.file_watcher import FileWatcher
+from kuma_ingress_watcher.kuma_session import KumaSession
+from kuma_ingress_watcher.leader_election import LeaderElector
+from kuma_ingress_watcher.monitor_file import iter_entries, monitor_files
+from kuma_ingress_watcher.polling import PollScheduler
+from kuma_ingress_watcher.recording import EventRecorder
+from kuma_ingress_watcher.records import DesiredMonitor, RoutingObject
+from kuma_ingress_watcher.rules import RuleParser
+from kuma_ingress_watcher.sharding import HashRing, LeaseMembership
+from kuma_ingress_watcher.speedups import json_loads
+from kuma_ingress_watcher.workers import WorkQueue
 
 
 def str_to_bool(value):
@@ -14,18 +32,65 @@ def str_to_bool(value):
     return str(value).lower() in ["true", "1", "t", "y", "yes"]
 
 
+def str_to_list(value):
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
 # Configuration
 UPTIME_KUMA_URL = os.getenv("UPTIME_KUMA_URL")
 UPTIME_KUMA_USER = os.getenv("UPTIME_KUMA_USER")
 UPTIME_KUMA_PASSWORD = os.getenv("UPTIME_KUMA_PASSWORD")
 WATCH_INTERVAL = int(os.getenv("WATCH_INTERVAL", "10") or 10)
+WATCH_MAX_INTERVAL = int(os.getenv("WATCH_MAX_INTERVAL", "120") or 120)
+WATCH_JITTER = float(os.getenv("WATCH_JITTER", "0.1") or 0)
+WATCH_MODE = os.getenv("WATCH_MODE", "watch").lower()
+WATCH_TIMEOUT = int(os.getenv("WATCH_TIMEOUT", "300") or 300)
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "500") or 500)
 WATCH_INGRESSROUTES = str_to_bool(os.getenv("WATCH_INGRESSROUTES", True))
 WATCH_INGRESS = str_to_bool(os.getenv("WATCH_INGRESS", False))
 USE_TRAEFIK_V3_CRD_GROUP = str_to_bool(os.getenv("USE_TRAEFIK_V3_CRD_GROUP", False))
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOAD_MONITOR_FROM_FILE = str_to_bool(os.getenv("ENABLE_FILE_MONITOR", False))
 FILE_MONITOR_PATH = os.getenv("FILE_MONITOR_PATH", "/etc/kuma-controller/monitors.yaml")
+FILE_MONITOR_WATCH = str_to_bool(os.getenv("FILE_MONITOR_WATCH", True))
+FILE_MONITOR_POLL_INTERVAL = int(os.getenv("FILE_MONITOR_POLL_INTERVAL", "10") or 10)
 DEFAULT_PARENT = os.getenv("DEFAULT_PARENT", None)
+DEFAULT_INTERVAL = int(os.getenv("DEFAULT_INTERVAL", "60") or 60)
+DEFAULT_PROBE_TYPE = os.getenv("DEFAULT_PROBE_TYPE", "http").lower()
+DEFAULT_METHOD = os.getenv("DEFAULT_METHOD", "GET").upper()
+ANNOTATION_CACHE_SIZE = int(os.getenv("ANNOTATION_CACHE_SIZE", "4096") or 4096)
+RULE_CACHE_SIZE = int(os.getenv("RULE_CACHE_SIZE", "16384") or 16384)
+MONITOR_INDEX_TTL = int(os.getenv("MONITOR_INDEX_TTL", "300") or 300)
+DRY_RUN = str_to_bool(os.getenv("DRY_RUN", False))
+KUMA_WRITE_WORKERS = int(os.getenv("KUMA_WRITE_WORKERS", "4") or 4)
+KUMA_RATE_LIMIT = float(os.getenv("KUMA_RATE_LIMIT", "20") or 20)
+KUMA_RATE_BURST = int(os.getenv("KUMA_RATE_BURST", "50") or 50)
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1") or 1)
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "300") or 300)
+KUMA_TIMEOUT = float(os.getenv("KUMA_TIMEOUT", "10") or 10)
+KUMA_POOL_SIZE = int(os.getenv("KUMA_POOL_SIZE", "1") or 1)
+KUMA_HEARTBEAT_INTERVAL = float(os.getenv("KUMA_HEARTBEAT_INTERVAL", "30") or 30)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)
+STATE_FILE = os.getenv("STATE_FILE", "")
+RECORD_EVENTS_FILE = os.getenv("RECORD_EVENTS_FILE", "")
+WATCH_NAMESPACES = str_to_list(os.getenv("WATCH_NAMESPACES"))
+IGNORE_NAMESPACES = str_to_list(os.getenv("IGNORE_NAMESPACES"))
+NAMESPACED_LIST_THRESHOLD = int(os.getenv("NAMESPACED_LIST_THRESHOLD", "10") or 10)
+LABEL_SELECTOR = os.getenv("LABEL_SELECTOR", "")
+FIELD_SELECTOR = os.getenv("FIELD_SELECTOR", "")
+INGRESS_CLASS = str_to_list(os.getenv("INGRESS_CLASS"))
+SHARDING_ENABLED = str_to_bool(os.getenv("SHARDING_ENABLED", False))
+SHARD_GROUP = os.getenv("SHARD_GROUP", "kuma-ingress-watcher")
+SHARD_IDENTITY = os.getenv("SHARD_IDENTITY") or os.getenv("POD_NAME") or socket.gethostname()
+SHARD_LEASE_NAMESPACE = os.getenv("SHARD_LEASE_NAMESPACE") or os.getenv("POD_NAMESPACE") or "default"
+SHARD_LEASE_DURATION = int(os.getenv("SHARD_LEASE_DURATION", "30") or 30)
+SHARD_RENEW_INTERVAL = int(os.getenv("SHARD_RENEW_INTERVAL", "10") or 10)
+STATE_SAVE_INTERVAL = int(os.getenv("STATE_SAVE_INTERVAL", "60") or 60)
+LEADER_ELECTION_ENABLED = str_to_bool(os.getenv("LEADER_ELECTION_ENABLED", False))
+LEADER_ELECTION_LEASE_NAME = os.getenv("LEADER_ELECTION_LEASE_NAME", "kuma-ingress-watcher-leader")
+LEADER_ELECTION_NAMESPACE = os.getenv("LEADER_ELECTION_NAMESPACE") or os.getenv("POD_NAMESPACE") or "default"
+LEADER_ELECTION_LEASE_DURATION = int(os.getenv("LEADER_ELECTION_LEASE_DURATION", "15") or 15)
+LEADER_ELECTION_RENEW_INTERVAL = int(os.getenv("LEADER_ELECTION_RENEW_INTERVAL", "5") or 5)
 
 LOG_LEVELS = {
     "DEBUG": logging.DEBUG,
@@ -41,78 +106,345 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ANNOTATION_PREFIX = "uptime-kuma.autodiscovery.probe."
+INGRESS_CLASS_ANNOTATION = "kubernetes.io/ingress.class"
+# Consecutive 403s on a watch before giving up on it and polling instead.
+WATCH_FORBIDDEN_LIMIT = 3
+MONITOR_TYPES = frozenset(monitor_type.value for monitor_type in MonitorType)
+
+# Compiled once; identical annotation sets are parsed once and share their
+# ProbeSettings.
+annotation_parser = AnnotationParser(
+    ANNOTATION_PREFIX,
+    probe_annotation_schema(MONITOR_TYPES),
+    defaults={
+        "interval": DEFAULT_INTERVAL,
+        "probe_type": DEFAULT_PROBE_TYPE,
+        "method": DEFAULT_METHOD,
+        "parent": DEFAULT_PARENT,
+    },
+    cache_size=ANNOTATION_CACHE_SIZE,
+)
+rule_parser = RuleParser(RULE_CACHE_SIZE)
+
 kuma = None
 custom_api_instance = None
 networking_api_instance = None
+coordination_api_instance = None
+
+# In-memory view of the Uptime Kuma monitors, keyed by name, so writes don't
+# need a full get_monitors() round trip each time.
+MONITOR_INDEX_FIELDS = ("type", "url", "interval", "method", "headers", "parent", "accepted_statuscodes")
+monitor_index = {}
+group_index = {}
+monitor_index_loaded_at = None
+monitor_index_lock = threading.RLock()
+# Ids of the monitors this controller created (by name) or deleted since the
+# last monitor list showing it. A list pushed by Uptime Kuma may have been
+# sent before such a write completed, and must not undo it.
+created_monitor_ids = {}
+deleted_monitor_ids = set()
+skipped_monitor_writes = 0
+
+# Desired monitors per source (a routing object key or the monitor file), merged
+# by monitor name. A None value means the monitor must not exist.
+desired_by_source = {}
+desired_monitors = {}
+desired_owners = {}
+dirty_monitors = set()
+managed_monitors = set()
+desired_lock = threading.RLock()
+reconcile_lock = threading.Lock()
+
+# Last applied resourceVersion per resource type. Kubernetes changes are
+# applied under state_lock so a checkpoint never sees an object record
+# without the monitors derived from it.
+STATE_VERSION = 2
+resource_versions = {}
+state_changes = 0
+state_lock = threading.RLock()
+# Serializes checkpoints: the periodic one and the one on SIGTERM share the
+# temporary file, and a newer snapshot must not be overwritten by an older one.
+state_file_lock = threading.Lock()
+# Routing objects added, modified or deleted so far; polling backs off
+# while it does not move.
+routing_object_changes = 0
+# When set, every listing page and watch event is appended to a recording
+# that benchmarks/replay.py can play back.
+event_recorder = None
+
+# With sharding, the ring of live replicas deciding which namespaces (and
+# whether the monitor file) this replica handles; None means everything.
+MONITOR_FILE_SHARD_KEY = "monitor-file"
+monitor_file_watcher = None
+shard_ring = None
+shard_membership = None
+shutdown_hooks = []
+
+# Leader election: standbys keep their caches warm but only the leader
+# writes to Uptime Kuma.
+leader_elector = None
 
 
 def check_config():
     if not UPTIME_KUMA_URL or not UPTIME_KUMA_USER or not UPTIME_KUMA_PASSWORD:
         logger.error("Uptime Kuma configuration is not set properly.")
         sys.exit(1)
+    if LEADER_ELECTION_ENABLED and SHARDING_ENABLED:
+        logger.error("LEADER_ELECTION_ENABLED and SHARDING_ENABLED cannot be used together.")
+        sys.exit(1)
+    if DEFAULT_INTERVAL <= 0 or DEFAULT_PROBE_TYPE not in MONITOR_TYPES or DEFAULT_METHOD not in HTTP_METHODS:
+        logger.error("DEFAULT_INTERVAL, DEFAULT_PROBE_TYPE or DEFAULT_METHOD is not valid.")
+        sys.exit(1)
 
 
 def init_kuma_api():
+    global kuma
+    # Stands in for the UptimeKumaApi: lost connections are reopened and
+    # logged in again instead of failing every call until a restart.
+    kuma = KumaSession(
+        lambda: UptimeKumaApi(UPTIME_KUMA_URL, timeout=KUMA_TIMEOUT),
+        UPTIME_KUMA_USER,
+        UPTIME_KUMA_PASSWORD,
+        pool_size=KUMA_POOL_SIZE,
+        heartbeat_interval=KUMA_HEARTBEAT_INTERVAL,
+        base_delay=RETRY_BASE_DELAY,
+        max_delay=RETRY_MAX_DELAY,
+        on_connect=register_monitor_index_events,
+        on_reconnect=on_kuma_reconnected,
+    )
     try:
-        global kuma
-        kuma = UptimeKumaApi(UPTIME_KUMA_URL)
-        kuma.login(UPTIME_KUMA_USER, UPTIME_KUMA_PASSWORD)
+        kuma.open()
     except Exception as e:
         logger.error(f"Failed to connect to Uptime Kuma API: {e}")
         sys.exit(1)
+    kuma.start()
+    shutdown_hooks.append(kuma.close)
+
+
+def on_kuma_reconnected():
+    # Uptime Kuma may have been restored from a backup or edited while we
+    # were away: reload the index and rewrite only what differs.
+    logger.info("Reconnected to Uptime Kuma, reconciling monitors")
+    invalidate_monitor_index()
+    reconcile(full=True)
+
+
+def load_monitor_index(monitors):
+    global monitor_index, group_index, monitor_index_loaded_at
+    # Build the new index aside and swap it in, so concurrent readers never
+    # see it half-filled.
+    new_monitor_index = {}
+    new_group_index = {}
+    latest_id = 0
+    for monitor in monitors:
+        index_monitor(monitor["name"], monitor["id"], monitor, new_monitor_index, new_group_index)
+        latest_id = max(latest_id, monitor["id"])
+    with monitor_index_lock:
+        merge_recent_writes(new_monitor_index, new_group_index, latest_id)
+        monitor_index = new_monitor_index
+        group_index = new_group_index
+        monitor_index_loaded_at = time.monotonic()
+
+
+def merge_recent_writes(new_monitor_index, new_group_index, latest_id):
+    # Ids only grow: a list without a monitor created with a higher id than
+    # any it holds was sent before the creation.
+    for name, monitor_id in list(created_monitor_ids.items()):
+        entry = monitor_index.get(name)
+        if monitor_id > latest_id and name not in new_monitor_index and entry and entry["id"] == monitor_id:
+            new_monitor_index[name] = entry
+            if entry["type"] == MonitorType.GROUP:
+                new_group_index[name] = monitor_id
+        elif monitor_id <= latest_id:
+            del created_monitor_ids[name]
+    # Ids are never reused: a deleted monitor still listed was sent before
+    # the deletion.
+    still_listed = set()
+    for name, entry in list(new_monitor_index.items()):
+        if entry["id"] in deleted_monitor_ids:
+            del new_monitor_index[name]
+            new_group_index.pop(name, None)
+            still_listed.add(entry["id"])
+    deleted_monitor_ids.intersection_update(still_listed)
+
+
+def index_monitor(name, monitor_id, fields, monitors=None, groups=None):
+    entry = {"id": monitor_id}
+    entry.update({field: fields.get(field) for field in MONITOR_INDEX_FIELDS})
+    with monitor_index_lock:
+        (monitor_index if monitors is None else monitors)[name] = entry
+        if entry["type"] == MonitorType.GROUP:
+            (group_index if groups is None else groups)[name] = monitor_id
+
+
+def unindex_monitor(name):
+    with monitor_index_lock:
+        monitor_index.pop(name, None)
+        group_index.pop(name, None)
+
+
+def invalidate_monitor_index():
+    global monitor_index_loaded_at
+    with monitor_index_lock:
+        monitor_index_loaded_at = None
+        # The next list is fetched after every write so far.
+        created_monitor_ids.clear()
+        deleted_monitor_ids.clear()
+
+
+def refresh_monitor_index():
+    logger.debug("Refreshing Uptime Kuma monitor index")
+    with metrics.track_kuma_call("get_monitors"):
+        monitors = kuma.get_monitors()
+    load_monitor_index(monitors)
+
+
+def ensure_monitor_index():
+    with monitor_index_lock:
+        if (
+            monitor_index_loaded_at is None
+            or time.monotonic() - monitor_index_loaded_at > MONITOR_INDEX_TTL
+        ):
+            refresh_monitor_index()
+
+
+def register_monitor_index_events(api):
+    # Chain onto the library handlers so its own event cache stays intact.
+    def on_monitor_list(data):
+        api._event_monitor_list(data)
+        load_monitor_index((data or {}).values())
+
+    def on_disconnect():
+        api._event_disconnect()
+        invalidate_monitor_index()
+
+    api.sio.on(Event.MONITOR_LIST, on_monitor_list)
+    api.sio.on(Event.DISCONNECT, on_disconnect)
+
+
+def kuma_monitor_fields(url, interval, probe_type, headers, method, parent=None, accepted_statuscodes=None):
+    return dict(
+        type=probe_type,
+        url=url,
+        interval=interval,
+        method=method,
+        headers=headers,
+        parent=group_index.get(parent),
+        accepted_statuscodes=list(accepted_statuscodes) if accepted_statuscodes is not None else None,
+    )
+
+
+def desired_monitor_fields(monitor):
+    return kuma_monitor_fields(
+        monitor.url,
+        monitor.interval,
+        monitor.probe_type,
+        monitor.headers,
+        monitor.method,
+        monitor.parent,
+        monitor.accepted_statuscodes,
+    )
+
+
+def normalize_monitor_field(field, value):
+    if field == "accepted_statuscodes":
+        return list(value) if value else ["200-299"]
+    if field == "headers":
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return value.strip() or None
+        return value or None
+    if field in ("type", "method") and value is not None:
+        return str(value.value if isinstance(value, MonitorType) else value).lower()
+    if field == "interval" and value is not None:
+        return int(value)
+    return value
+
+
+def monitor_fields_match(monitor, fields):
+    return all(
+        normalize_monitor_field(field, monitor.get(field)) == normalize_monitor_field(field, fields.get(field))
+        for field in MONITOR_INDEX_FIELDS
+    )
+
+
+def count_skipped_write(name):
+    global skipped_monitor_writes
+    with monitor_index_lock:
+        skipped_monitor_writes += 1
+    metrics.KUMA_SKIPPED_WRITES.inc()
+    logger.debug(f"Monitor {name} is up to date, skipping update")
+
+
+def parent_group_pending(parent):
+    # Writes run in parallel: a child written before the group we are about
+    # to create would lose its parent, so it waits and is retried.
+    if not parent or parent in group_index:
+        return False
+    with desired_lock:
+        group = desired_monitors.get(parent)
+    return group is not None and group.probe_type == MonitorType.GROUP
 
 
 def create_or_update_monitor(name, url, interval, probe_type, headers, method, parent=None, accepted_statuscodes=None):
     try:
-        monitors = kuma.get_monitors()
-        groups_map = dict([(monitor["name"], monitor["id"]) for monitor in monitors if monitor.get("type") == MonitorType.GROUP])
-
-        for monitor in monitors:
-            if monitor["name"] == name:
-                logger.info(f"Updating monitor for {name} with URL: {url}")
-                kuma.edit_monitor(
-                    monitor["id"],
-                    url=url,
-                    type=probe_type,
-                    headers=headers,
-                    method=method,
-                    interval=interval,
-                    parent=groups_map.get(parent),
-                    accepted_statuscodes=accepted_statuscodes
-                )
-                return
+        ensure_monitor_index()
+        if parent_group_pending(parent):
+            logger.info(f"Waiting for group {parent} to be created before writing {name}")
+            return False
+        monitor = monitor_index.get(name)
+        fields = kuma_monitor_fields(url, interval, probe_type, headers, method, parent, accepted_statuscodes)
+
+        if monitor:
+            if monitor_fields_match(monitor, fields):
+                count_skipped_write(name)
+                return True
+            logger.info(f"Updating monitor for {name} with URL: {url}")
+            with metrics.track_kuma_call("edit_monitor"):
+                kuma.edit_monitor(monitor["id"], **fields)
+            index_monitor(name, monitor["id"], fields)
+            return True
         logger.info(f"Creating new monitor for {name} with URL: {url}")
-        kuma.add_monitor(
-            type=probe_type,
-            name=name,
-            url=url,
-            interval=interval,
-            headers=headers,
-            method=method,
-            parent=groups_map.get(parent),
-            accepted_statuscodes=accepted_statuscodes
-        )
+        with metrics.track_kuma_call("add_monitor"):
+            response = kuma.add_monitor(name=name, **fields)
+        if isinstance(response, dict) and "monitorID" in response:
+            with monitor_index_lock:
+                index_monitor(name, response["monitorID"], fields)
+                created_monitor_ids[name] = response["monitorID"]
+        else:
+            invalidate_monitor_index()
         logger.info(f"Successfully created monitor for {name}")
+        return True
     except Exception as e:
         logger.error(f"Failed to create or update monitor for {name}: {e}")
+        return False
 
 
 def delete_monitor(name):
     try:
-        monitors = kuma.get_monitors()
-        for monitor in monitors:
-            if monitor["name"] == name:
+        ensure_monitor_index()
+        monitor = monitor_index.get(name)
+        if monitor:
+            with metrics.track_kuma_call("delete_monitor"):
                 kuma.delete_monitor(monitor["id"])
-                logger.info(f"Successfully deleted monitor {name}")
-                return
+            with monitor_index_lock:
+                unindex_monitor(name)
+                created_monitor_ids.pop(name, None)
+                deleted_monitor_ids.add(monitor["id"])
+            logger.info(f"Successfully deleted monitor {name}")
+            return True
         logger.warning(f"No monitor found with name {name}")
+        return True
     except Exception as e:
         logger.error(f"Failed to delete monitor {name}: {e}")
+        return False
 
 
 def extract_hosts_from_match(match):
-    host_pattern = re.compile(r"Host\(`([^`]*)`\)")
-    return host_pattern.findall(match)
+    return list(rule_parser.parse(match).hosts)
 
 
 def extract_hosts_from_ingress_rule(rule):
@@ -141,106 +473,239 @@ def get_routes_or_rules(spec, type_obj):
         return []
 
 
-def process_routing_object(item, type_obj):
+def parse_routing_object(item, type_obj):
+    """Parse an IngressRoute or Ingress into a RoutingObject, once per change."""
     metadata = item["metadata"]
-    annotations = metadata.get("annotations") or {}
-
     name = metadata["name"]
     namespace = metadata["namespace"]
-    spec = item["spec"]
-    routes_or_rules = get_routes_or_rules(spec, type_obj)
-    interval = int(annotations.get("uptime-kuma.autodiscovery.probe.interval", 60))
-    monitor_name = annotations.get(
-        "uptime-kuma.autodiscovery.probe.name", f"{name}-{namespace}"
-    )
-    enabled = (
-        annotations.get("uptime-kuma.autodiscovery.probe.enabled", "true").lower()
-        == "true"
+    routes_or_rules = get_routes_or_rules(item.get("spec") or {}, type_obj) or []
+    return RoutingObject(
+        kind=type_obj,
+        namespace=namespace,
+        name=name,
+        hosts=tuple(tuple(extract_hosts(route_or_rule, type_obj)) for route_or_rule in routes_or_rules),
+        probe=annotation_parser.parse(metadata.get("annotations") or {}),
     )
-    probe_type = annotations.get("uptime-kuma.autodiscovery.probe.type", "http")
-    headers = annotations.get("uptime-kuma.autodiscovery.probe.headers")
-    port = annotations.get("uptime-kuma.autodiscovery.probe.port")
-    path = annotations.get("uptime-kuma.autodiscovery.probe.path")
-    hard_host = annotations.get("uptime-kuma.autodiscovery.probe.host")
-    method = annotations.get("uptime-kuma.autodiscovery.probe.method", "GET")
-    parent = annotations.get("uptime-kuma.autodiscovery.probe.parent", DEFAULT_PARENT)
-    accepted_statuscodes = annotations.get("uptime-kuma.autodiscovery.probe.accepted-statuscodes")
-
-    if accepted_statuscodes:
-        try:
-            accepted_statuscodes = yaml.safe_load(accepted_statuscodes)
-            if type(accepted_statuscodes) is not list:
-                raise ValueError("Invalid format: accepted-statuscodes must be a list")
-        except (ValueError, yaml.YAMLError):
-            logger.warning(
-                f"Failed to process accepted-statuscodes: {accepted_statuscodes}, skipping"
-            )
-            accepted_statuscodes = None
 
-    if not enabled:
-        logger.info(f"Monitoring for {name} is disabled via annotations.")
-        delete_monitor(monitor_name)
-        return
 
-    process_routes(
-        monitor_name,
-        routes_or_rules,
-        interval,
-        probe_type,
-        headers,
-        port,
-        path,
-        hard_host,
-        method,
-        type_obj,
-        parent,
-        accepted_statuscodes
-    )
+def process_routing_object(item, type_obj):
+    return process_routes(parse_routing_object(item, type_obj))
 
 
-def process_routes(
-    monitor_name,
-    routes_or_rules,
-    interval,
-    probe_type,
-    headers,
-    port,
-    path,
-    hard_host,
-    method,
-    type_obj,
-    parent=None,
-    accepted_statuscodes=None,
-):
-    index = 1
-    for route_or_rule in routes_or_rules:
-        hosts = extract_hosts(route_or_rule, type_obj)
+def process_routes(routing_object):
+    """Desired monitors of a RoutingObject by name; None asks for a deletion."""
+    probe = routing_object.probe
+    monitor_name = probe.monitor_name or f"{routing_object.name}-{routing_object.namespace}"
+    if not probe.enabled:
+        logger.info(f"Monitoring for {routing_object.name} is disabled via annotations.")
+        return {monitor_name: None}
 
+    monitors = {}
+    index = 1
+    for hosts in routing_object.hosts:
         if hosts:
-            for host in hosts:
+            if probe.host:
+                # Every host of the route would probe the same URL.
+                hosts = hosts[:1]
+            route_monitor_name = f"{monitor_name}-{index}" if len(routing_object.hosts) > 1 else monitor_name
+            for host_index, host in enumerate(hosts, 1):
                 url = f"https://{host}"
-                if hard_host:
-                    url = f"https://{hard_host}"
-                if path:
-                    url = f"{url}{path}"
-                if port:
-                    url = f"{url}:{port}"
-
+                if probe.host:
+                    url = f"https://{probe.host}"
+                if probe.path:
+                    url = f"{url}{probe.path}"
+                if probe.port:
+                    url = f"{url}:{probe.port}"
+
+                # Single-host routes keep their name; each host of a route
+                # matching several gets its own monitor.
                 monitor_name_with_index = (
-                    f"{monitor_name}-{index}"
-                    if len(routes_or_rules) > 1
-                    else monitor_name
+                    f"{route_monitor_name}-{host_index}"
+                    if len(hosts) > 1
+                    else route_monitor_name
                 )
 
-                create_or_update_monitor(
-                    monitor_name_with_index, url, interval, probe_type, headers, method, parent, accepted_statuscodes
+                monitors[monitor_name_with_index] = DesiredMonitor(
+                    name=monitor_name_with_index,
+                    url=url,
+                    interval=probe.interval,
+                    probe_type=probe.probe_type,
+                    headers=probe.headers,
+                    method=probe.method,
+                    parent=probe.parent,
+                    accepted_statuscodes=probe.accepted_statuscodes,
                 )
             index += 1
+    return monitors
+
+
+def reset_desired_monitors():
+    with desired_lock:
+        desired_by_source.clear()
+        desired_monitors.clear()
+        desired_owners.clear()
+        dirty_monitors.clear()
+        managed_monitors.clear()
+
+
+def set_desired_monitors(source, monitors):
+    with desired_lock:
+        previous = desired_by_source.pop(source, {})
+        if monitors:
+            desired_by_source[source] = monitors
+
+        for name in previous.keys() - monitors.keys():
+            owners = desired_owners.get(name, set())
+            owners.discard(source)
+            if owners:
+                desired_monitors[name] = desired_by_source[next(iter(owners))][name]
+            else:
+                desired_owners.pop(name, None)
+                desired_monitors.pop(name, None)
+            dirty_monitors.add(name)
+
+        for name, fields in monitors.items():
+            desired_owners.setdefault(name, set()).add(source)
+            if name not in desired_monitors or desired_monitors[name] != fields:
+                desired_monitors[name] = fields
+                dirty_monitors.add(name)
+            if fields is not None:
+                managed_monitors.add(name)
+
+
+def forget_desired_monitors(source):
+    """Drop the monitors of ``source`` without deleting them from Uptime Kuma."""
+    with desired_lock:
+        for name in desired_by_source.pop(source, {}):
+            owners = desired_owners.get(name, set())
+            owners.discard(source)
+            if owners:
+                desired_monitors[name] = desired_by_source[next(iter(owners))][name]
+                continue
+            desired_owners.pop(name, None)
+            desired_monitors.pop(name, None)
+            managed_monitors.discard(name)
+            dirty_monitors.discard(name)
+
+
+def plan_reconcile(full=False):
+    """Diff the desired monitors changed since the last pass, or all with ``full``, against the monitor index."""
+    ensure_monitor_index()
+    plan = {"create": {}, "edit": {}, "delete": []}
+    with desired_lock:
+        if full:
+            names = desired_monitors.keys() | managed_monitors
+        else:
+            names = set(dirty_monitors)
+
+        for name in names:
+            fields = desired_monitors.get(name)
+            exists = name in monitor_index
+            if fields is not None:
+                if not exists:
+                    plan["create"][name] = fields
+                elif not monitor_fields_match(monitor_index[name], desired_monitor_fields(fields)):
+                    plan["edit"][name] = fields
+                elif name in dirty_monitors:
+                    count_skipped_write(name)
+            elif exists and (name in desired_monitors or name in managed_monitors):
+                plan["delete"].append(name)
+        dirty_monitors.difference_update(names)
+    return plan
+
+
+def log_plan(plan):
+    if not any(plan.values()):
+        return
+    logger.info(
+        f"Reconcile plan: {len(plan['create'])} to create, "
+        f"{len(plan['edit'])} to edit, {len(plan['delete'])} to delete, "
+        f"{kuma_work_queue.depth()} already queued"
+    )
+    logger.debug(f"Reconcile plan details: {json.dumps(plan, default=str, sort_keys=True)}")
+
+
+def sync_monitor(name):
+    """Bring one monitor in line with its desired state; False asks the work queue to retry."""
+    # Writes still queued when leadership is lost are dropped; the next leader reconciles them.
+    if not is_leader():
+        return True
+    with desired_lock:
+        monitor = desired_monitors.get(name)
+        owned = name in desired_monitors or name in managed_monitors
+
+    if monitor is not None:
+        return create_or_update_monitor(
+            name,
+            monitor.url,
+            monitor.interval,
+            monitor.probe_type,
+            monitor.headers,
+            monitor.method,
+            monitor.parent,
+            monitor.accepted_statuscodes,
+        )
+
+    ensure_monitor_index()
+    if owned and name in monitor_index and not delete_monitor(name):
+        return False
+    with desired_lock:
+        if desired_monitors.get(name) is None:
+            managed_monitors.discard(name)
+    return True
+
+
+# Kuma writes are queued by monitor name: repeated changes to a monitor
+# collapse into one write, failed writes are retried with backoff, and the
+# overall write rate is capped.
+kuma_work_queue = WorkQueue(
+    sync_monitor,
+    workers=KUMA_WRITE_WORKERS,
+    rate=KUMA_RATE_LIMIT,
+    burst=KUMA_RATE_BURST,
+    base_delay=RETRY_BASE_DELAY,
+    max_delay=RETRY_MAX_DELAY,
+    name="kuma-write",
+)
+metrics.QUEUE_DEPTH.set_function(kuma_work_queue.depth)
+
+
+def apply_plan(plan):
+    for name in list(plan["create"]) + list(plan["edit"]) + plan["delete"]:
+        kuma_work_queue.add(name)
+
+
+def is_leader():
+    return leader_elector is None or leader_elector.is_leader
+
+
+def reconcile(full=False):
+    # Standbys leave their changes dirty; the full reconcile on promotion
+    # covers them.
+    if not is_leader():
+        return None
+    with reconcile_lock:
+        try:
+            plan = plan_reconcile(full)
+        except Exception as e:
+            logger.error(f"Failed to plan reconcile: {e}")
+            return None
+        log_plan(plan)
+        if DRY_RUN:
+            if any(plan.values()):
+                logger.info(f"Dry run, not applying plan: {json.dumps(plan, default=str, sort_keys=True)}")
+        else:
+            apply_plan(plan)
+        return plan
 
 
 def init_kubernetes_client():
     try:
-        config.load_incluster_config()
+        try:
+            config.load_incluster_config()
+        except config.ConfigException:
+            # Not running in a pod, e.g. local development: use the kubeconfig.
+            config.load_kube_config()
         if WATCH_INGRESS:
             global networking_api_instance
             networking_api_instance = client.NetworkingV1Api()
@@ -248,59 +713,266 @@ def init_kubernetes_client():
         if WATCH_INGRESSROUTES:
             global custom_api_instance
             custom_api_instance = client.CustomObjectsApi()
+
+        if SHARDING_ENABLED or LEADER_ELECTION_ENABLED:
+            global coordination_api_instance
+            coordination_api_instance = client.CoordinationV1Api()
     except Exception as e:
         logger.error(f"Failed to initialize Kubernetes client: {e}")
         sys.exit(1)
 
 
-def get_ingressroutes(custom_api_instance):
+def get_ingressroute_group():
     if USE_TRAEFIK_V3_CRD_GROUP:
-        group = "traefik.io"
-    else:
-        group = "traefik.containo.us"
+        return "traefik.io"
+    return "traefik.containo.us"
+
+
+def watch_scopes():
+    """Namespaces to list and watch one by one, or [None] for cluster-wide."""
+    if WATCH_NAMESPACES and len(WATCH_NAMESPACES) <= NAMESPACED_LIST_THRESHOLD:
+        return list(WATCH_NAMESPACES)
+    return [None]
+
 
+def resource_scope(resource_type, namespace=None):
+    return resource_type if namespace is None else f"{resource_type}/{namespace}"
+
+
+def list_selectors():
+    """Selectors the API server can apply to list and watch calls."""
+    field_selectors = [FIELD_SELECTOR] if FIELD_SELECTOR else []
+    field_selectors += [f"metadata.namespace!={namespace}" for namespace in IGNORE_NAMESPACES]
+    selectors = {}
+    if LABEL_SELECTOR:
+        selectors["label_selector"] = LABEL_SELECTOR
+    if field_selectors:
+        selectors["field_selector"] = ",".join(field_selectors)
+    return selectors
+
+
+def get_ingress_class(item):
+    spec = item.get("spec") or {}
+    annotations = item["metadata"].get("annotations") or {}
+    return spec.get("ingressClassName") or annotations.get(INGRESS_CLASS_ANNOTATION)
+
+
+def shard_owns(key):
+    ring = shard_ring
+    return ring is None or ring.owner(key) == SHARD_IDENTITY
+
+
+def namespace_selected(namespace):
+    if WATCH_NAMESPACES and namespace not in WATCH_NAMESPACES:
+        return False
+    return namespace not in IGNORE_NAMESPACES and shard_owns(namespace)
+
+
+def routing_object_selected(kind, item):
+    """Filters the API server cannot apply: the namespace allow list and the ingress class."""
+    if not namespace_selected(item["metadata"].get("namespace")):
+        return False
+    if INGRESS_CLASS and get_ingress_class(item) not in INGRESS_CLASS:
+        return False
+    return True
+
+
+def read_json_response(response):
+    """Decode a response requested with ``_preload_content=False``."""
     try:
-        return custom_api_instance.list_cluster_custom_object(
-            group=group, version="v1alpha1", plural="ingressroutes"
-        )
+        return json_loads(response.data)
+    finally:
+        response.release_conn()
+
+
+def project_routing_object(kind, item):
+    """Keep only the fields the controller reads from a routing object."""
+    metadata = item.get("metadata") or {}
+    annotations = metadata.get("annotations") or {}
+    spec = item.get("spec") or {}
+    # Routes and rules keep their positions: monitor names depend on how many there are.
+    if kind == "IngressRoute":
+        projected_spec = {"routes": [{"match": route["match"]} if route.get("match") else {} for route in spec.get("routes") or []]}
+    else:
+        projected_spec = {"rules": [{"host": rule["host"]} if rule.get("host") else {} for rule in spec.get("rules") or []]}
+        if spec.get("ingressClassName"):
+            projected_spec["ingressClassName"] = spec["ingressClassName"]
+    return {
+        "metadata": {
+            "name": metadata.get("name"),
+            "namespace": metadata.get("namespace"),
+            "uid": metadata.get("uid"),
+            "resourceVersion": metadata.get("resourceVersion"),
+            "annotations": {
+                key: value for key, value in annotations.items()
+                if key.startswith(ANNOTATION_PREFIX) or key == INGRESS_CLASS_ANNOTATION
+            },
+        },
+        "spec": projected_spec,
+    }
+
+
+def project_page(kind, page):
+    metadata = page.get("metadata") or {}
+    return {
+        "metadata": {"resourceVersion": metadata.get("resourceVersion"), "continue": metadata.get("continue")},
+        "items": [project_routing_object(kind, item) for item in page.get("items") or []],
+    }
+
+
+def get_ingressroutes(custom_api_instance, namespace=None):
+    try:
+        _continue = None
+        kwargs = dict(group=get_ingressroute_group(), version="v1alpha1", plural="ingressroutes", **list_selectors())
+        while True:
+            with metrics.track_duration(metrics.KUBERNETES_REQUEST_LATENCY, "IngressRoute"):
+                if namespace is None:
+                    response = custom_api_instance.list_cluster_custom_object(
+                        limit=LIST_PAGE_SIZE, _continue=_continue, _preload_content=False, **kwargs
+                    )
+                else:
+                    response = custom_api_instance.list_namespaced_custom_object(
+                        namespace=namespace, limit=LIST_PAGE_SIZE, _continue=_continue, _preload_content=False, **kwargs
+                    )
+                page = project_page("IngressRoute", read_json_response(response))
+            yield page
+            _continue = page["metadata"]["continue"]
+            if not _continue:
+                return
     except Exception as e:
         logger.error(f"Failed to get ingressroutes: {e}")
-        return {"items": []}
 
 
-def get_ingress(networking_api_instance):
+def get_ingress(networking_api_instance, namespace=None):
     try:
-        ingress_list = networking_api_instance.list_ingress_for_all_namespaces()
-        ingress_dict_list = [ingress.to_dict() for ingress in ingress_list.items]
-        return {"items": ingress_dict_list}
+        _continue = None
+        while True:
+            # Raw responses skip building V1Ingress models only to turn them back into dicts.
+            with metrics.track_duration(metrics.KUBERNETES_REQUEST_LATENCY, "Ingress"):
+                if namespace is None:
+                    response = networking_api_instance.list_ingress_for_all_namespaces(
+                        limit=LIST_PAGE_SIZE, _continue=_continue, _preload_content=False, **list_selectors()
+                    )
+                else:
+                    response = networking_api_instance.list_namespaced_ingress(
+                        namespace, limit=LIST_PAGE_SIZE, _continue=_continue, _preload_content=False, **list_selectors()
+                    )
+                page = project_page("Ingress", read_json_response(response))
+            yield page
+            _continue = page["metadata"]["continue"]
+            if not _continue:
+                return
     except Exception as e:
         logger.error(f"Failed to get Ingress: {e}")
-        return {"items": []}
 
 
-def handle_changes(previous_items, current_items, resource_type):
-    current_names = set(current_items.keys())
-    previous_names = set(previous_items.keys())
+def index_by_namespace(kind, routing_object):
+    return [routing_object.namespace]
+
+
+def index_by_host(kind, routing_object):
+    return {host for hosts in routing_object.hosts for host in hosts}
 
-    added = current_names - previous_names
-    for name in added:
-        logger.info(f"{resource_type} {name} added.")
-        process_routing_object(current_items[name], resource_type)
 
-    deleted = previous_names - current_names
-    for name in deleted:
-        namespace = previous_items[name]["metadata"]["namespace"]
-        monitor_name = f"{name}-{namespace}"
-        logger.info(f"{resource_type} {name} deleted.")
-        delete_monitor(monitor_name)
+def report_annotation_errors(key, routing_object):
+    errors = routing_object.probe.errors
+    if errors:
+        kind, namespace, name = key
+        metrics.ANNOTATION_ERRORS.labels(kind).inc(len(errors))
+        logger.warning(f"{kind} {namespace}/{name} has invalid annotations: {'; '.join(errors)}")
 
-    modified = current_names & previous_names
-    for name in modified:
-        if ingressroute_changed(previous_items[name], current_items[name]):
-            logger.info(f"{resource_type} {name} modified.")
-            process_routing_object(current_items[name], resource_type)
 
-    return current_items
+def count_routing_object_change():
+    global routing_object_changes
+    routing_object_changes += 1
+
+
+def on_routing_object_added(key, routing_object):
+    kind, namespace, name = key
+    count_routing_object_change()
+    logger.info(f"{kind} {namespace}/{name} added.")
+    report_annotation_errors(key, routing_object)
+    set_desired_monitors(key, process_routes(routing_object))
+    reconcile()
+
+
+def on_routing_object_updated(key, old, new, item):
+    kind, namespace, name = key
+    if ingressroute_changed(old, new):
+        logger.info(f"{kind} {namespace}/{name} modified.")
+        count_routing_object_change()
+        report_annotation_errors(key, new)
+        set_desired_monitors(key, process_routes(new))
+        reconcile()
+
+
+def on_routing_object_deleted(key, routing_object):
+    kind, namespace, name = key
+    logger.info(f"{kind} {namespace}/{name} deleted.")
+    count_routing_object_change()
+    set_desired_monitors(key, {})
+    reconcile()
+
+
+def new_object_store():
+    # Objects are kept as RoutingObject records: comparing two records tells
+    # whether the monitors need to change.
+    store = ObjectStore(
+        indexers={"namespace": index_by_namespace, "host": index_by_host},
+        transform=lambda kind, item: parse_routing_object(item, kind),
+    )
+    store.add_event_handler(
+        on_add=on_routing_object_added,
+        on_update=on_routing_object_updated,
+        on_delete=on_routing_object_deleted,
+    )
+    return store
+
+
+object_store = new_object_store()
+
+
+def handle_changes(pages, resource_type, namespace=None):
+    """Apply listed pages to the object store; returns the resourceVersion, or None if the listing failed."""
+    if event_recorder is not None:
+        pages = event_recorder.record_pages(pages, resource_type, namespace)
+    with metrics.track_duration(metrics.SYNC_DURATION, resource_type, "list"):
+        seen = set()
+        resource_version = None
+        complete = False
+        for page in pages:
+            metadata = page.get("metadata") or {}
+            resource_version = metadata.get("resourceVersion")
+            complete = "metadata" in page and not metadata.get("continue")
+            for item in page["items"]:
+                with state_lock:
+                    if routing_object_selected(resource_type, item):
+                        seen.add(object_store.upsert(resource_type, item))
+
+        if not complete:
+            return None
+        with state_lock:
+            # Objects outside this listing, or handed over to another shard,
+            # are not this listing's to delete.
+            seen.update(
+                key for key in object_store.keys(resource_type)
+                if (namespace is not None and key[1] != namespace) or not namespace_selected(key[1])
+            )
+            object_store.prune(resource_type, seen)
+            record_resource_version(resource_scope(resource_type, namespace), resource_version)
+        reconcile(full=True)
+
+    metrics.KUBERNETES_OBJECTS.labels(resource_type).set(object_store.count(resource_type))
+    metrics.LAST_SUCCESSFUL_SYNC.labels(resource_type).set(time.time())
+    return resource_version
+
+
+def record_resource_version(resource_type, resource_version):
+    global state_changes
+    with state_lock:
+        if resource_version:
+            resource_versions[resource_type] = resource_version
+        state_changes += 1
 
 
 def ingressroute_changed(old, new):
@@ -310,74 +982,235 @@ def ingressroute_changed(old, new):
 def watch_ingress_resources():
     if WATCH_INGRESSROUTES:
         logger.info("Start watching Traefik Ingress Routes")
-        previous_ingressroutes = {}
     if WATCH_INGRESS:
         logger.info("Start watching Kubernetes Ingress Object")
-        previous_ingress = {}
 
+    scheduler = PollScheduler(WATCH_INTERVAL, WATCH_MAX_INTERVAL, WATCH_JITTER)
     while True:
-        if WATCH_INGRESSROUTES:
-            current_ingressroutes = get_ingressroutes(custom_api_instance)
-            current_items = {
-                item["metadata"]["name"]: item
-                for item in current_ingressroutes["items"]
-            }
-            previous_ingressroutes = handle_changes(
-                previous_ingressroutes, current_items, "IngressRoute"
-            )
+        started = time.monotonic()
+        changes = routing_object_changes
+        for namespace in watch_scopes():
+            if WATCH_INGRESSROUTES:
+                handle_changes(get_ingressroutes(custom_api_instance, namespace), "IngressRoute", namespace)
+
+            if WATCH_INGRESS:
+                handle_changes(get_ingress(networking_api_instance, namespace), "Ingress", namespace)
+
+        delay = scheduler.next_delay(time.monotonic() - started, routing_object_changes != changes)
+        logger.debug(f"Next poll in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def list_routing_objects(resource_type, namespace=None):
+    if resource_type == "IngressRoute":
+        return get_ingressroutes(custom_api_instance, namespace)
+    return get_ingress(networking_api_instance, namespace)
+
+
+def handle_event(event_type, item, resource_type):
+    metrics.KUBERNETES_EVENTS.labels(resource_type, event_type).inc()
+    if event_recorder is not None:
+        event_recorder.record_event(resource_type, event_type, item)
+    with metrics.track_duration(metrics.SYNC_DURATION, resource_type, "event"), state_lock:
+        # An object that no longer matches the client-side filters is gone for us.
+        if event_type == "DELETED" or not routing_object_selected(resource_type, item):
+            object_store.delete(object_key(resource_type, item))
+        else:
+            object_store.upsert(resource_type, item)
+    metrics.KUBERNETES_OBJECTS.labels(resource_type).set(object_store.count(resource_type))
+
+
+def raw_watch_events(w, func, **kwargs):
+    # deserialize=False skips building a model per event only to drop it.
+    events = w.stream(func, deserialize=False, **kwargs)
+    while True:
+        try:
+            event = next(events)
+        except StopIteration:
+            return
+        except KeyError:
+            # The client reads ERROR events (410 Gone once the resourceVersion
+            # has expired) through a key only deserialized events have.
+            raise ApiException(status=410, reason="Watch ended with an error event")
+        yield event
+
+
+def stream_routing_object_events(resource_type, resource_version, namespace=None):
+    if resource_type == "IngressRoute":
+        func = custom_api_instance.list_cluster_custom_object
+        kwargs = dict(group=get_ingressroute_group(), version="v1alpha1", plural="ingressroutes")
+        if namespace is not None:
+            func = custom_api_instance.list_namespaced_custom_object
+            kwargs["namespace"] = namespace
+    elif namespace is not None:
+        func = networking_api_instance.list_namespaced_ingress
+        kwargs = dict(namespace=namespace)
+    else:
+        func = networking_api_instance.list_ingress_for_all_namespaces
+        kwargs = {}
+    kwargs.update(list_selectors())
+
+    w = watch.Watch()
+    for event in raw_watch_events(
+        w,
+        func,
+        resource_version=resource_version,
+        allow_watch_bookmarks=True,
+        timeout_seconds=WATCH_TIMEOUT,
+        **kwargs,
+    ):
+        # Events are left as dicts, so the client does not track the
+        # resourceVersion itself; it resumes from w.resource_version.
+        w.resource_version = (event["object"].get("metadata") or {}).get("resourceVersion") or w.resource_version
+        if event["type"] == "BOOKMARK":
+            continue
+        item = project_routing_object(resource_type, event["object"])
+        handle_event(event["type"], item, resource_type)
+        record_resource_version(resource_scope(resource_type, namespace), w.resource_version)
+    return w.resource_version or resource_version
+
+
+def watch_routing_objects(resource_type, namespace=None):
+    scope = resource_scope(resource_type, namespace)
+    logger.info(f"Start watching {scope} events")
+    # Resume from the checkpoint, if any; a 410 falls back to a relist.
+    resource_version = resource_versions.get(scope)
+    forbidden = 0
 
-        if WATCH_INGRESS:
-            current_ingress = get_ingress(networking_api_instance)
-            current_items = {
-                item["metadata"]["name"]: item for item in current_ingress["items"]
-            }
-            previous_ingress = handle_changes(
-                previous_ingress, current_items, "Ingress"
-            )
+    while True:
+        try:
+            if resource_version is None:
+                resource_version = handle_changes(list_routing_objects(resource_type, namespace), resource_type, namespace)
+                if resource_version is None:
+                    # Listing failed, keep the known objects and try again later.
+                    time.sleep(WATCH_INTERVAL)
+                    continue
+
+            resource_version = stream_routing_object_events(resource_type, resource_version, namespace)
+            forbidden = 0
+        except ApiException as e:
+            if e.status == 410:
+                logger.info(f"{scope} watch expired, relisting")
+                resource_version = None
+            elif e.status == 403:
+                # RBAC granting list but not watch: relist meanwhile, and
+                # poll for good if it persists.
+                forbidden += 1
+                if forbidden >= WATCH_FORBIDDEN_LIMIT:
+                    logger.warning(f"Not allowed to watch {scope}, falling back to polling. Grant the watch verb to use watch mode.")
+                    poll_routing_objects(resource_type, namespace)
+                    return
+                logger.error(f"Failed to watch {scope}: {e}")
+                resource_version = None
+                time.sleep(WATCH_INTERVAL)
+            else:
+                logger.error(f"Failed to watch {scope}: {e}")
+                time.sleep(WATCH_INTERVAL)
+        except Exception as e:
+            logger.error(f"Failed to watch {scope}: {e}")
+            time.sleep(WATCH_INTERVAL)
+
+
+def poll_routing_objects(resource_type, namespace=None):
+    scheduler = PollScheduler(WATCH_INTERVAL, WATCH_MAX_INTERVAL, WATCH_JITTER)
+    while True:
+        started = time.monotonic()
+        changes = routing_object_changes
+        handle_changes(list_routing_objects(resource_type, namespace), resource_type, namespace)
+        time.sleep(scheduler.next_delay(time.monotonic() - started, routing_object_changes != changes))
 
-        time.sleep(WATCH_INTERVAL)
+
+def stream_ingress_resources():
+    resource_types = []
+    if WATCH_INGRESSROUTES:
+        resource_types.append("IngressRoute")
+    if WATCH_INGRESS:
+        resource_types.append("Ingress")
+
+    threads = [
+        threading.Thread(target=watch_routing_objects, args=(resource_type, namespace), daemon=True)
+        for resource_type in resource_types
+        for namespace in watch_scopes()
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def parse_monitor_entry(entry):
+    """Validate one monitor file entry; raises ValueError or KeyError when it is invalid."""
+    if not isinstance(entry, dict):
+        raise ValueError(f"Invalid entry format: {entry}")
+    if "name" not in entry or "url" not in entry:
+        raise KeyError(f"Missing required fields in entry: {entry}")
+    if not isinstance(entry["name"], str) or not isinstance(entry["url"], str):
+        raise ValueError("Invalid entry format - name and url must be strings")
+
+    interval = entry.get("interval", 60)
+    if type(interval) is not int or interval <= 0:
+        raise ValueError("Invalid entry format - interval must be a positive integer")
+
+    statuscodes = entry.get("accepted-statuscodes")
+    if statuscodes is not None and type(statuscodes) is not list:
+        raise ValueError("Invalid entry format - accepted-statuscodes must be a list")
+
+    headers = entry.get("headers", {})
+    return DesiredMonitor(
+        name=entry["name"],
+        url=entry["url"],
+        interval=interval,
+        probe_type=entry.get("type", "http"),
+        # Kept as a JSON string, which is also what Uptime Kuma stores.
+        headers=headers if headers is None or isinstance(headers, str) else json.dumps(headers),
+        method=entry.get("method", "GET"),
+        parent=entry.get("parent"),
+        accepted_statuscodes=tuple(statuscodes) if statuscodes is not None else None,
+    )
 
 
 def process_monitor_file(file_path):
+    """Apply one monitor file, parsing its entries as they are read."""
+    source = ("File", file_path)
     try:
+        monitors = {}
+        entries = 0
         with open(file_path, "r") as file:
-            file_content = file.read()
+            try:
+                for entry in iter_entries(file):
+                    entries += 1
+                    try:
+                        monitor = parse_monitor_entry(entry)
+                    except (ValueError, KeyError) as e:
+                        logger.warning(f"Skipping invalid entry: {entry} ({str(e)})")
+                        continue
+                    monitors[monitor.name] = monitor
+            except yaml.YAMLError as e:
+                logger.error(
+                    f"Failed to process file {file_path}: Invalid YAML format ({str(e)})"
+                )
+                # The monitors read so far are dropped, the previous ones kept.
+                return
 
-        if not file_content.strip():
+        if not entries:
             logger.info(f"The file {file_path} is empty or contains only whitespace.")
+            if source in desired_by_source:
+                # Emptied on reload: its monitors go away.
+                set_desired_monitors(source, {})
+                reconcile()
             return
 
-        try:
-            ingress_data = yaml.safe_load(file_content)
-        except yaml.YAMLError as e:
-            logger.error(
-                f"Failed to process file {file_path}: Invalid YAML format ({str(e)})"
-            )
-            return
-
-        for entry in ingress_data:
-            try:
-                if not isinstance(entry, dict):
-                    raise ValueError(f"Invalid entry format: {entry}")
-                if "name" not in entry or "url" not in entry:
-                    raise KeyError(f"Missing required fields in entry: {entry}")
-
-                statuscodes = entry.get("accepted-statuscodes")
-                if statuscodes is not None and type(statuscodes) is not list:
-                    raise ValueError("Invalid entry format - accepted-statuscodes must be a list")
-
-                create_or_update_monitor(
-                    entry.get("name"),
-                    entry.get("url"),
-                    entry.get("interval", 60),
-                    entry.get("type", "http"),
-                    entry.get("headers", {}),
-                    entry.get("method", "GET"),
-                    entry.get("parent"),
-                    statuscodes
-                )
-            except (ValueError, KeyError) as e:
-                logger.warning(f"Skipping invalid entry: {entry} ({str(e)})")
+        with desired_lock:
+            previous = desired_by_source.get(source, {})
+            changed = sum(1 for name, monitor in monitors.items() if previous.get(name, monitor) != monitor)
+            added = len(monitors.keys() - previous.keys())
+            removed = len(previous.keys() - monitors.keys())
+            set_desired_monitors(source, monitors)
+        logger.info(
+            f"Loaded {len(monitors)} monitors from {file_path}: "
+            f"{added} added, {changed} changed, {removed} removed"
+        )
+        reconcile()
 
     except FileNotFoundError:
         logger.error(f"File {file_path} not found.")
@@ -387,17 +1220,288 @@ def process_monitor_file(file_path):
         )
 
 
+def file_sources():
+    with desired_lock:
+        return [source for source in desired_by_source if source[0] == "File"]
+
+
+def forget_file_source(source):
+    set_desired_monitors(source, {})
+    reconcile()
+
+
+def load_monitor_files(path):
+    """Apply the monitor file, or each file of the directory, at ``path``."""
+    files = monitor_files(path)
+    for file_path in files:
+        process_monitor_file(file_path)
+    for source in file_sources():
+        if source[1] not in files:
+            forget_file_source(source)
+
+
+def reload_monitor_file(file_path):
+    # With sharding, only the replica owning the file applies it.
+    if SHARDING_ENABLED and (shard_ring is None or not shard_owns(MONITOR_FILE_SHARD_KEY)):
+        return
+    if file_path != FILE_MONITOR_PATH and not os.path.exists(file_path):
+        # A file removed from the monitor directory.
+        forget_file_source(("File", file_path))
+        return
+    process_monitor_file(file_path)
+
+
+def start_monitor_file_watch():
+    """Reload the monitor file when it changes, e.g. when its ConfigMap is updated."""
+    global monitor_file_watcher
+    monitor_file_watcher = FileWatcher(
+        FILE_MONITOR_PATH,
+        reload_monitor_file,
+        FILE_MONITOR_POLL_INTERVAL,
+        list_files=lambda: monitor_files(FILE_MONITOR_PATH),
+    )
+    # Primed before the first load, so a change made meanwhile is not missed.
+    monitor_file_watcher.prime()
+    monitor_file_watcher.start()
+    shutdown_hooks.append(monitor_file_watcher.stop)
+
+
+def save_state(path):
+    """Checkpoint the routing objects, their monitors, the monitor ids and the resourceVersions."""
+    with state_file_lock:
+        with state_lock, desired_lock:
+            changes = state_changes
+            state = {
+                "version": STATE_VERSION,
+                "saved_at": time.time(),
+                "resource_versions": dict(resource_versions),
+                "objects": [
+                    {
+                        "key": list(key),
+                        "uid": uid,
+                        "object": routing_object.to_dict(),
+                        "index": index_values,
+                        "monitors": {
+                            name: monitor.to_dict() if monitor is not None else None
+                            for name, monitor in desired_by_source.get(key, {}).items()
+                        },
+                    }
+                    for key, routing_object, uid, index_values in object_store.snapshot()
+                ],
+                # Without them, the full reconcile after a restart would delete
+                # the file's monitors before the file is read again.
+                "files": {
+                    source[1]: {
+                        name: monitor.to_dict() if monitor is not None else None
+                        for name, monitor in desired_by_source[source].items()
+                    }
+                    for source in file_sources()
+                },
+                "managed_monitors": sorted(managed_monitors),
+            }
+        with monitor_index_lock:
+            state["monitors"] = [dict(entry, name=name) for name, entry in monitor_index.items()]
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(state, file, default=str)
+        os.replace(tmp_path, path)
+        logger.debug(f"Saved state of {len(state['objects'])} objects to {path}")
+        return changes
+
+
+def load_state(path):
+    """Restore a checkpoint written by save_state; returns True when one was loaded."""
+    try:
+        with open(path, "r") as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        logger.info(f"No state file at {path}, starting from scratch.")
+        return False
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable state file {path}: {e}")
+        return False
+    if state.get("version") != STATE_VERSION:
+        logger.warning(f"Ignoring state file {path} with unsupported version {state.get('version')}")
+        return False
+
+    with state_lock, desired_lock:
+        for entry in state["objects"]:
+            key = tuple(entry["key"])
+            if not namespace_selected(key[1]):
+                # No longer watched: its monitors go with the next full reconcile.
+                continue
+            object_store.restore(key, RoutingObject.from_dict(entry["object"]), entry["uid"], entry["index"])
+            set_desired_monitors(key, {
+                name: DesiredMonitor.from_dict(monitor) if monitor is not None else None
+                for name, monitor in entry["monitors"].items()
+            })
+        if LOAD_MONITOR_FROM_FILE:
+            for file_path, monitors in state.get("files", {}).items():
+                set_desired_monitors(("File", file_path), {
+                    name: DesiredMonitor.from_dict(monitor) if monitor is not None else None
+                    for name, monitor in monitors.items()
+                })
+        managed_monitors.update(state["managed_monitors"])
+        resource_versions.update(state["resource_versions"])
+        # The checkpoint was in sync; the full reconcile after startup
+        # catches anything that drifted while the controller was down.
+        dirty_monitors.clear()
+    # Monitors may have been edited or deleted in Uptime Kuma while the
+    # controller was down: the restored index is stale, and is refreshed
+    # before its first use unless the monitor list pushed on login comes first.
+    load_monitor_index(state["monitors"])
+    invalidate_monitor_index()
+    logger.info(
+        f"Restored {len(state['objects'])} objects from {path}, "
+        f"resuming from resourceVersions {state['resource_versions']}"
+    )
+    return True
+
+
+def checkpoint_state(path, interval):
+    saved = None
+    while True:
+        time.sleep(interval)
+        if saved == state_changes:
+            continue
+        try:
+            saved = save_state(path)
+        except Exception as e:
+            logger.error(f"Failed to save state to {path}: {e}")
+
+
+def start_state_checkpoints(path, interval):
+    threading.Thread(target=checkpoint_state, args=(path, interval), name="state-checkpoint", daemon=True).start()
+    shutdown_hooks.append(lambda: save_state(path))
+
+
+def start_event_recording(path):
+    global event_recorder
+    event_recorder = EventRecorder(path)
+    shutdown_hooks.append(event_recorder.close)
+    logger.info(f"Recording Kubernetes changes to {path}")
+
+
+def relist_routing_objects():
+    for namespace in watch_scopes():
+        if WATCH_INGRESSROUTES:
+            handle_changes(list_routing_objects("IngressRoute", namespace), "IngressRoute", namespace)
+        if WATCH_INGRESS:
+            handle_changes(list_routing_objects("Ingress", namespace), "Ingress", namespace)
+
+
+def on_shard_members_changed(members):
+    """Hand over the namespaces now owned by another replica and pick up the gained ones."""
+    global shard_ring
+    initial = shard_ring is None
+    with state_lock:
+        shard_ring = HashRing(members)
+        released = 0
+        for key in object_store.keys():
+            if not namespace_selected(key[1]):
+                object_store.discard(key)
+                forget_desired_monitors(key)
+                released += 1
+        owns_file = LOAD_MONITOR_FROM_FILE and shard_owns(MONITOR_FILE_SHARD_KEY)
+        if LOAD_MONITOR_FROM_FILE and not owns_file:
+            for source in file_sources():
+                forget_desired_monitors(source)
+    logger.info(f"Shard {SHARD_IDENTITY} is one of {len(members)} replicas, released {released} objects")
+
+    if owns_file and (initial or not file_sources()):
+        load_monitor_files(FILE_MONITOR_PATH)
+    if not initial:
+        relist_routing_objects()
+
+
+def start_sharding():
+    global shard_membership
+    shard_membership = LeaseMembership(
+        coordination_api_instance,
+        SHARD_LEASE_NAMESPACE,
+        SHARD_GROUP,
+        SHARD_IDENTITY,
+        lease_duration=SHARD_LEASE_DURATION,
+        renew_interval=SHARD_RENEW_INTERVAL,
+        on_change=on_shard_members_changed,
+    )
+    shard_membership.start()
+    shutdown_hooks.append(shard_membership.leave)
+
+
+def on_started_leading():
+    metrics.LEADER.set(1)
+    # Diff the warm caches against Uptime Kuma; only what changed while on
+    # standby, or what the previous leader left unwritten, gets written.
+    reconcile(full=True)
+
+
+def on_stopped_leading():
+    metrics.LEADER.set(0)
+
+
+def start_leader_election():
+    global leader_elector
+    leader_elector = LeaderElector(
+        coordination_api_instance,
+        LEADER_ELECTION_NAMESPACE,
+        LEADER_ELECTION_LEASE_NAME,
+        SHARD_IDENTITY,
+        lease_duration=LEADER_ELECTION_LEASE_DURATION,
+        renew_interval=LEADER_ELECTION_RENEW_INTERVAL,
+        on_started_leading=on_started_leading,
+        on_stopped_leading=on_stopped_leading,
+    )
+    leader_elector.start()
+    shutdown_hooks.append(leader_elector.release)
+    if not leader_elector.is_leader:
+        logger.info(f"{SHARD_IDENTITY} is on standby, {leader_elector.holder} is the leader")
+
+
+def on_sigterm(signum, frame):
+    for hook in shutdown_hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.error(f"Shutdown step failed: {e}")
+    sys.exit(0)
+
+
 def main():
     check_config()
+    if METRICS_PORT:
+        metrics.start_metrics_server(METRICS_PORT)
+    restored = STATE_FILE and load_state(STATE_FILE)
+    if RECORD_EVENTS_FILE:
+        start_event_recording(RECORD_EVENTS_FILE)
     init_kuma_api()
-
-    if LOAD_MONITOR_FROM_FILE:
+    if WATCH_INGRESSROUTES or WATCH_INGRESS or SHARDING_ENABLED or LEADER_ELECTION_ENABLED:
+        init_kubernetes_client()
+    if LEADER_ELECTION_ENABLED:
+        # The first leader reconciles when it takes the Lease.
+        start_leader_election()
+    if LOAD_MONITOR_FROM_FILE and FILE_MONITOR_WATCH:
+        start_monitor_file_watch()
+    # The shard that owns the monitor file processes it once it has joined.
+    if LOAD_MONITOR_FROM_FILE and not SHARDING_ENABLED:
         logger.info("File-based Monitor creation is enabled.")
-        process_monitor_file(FILE_MONITOR_PATH)
+        load_monitor_files(FILE_MONITOR_PATH)
+    # Only after the file is loaded, or its monitors would look unwanted.
+    if restored and not LEADER_ELECTION_ENABLED:
+        reconcile(full=True)
+    if STATE_FILE:
+        start_state_checkpoints(STATE_FILE, STATE_SAVE_INTERVAL)
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    if SHARDING_ENABLED:
+        start_sharding()
 
     if WATCH_INGRESSROUTES or WATCH_INGRESS:
-        init_kubernetes_client()
-        watch_ingress_resources()
+        if WATCH_MODE == "poll":
+            watch_ingress_resources()
+        else:
+            stream_ingress_resources()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+import ctypes
+import ctypes.util
+import hashlib
+import logging
+import os
+import select
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# A ConfigMap update swaps the ..data symlink in the mount directory, so the
+# directory is watched rather than the file itself.
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def inotify_fd(directory):
+    """An inotify descriptor watching ``directory``, or None where inotify
+    is not available."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (AttributeError, OSError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def drain(fd):
+    """Read pending events; only whether something happened matters."""
+    try:
+        while True:
+            data = os.read(fd, 64 * (EVENT_HEADER.size + 256))
+            if not data:
+                return
+    except BlockingIOError:
+        return
+
+
+class FileWatcher:
+    """Calls ``on_change(file)`` for each watched file whose content changed.
+
+    The watched files are ``path`` itself, or what ``list_files()`` returns,
+    e.g. the files of a directory; a file that appears or disappears counts
+    as changed. Changes are noticed through inotify on the directory when it
+    is available, and in any case by checking every ``poll_interval``
+    seconds. A check compares the stat of each resolved file (which catches
+    symlink swaps) and, when it differs, a hash of the content, so a touch
+    or a ConfigMap resync with the same data does not trigger a reload.
+    """
+
+    def __init__(self, path, on_change, poll_interval=10, list_files=None):
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.list_files = list_files or (lambda: [path])
+        self._stats = {}
+        self._digests = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def fingerprint(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    @staticmethod
+    def digest(file_path):
+        sha = hashlib.sha256()
+        try:
+            with open(file_path, "rb") as file:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    sha.update(chunk)
+        except OSError:
+            return None
+        return sha.hexdigest()
+
+    def prime(self):
+        """Take the current content as already applied."""
+        for file_path in self.list_files():
+            self._stats[file_path] = self.fingerprint(file_path)
+            self._digests[file_path] = self.digest(file_path)
+
+    def changed_files(self):
+        files = self.list_files()
+        changed = []
+        for file_path in files + [file_path for file_path in self._stats if file_path not in files]:
+            stat = self.fingerprint(file_path)
+            if stat == self._stats.get(file_path):
+                continue
+            self._stats[file_path] = stat
+            digest = self.digest(file_path)
+            if digest == self._digests.get(file_path):
+                continue
+            self._digests[file_path] = digest
+            if digest is None:
+                del self._stats[file_path], self._digests[file_path]
+            changed.append(file_path)
+        return changed
+
+    def check(self):
+        """Call ``on_change`` for each changed file; return whether any did."""
+        changed = self.changed_files()
+        for file_path in changed:
+            logger.info(f"{file_path} changed, reloading it")
+            try:
+                self.on_change(file_path)
+            except Exception as e:
+                logger.error(f"Failed to reload {file_path}: {e}")
+        return bool(changed)
+
+    def run(self):
+        path = os.path.abspath(self.path)
+        fd = inotify_fd(path if os.path.isdir(path) else os.path.dirname(path))
+        if fd is None:
+            logger.info(f"inotify is not available, checking {self.path} every {self.poll_interval}s")
+        try:
+            while not self._stop.is_set():
+                if fd is None:
+                    self._stop.wait(self.poll_interval)
+                else:
+                    ready, _, _ = select.select([fd], [], [], self.poll_interval)
+                    if ready:
+                        drain(fd)
+                        # Let a burst of events (a symlink swap is several) settle.
+                        self._stop.wait(0.1)
+                        drain(fd)
+                if not self._stop.is_set():
+                    self.check()
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="monitor-file-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
@@ -0,0 +1,228 @@
+import itertools
+import logging
+import threading
+import time
+
+from socketio.exceptions import SocketIOError
+from uptime_kuma_api import Event, Timeout, UptimeKumaException
+
+from kuma_ingress_watcher import metrics
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_ERRORS = (SocketIOError, OSError, Timeout)
+
+
+class KumaUnavailable(UptimeKumaException):
+    """Raised, without contacting Uptime Kuma, while a reconnect backs off."""
+
+
+def not_logged_in(error):
+    return isinstance(error, UptimeKumaException) and "not logged in" in str(error).lower()
+
+
+class KumaConnection:
+    def __init__(self, index):
+        self.index = index
+        self.api = None
+        self.needs_login = False
+        self.failures = 0
+        self.retry_at = 0.0
+        self.opened = False
+        self.lock = threading.Lock()
+
+    @property
+    def healthy(self):
+        api = self.api
+        return api is not None and api.sio.connected and not self.needs_login
+
+
+class KumaSession:
+    """Authenticated connections to Uptime Kuma, kept alive across restarts.
+
+    Stands in for an UptimeKumaApi: ``session.add_monitor(...)`` runs on one
+    of ``pool_size`` connections, picked in turn. A connection found down is
+    reopened, with an exponential backoff between ``base_delay`` and
+    ``max_delay`` seconds, and logged in again, with the token of the last
+    password login when Uptime Kuma still accepts it. A call refused because
+    the socket lost its login is retried once after logging in again; other
+    failures are raised, as a write may have been applied before the
+    connection dropped.
+
+    Every ``heartbeat_interval`` seconds a background thread checks each
+    connection with a cheap authenticated call and reopens the broken ones,
+    so a restarted Uptime Kuma is noticed before the next write.
+    ``on_connect(api)`` is called for each new primary connection before it
+    logs in, and ``on_reconnect()`` from the heartbeat thread once a
+    connection has been reopened.
+    """
+
+    def __init__(
+        self,
+        connect,
+        username,
+        password,
+        pool_size=1,
+        heartbeat_interval=30,
+        base_delay=1,
+        max_delay=300,
+        on_connect=None,
+        on_reconnect=None,
+    ):
+        self._connect = connect
+        self._username = username
+        self._password = password
+        self.token = None
+        self.heartbeat_interval = heartbeat_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_connect = on_connect
+        self.on_reconnect = on_reconnect
+        self.connections = [KumaConnection(index) for index in range(max(1, pool_size))]
+        self._next_connection = itertools.cycle(self.connections)
+        self._reconnected = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    def open(self):
+        """Open every connection; raises if one of them cannot be opened."""
+        for connection in self.connections:
+            self.ensure(connection)
+
+    def call(self, method, /, *args, **kwargs):
+        connection = next(self._next_connection)
+        api = self.ensure(connection)
+        try:
+            return getattr(api, method)(*args, **kwargs)
+        except Exception as e:
+            if not_logged_in(e):
+                logger.info(f"Uptime Kuma connection {connection.index} lost its login, logging in again")
+                connection.needs_login = True
+                return getattr(self.ensure(connection), method)(*args, **kwargs)
+            if isinstance(e, CONNECTION_ERRORS):
+                self.mark_broken(connection, e)
+            raise
+
+    def ensure(self, connection):
+        """The API of ``connection``, reconnected and logged in if needed."""
+        if connection.healthy:
+            return connection.api
+        with connection.lock:
+            if connection.healthy:
+                return connection.api
+            if time.monotonic() < connection.retry_at:
+                raise KumaUnavailable(
+                    f"Uptime Kuma is unavailable, next attempt in {connection.retry_at - time.monotonic():.0f}s"
+                )
+            reconnect = connection.opened
+            try:
+                api = connection.api
+                if api is None or not api.sio.connected:
+                    self.close_api(api)
+                    connection.api = None
+                    api = self._connect()
+                    self.watch_reconnects(connection, api)
+                    if connection.index == 0 and self.on_connect:
+                        self.on_connect(api)
+                    connection.api = api
+                self.login(api)
+            except Exception as e:
+                connection.failures += 1
+                delay = min(self.max_delay, self.base_delay * 2 ** (connection.failures - 1))
+                connection.retry_at = time.monotonic() + delay
+                logger.error(f"Failed to connect to Uptime Kuma (attempt {connection.failures}, retrying in {delay:g}s): {e}")
+                raise
+            connection.needs_login = False
+            connection.opened = True
+            connection.failures = 0
+            connection.retry_at = 0.0
+        if reconnect:
+            logger.info(f"Uptime Kuma connection {connection.index} restored")
+            metrics.KUMA_RECONNECTS.inc()
+            self._reconnected.set()
+            self._wake.set()
+        return api
+
+    def watch_reconnects(self, connection, api):
+        # socket.io reconnects by itself, but the new socket is not logged in.
+        def on_connect():
+            api._event_connect()
+            connection.needs_login = True
+            self._wake.set()
+
+        api.sio.on(Event.CONNECT, on_connect)
+
+    def login(self, api):
+        if self.token:
+            try:
+                api.login_by_token(self.token)
+                return
+            except CONNECTION_ERRORS:
+                raise
+            except UptimeKumaException as e:
+                logger.info(f"Uptime Kuma token rejected ({e}), logging in with the password")
+        response = api.login(self._username, self._password)
+        self.token = response.get("token") if isinstance(response, dict) else None
+
+    def mark_broken(self, connection, error):
+        logger.warning(f"Uptime Kuma connection {connection.index} failed ({error}), reconnecting")
+        with connection.lock:
+            self.close_api(connection.api)
+            connection.api = None
+        self._wake.set()
+
+    @staticmethod
+    def close_api(api):
+        if api is None:
+            return
+        try:
+            api.disconnect()
+        except Exception as e:
+            logger.debug(f"Ignoring error while disconnecting from Uptime Kuma: {e}")
+
+    def heartbeat(self):
+        for connection in self.connections:
+            try:
+                self.ensure(connection).get_settings()
+            except KumaUnavailable:
+                pass
+            except Exception as e:
+                if not_logged_in(e):
+                    connection.needs_login = True
+                    self._wake.set()
+                elif connection.api is not None:
+                    self.mark_broken(connection, e)
+        if self._reconnected.is_set():
+            self._reconnected.clear()
+            if self.on_reconnect:
+                try:
+                    self.on_reconnect()
+                except Exception as e:
+                    logger.error(f"Failed to resync after reconnecting to Uptime Kuma: {e}")
+
+    def run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.heartbeat_interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self.heartbeat()
+                # A reconnect attempt wakes the loop; don't spin while backing off.
+                self._stop.wait(min(self.base_delay, self.heartbeat_interval))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="kuma-heartbeat", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        for connection in self.connections:
+            with connection.lock:
+                self.close_api(connection.api)
+                connection.api = None
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+
+from kubernetes.client.rest import ApiException
+
+from kuma_ingress_watcher.sharding import micro_time
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    """Leader election on a single Kubernetes Lease.
+
+    The leader renews the Lease every ``renew_interval`` seconds. The other
+    replicas take it over once its holder and renewTime have not changed for
+    the Lease duration, timed on their own clock so skew between nodes does
+    not matter. Every write carries the resourceVersion that was read, so of
+    two replicas racing for an expired Lease only one wins.
+
+    A leader that could not renew for ``lease_duration`` seconds steps down,
+    since the others may already have taken over. ``on_started_leading`` and
+    ``on_stopped_leading`` are called from the election thread on each
+    transition.
+    """
+
+    def __init__(
+        self,
+        api,
+        namespace,
+        name,
+        identity,
+        lease_duration=15,
+        renew_interval=5,
+        on_started_leading=None,
+        on_stopped_leading=None,
+    ):
+        self.api = api
+        self.namespace = namespace
+        self.name = name
+        self.identity = identity
+        self.lease_duration = lease_duration
+        self.renew_interval = renew_interval
+        self.on_started_leading = on_started_leading
+        self.on_stopped_leading = on_stopped_leading
+        self.is_leader = False
+        self.holder = None
+        self._observed = None
+        self._observed_at = None
+        self._renewed_at = None
+        self._stopped = threading.Event()
+
+    def try_acquire_or_renew(self):
+        """Take or renew the Lease; returns False while another replica holds it.
+
+        Raises ApiException when the Lease could not be read or written,
+        including a 409 Conflict when another replica wrote it first.
+        """
+        now = micro_time()
+        try:
+            lease = self.api.read_namespaced_lease(self.name, self.namespace)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            body = {
+                "metadata": {"name": self.name},
+                "spec": {
+                    "holderIdentity": self.identity,
+                    "leaseDurationSeconds": self.lease_duration,
+                    "acquireTime": now,
+                    "renewTime": now,
+                    "leaseTransitions": 0,
+                },
+            }
+            self.api.create_namespaced_lease(self.namespace, body)
+            self.holder = self.identity
+            return True
+
+        spec = lease.spec
+        self.holder = spec.holder_identity
+        observed = (spec.holder_identity, spec.renew_time)
+        if observed != self._observed:
+            self._observed = observed
+            self._observed_at = time.monotonic()
+        duration = spec.lease_duration_seconds or self.lease_duration
+        held_by_other = spec.holder_identity and spec.holder_identity != self.identity
+        if held_by_other and time.monotonic() - self._observed_at < duration:
+            return False
+
+        renewing = spec.holder_identity == self.identity
+        transitions = spec.lease_transitions or 0
+        body = {
+            "metadata": {"name": self.name, "resourceVersion": lease.metadata.resource_version},
+            "spec": {
+                "holderIdentity": self.identity,
+                "leaseDurationSeconds": self.lease_duration,
+                "acquireTime": micro_time(spec.acquire_time) if renewing and spec.acquire_time else now,
+                "renewTime": now,
+                "leaseTransitions": transitions if renewing else transitions + 1,
+            },
+        }
+        self.api.replace_namespaced_lease(self.name, self.namespace, body)
+        self.holder = self.identity
+        return True
+
+    def step(self):
+        try:
+            leading = self.try_acquire_or_renew()
+            if leading:
+                self._renewed_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Failed to acquire or renew leader lease {self.name}: {e}")
+            # Keep leading until the Lease would have expired for the others.
+            leading = self.is_leader and time.monotonic() - self._renewed_at < self.lease_duration
+        self._set_leader(leading)
+
+    def _set_leader(self, leading):
+        if leading == self.is_leader:
+            return
+        self.is_leader = leading
+        if leading:
+            logger.info(f"{self.identity} became the leader")
+            if self.on_started_leading:
+                self.on_started_leading()
+        else:
+            logger.info(f"{self.identity} is no longer the leader, current holder: {self.holder}")
+            if self.on_stopped_leading:
+                self.on_stopped_leading()
+
+    def run(self):
+        while not self._stopped.wait(self.renew_interval):
+            self.step()
+
+    def start(self):
+        self.step()
+        threading.Thread(target=self.run, name="leader-election", daemon=True).start()
+
+    def release(self):
+        """Stop campaigning and, when leading, hand the Lease over right away."""
+        self._stopped.set()
+        if not self.is_leader:
+            return
+        self._set_leader(False)
+        try:
+            lease = self.api.read_namespaced_lease(self.name, self.namespace)
+            if lease.spec.holder_identity != self.identity:
+                return
+            body = {
+                "metadata": {"name": self.name, "resourceVersion": lease.metadata.resource_version},
+                "spec": {"holderIdentity": None, "leaseDurationSeconds": 1, "renewTime": micro_time()},
+            }
+            self.api.replace_namespaced_lease(self.name, self.namespace, body)
+        except Exception as e:
+            logger.warning(f"Failed to release leader lease {self.name}: {e}")
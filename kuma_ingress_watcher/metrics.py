@@ -0,0 +1,137 @@
+import logging
+import time
+from contextlib import contextmanager
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram, start_http_server
+except ImportError:  # pragma: no cover - exercised only without the metrics extra
+    Counter = Gauge = Histogram = start_http_server = None
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "kuma_ingress_watcher"
+
+
+class NoopMetric:
+    """Stand-in used when prometheus_client is not installed."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def set_function(self, f):
+        pass
+
+
+def _metric(cls, name, documentation, labelnames=()):
+    if cls is None:
+        return NoopMetric()
+    return cls(name, documentation, labelnames, namespace=NAMESPACE)
+
+
+SYNC_DURATION = _metric(
+    Histogram,
+    "sync_duration_seconds",
+    "Time spent applying a Kubernetes listing or watch event to the desired monitors.",
+    ["resource_type", "trigger"],
+)
+KUMA_API_CALLS = _metric(
+    Counter,
+    "kuma_api_calls_total",
+    "Uptime Kuma API calls, by operation and outcome.",
+    ["operation", "status"],
+)
+KUMA_API_LATENCY = _metric(
+    Histogram,
+    "kuma_api_call_duration_seconds",
+    "Uptime Kuma API call latency, by operation.",
+    ["operation"],
+)
+KUMA_SKIPPED_WRITES = _metric(
+    Counter,
+    "kuma_skipped_writes_total",
+    "Monitor edits skipped because Uptime Kuma already had the desired fields.",
+)
+KUMA_RECONNECTS = _metric(
+    Counter,
+    "kuma_reconnects_total",
+    "Uptime Kuma connections reopened and logged in again after being lost.",
+)
+KUBERNETES_REQUEST_LATENCY = _metric(
+    Histogram,
+    "kubernetes_request_duration_seconds",
+    "Kubernetes API list request latency, per page.",
+    ["resource_type"],
+)
+KUBERNETES_EVENTS = _metric(
+    Counter,
+    "kubernetes_watch_events_total",
+    "Kubernetes watch events received.",
+    ["resource_type", "event_type"],
+)
+KUBERNETES_OBJECTS = _metric(
+    Gauge,
+    "kubernetes_objects",
+    "Routing objects currently known, by resource type.",
+    ["resource_type"],
+)
+QUEUE_DEPTH = _metric(
+    Gauge,
+    "queue_depth",
+    "Monitors waiting to be written to Uptime Kuma, including those backing off.",
+)
+LAST_SUCCESSFUL_SYNC = _metric(
+    Gauge,
+    "last_successful_sync_timestamp_seconds",
+    "Unix time of the last complete listing, by resource type.",
+    ["resource_type"],
+)
+ANNOTATION_ERRORS = _metric(
+    Counter,
+    "annotation_errors_total",
+    "Probe annotations rejected when a routing object was added or changed, by resource type.",
+    ["resource_type"],
+)
+LEADER = _metric(
+    Gauge,
+    "leader",
+    "1 while this replica holds the leader Lease (leader election only), otherwise 0.",
+)
+
+
+@contextmanager
+def track_duration(histogram, *labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_kuma_call(operation):
+    status = "error"
+    start = time.perf_counter()
+    try:
+        yield
+        status = "success"
+    finally:
+        KUMA_API_LATENCY.labels(operation).observe(time.perf_counter() - start)
+        KUMA_API_CALLS.labels(operation, status).inc()
+
+
+def start_metrics_server(port):
+    if start_http_server is None:
+        logger.warning("prometheus_client is not installed, metrics endpoint disabled.")
+        return False
+    start_http_server(port)
+    logger.info(f"Serving metrics on port {port}")
+    return True
@@ -0,0 +1,69 @@
+import os
+
+import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import SequenceEndEvent, SequenceStartEvent, StreamEndEvent
+from yaml.resolver import Resolver
+
+from kuma_ingress_watcher.speedups import CParser
+
+MONITOR_FILE_SUFFIXES = (".yaml", ".yml")
+
+
+if CParser is not None:
+    class EntryLoader(CParser, Composer, SafeConstructor, Resolver):
+        """Safe loader reading events from libyaml and composing nodes in
+        Python, so a document can be built one sequence item at a time."""
+
+        def __init__(self, stream):
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+else:  # pragma: no cover
+    EntryLoader = yaml.SafeLoader
+
+
+def iter_entries(stream):
+    """Yield the entries of a monitor file as they are parsed.
+
+    ``stream`` may hold several documents. A document is either a list of
+    entries, read item by item so the whole list is never held in memory,
+    or a single entry; empty documents are skipped. Raises yaml.YAMLError
+    when the stream is not valid YAML, possibly after some entries have
+    been yielded.
+    """
+    loader = EntryLoader(stream)
+    try:
+        loader.get_event()
+        while not loader.check_event(StreamEndEvent):
+            loader.get_event()
+            if loader.check_event(SequenceStartEvent):
+                loader.get_event()
+                while not loader.check_event(SequenceEndEvent):
+                    yield loader.construct_document(loader.compose_node(None, None))
+                loader.get_event()
+            else:
+                entry = loader.construct_document(loader.compose_node(None, None))
+                if entry is not None:
+                    yield entry
+            loader.get_event()
+            # Anchors are scoped to their document.
+            loader.anchors = {}
+    finally:
+        loader.dispose()
+
+
+def monitor_files(path):
+    """The monitor files at ``path``: the file itself, or the YAML files of
+    a directory in name order. Hidden entries, such as the ..data links of
+    a mounted ConfigMap, are skipped."""
+    if not os.path.isdir(path):
+        return [path]
+    return [
+        os.path.join(path, name)
+        for name in sorted(os.listdir(path))
+        if name.endswith(MONITOR_FILE_SUFFIXES) and not name.startswith(".")
+        and os.path.isfile(os.path.join(path, name))
+    ]
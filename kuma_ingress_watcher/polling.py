@@ -0,0 +1,32 @@
+import random
+
+
+class PollScheduler:
+    """Decides how long to sleep between two polling cycles.
+
+    The interval starts at ``interval`` seconds and doubles after every
+    cycle that saw no change, up to ``max_interval``; a cycle with changes
+    brings it back to ``interval``. The time the cycle itself took is
+    subtracted, so cycles start one interval apart rather than one interval
+    after the previous one ended. Each delay is then spread by up to
+    ``jitter`` (a fraction of the delay) either way, so replicas started
+    together drift apart instead of listing at the same moment.
+    """
+
+    def __init__(self, interval, max_interval=None, jitter=0.1, rng=None):
+        self.interval = float(interval)
+        self.max_interval = max(self.interval, float(max_interval or interval))
+        self.jitter = min(max(float(jitter), 0.0), 1.0)
+        self.current = self.interval
+        self._random = rng or random.Random()
+
+    def next_delay(self, cycle_seconds, changed):
+        """Seconds to sleep after a cycle that took ``cycle_seconds``."""
+        if changed:
+            self.current = self.interval
+        else:
+            self.current = min(self.max_interval, self.current * 2)
+        delay = self.current
+        if self.jitter:
+            delay *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay - cycle_seconds)
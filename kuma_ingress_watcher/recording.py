@@ -0,0 +1,159 @@
+import gzip
+import threading
+import time
+from dataclasses import dataclass
+
+from kuma_ingress_watcher.speedups import json_dumps, json_loads
+
+LIST = "LIST"
+
+
+def open_recording(path, mode):
+    """Open a recording; names ending in .gz are gzip compressed, and
+    appending adds a gzip member, which readers see as one stream."""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+@dataclass(frozen=True, slots=True)
+class RecordedChange:
+    """One line of a recording.
+
+    A watch event (``event_type`` ADDED, MODIFIED or DELETED) holds the
+    routing object. A listing is recorded page by page as LIST changes
+    holding the page, numbered from 0 in ``page``; ``namespace`` is the
+    namespace it was limited to, if any.
+    """
+
+    time: float
+    kind: str
+    event_type: str
+    namespace: str | None
+    object: dict
+    page: int | None = None
+
+    def to_line(self):
+        fields = [self.time, self.kind, self.event_type, self.namespace, self.object]
+        if self.page is not None:
+            fields.append(self.page)
+        return json_dumps(fields) + b"\n"
+
+    @classmethod
+    def from_line(cls, line):
+        return cls(*json_loads(line))
+
+
+class EventRecorder:
+    """Appends the routing object changes the controller sees to ``path``.
+
+    Objects are recorded as projected by the controller, before the
+    namespace, label and ingress class filters, so a recording can be
+    replayed with other filters. Each line is flushed as it is written,
+    except in gzip files, which are flushed at most every
+    ``flush_interval`` seconds to keep compression effective.
+    """
+
+    def __init__(self, path, flush_interval=1.0, clock=time.time):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._compressed = str(path).endswith(".gz")
+        self._file = open_recording(path, "ab")
+        self._flushed_at = clock()
+        self._lock = threading.Lock()
+        self.changes = 0
+
+    def record(self, kind, event_type, namespace, obj, page=None):
+        now = self._clock()
+        line = RecordedChange(round(now, 3), kind, event_type, namespace, obj, page).to_line()
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            self.changes += 1
+            if not self._compressed or now - self._flushed_at >= self.flush_interval:
+                self._file.flush()
+                self._flushed_at = now
+
+    def record_event(self, kind, event_type, item):
+        self.record(kind, event_type, None, item)
+
+    def record_pages(self, pages, kind, namespace=None):
+        """Pass the pages of a listing through, recording each one."""
+        for index, page in enumerate(pages):
+            self.record(kind, LIST, namespace, page, index)
+            yield page
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_recording(path):
+    """Yield the RecordedChanges of a recording, in the order they were
+    written."""
+    with open_recording(path, "rb") as file:
+        for line in file:
+            if line.strip():
+                yield RecordedChange.from_line(line)
+
+
+def group_listings(changes):
+    """Yield watch events as they are, and the pages of each listing
+    together, once its last page has been read.
+
+    Listings of different kinds and namespaces may interleave. A listing
+    that stopped before its last page, because it failed, is yielded as
+    it is when the next listing of its kind and namespace starts, or at
+    the end of the recording. Listings are yielded as a
+    ``(last_change, pages)`` pair.
+    """
+    pending = {}
+    for change in changes:
+        if change.event_type != LIST:
+            yield change
+            continue
+        scope = (change.kind, change.namespace)
+        if change.page == 0 and scope in pending:
+            yield pending.pop(scope)
+        _, pages = pending.get(scope, (None, []))
+        pages.append(change.object)
+        if (change.object.get("metadata") or {}).get("continue"):
+            pending[scope] = (change, pages)
+        else:
+            pending.pop(scope, None)
+            yield change, pages
+    yield from pending.values()
+
+
+def replay(changes, on_event, on_listing, speed=0.0, max_gap=None, sleep=time.sleep, clock=time.monotonic):
+    """Feed recorded changes to ``on_event(change)`` and complete or
+    failed listings to ``on_listing(last_change, pages)``.
+
+    With a ``speed`` above 0, changes are spaced out as they were
+    recorded, ``speed`` times faster, with quiet periods (e.g. while the
+    controller was down) shortened to ``max_gap`` recorded seconds;
+    otherwise they are fed as fast as they are handled. Returns the number
+    of events and listings fed.
+    """
+    started = clock()
+    previous = None
+    elapsed = 0.0
+    fed = 0
+    for entry in group_listings(changes):
+        change = entry[0] if isinstance(entry, tuple) else entry
+        if previous is not None:
+            gap = max(0.0, change.time - previous)
+            elapsed += gap if max_gap is None else min(gap, max_gap)
+        previous = change.time
+        if speed > 0:
+            delay = started + elapsed / speed - clock()
+            if delay > 0:
+                sleep(delay)
+        if isinstance(entry, tuple):
+            on_listing(*entry)
+        else:
+            on_event(entry)
+        fed += 1
+    return fed
@@ -0,0 +1,88 @@
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class ProbeSettings:
+    """Probe settings of a routing object, parsed from its annotations.
+
+    Settings only depend on the annotations, so objects sharing an annotation
+    set share one instance; a None ``monitor_name`` means the default
+    ``<name>-<namespace>``. ``errors`` lists the annotations that were
+    rejected.
+    """
+
+    monitor_name: str | None = None
+    enabled: bool = True
+    interval: int = 60
+    probe_type: str = "http"
+    headers: str | None = None
+    port: int | None = None
+    path: str | None = None
+    host: str | None = None
+    method: str = "GET"
+    parent: str | None = None
+    accepted_statuscodes: tuple | None = None
+    errors: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        statuscodes = data.get("accepted_statuscodes")
+        return cls(**dict(
+            data,
+            accepted_statuscodes=tuple(statuscodes) if statuscodes is not None else None,
+            errors=tuple(data.get("errors", ())),
+        ))
+
+
+@dataclass(frozen=True, slots=True)
+class RoutingObject:
+    """What the controller needs from an IngressRoute or Ingress.
+
+    ``hosts`` holds the hosts of each route or rule, in order. Two records
+    are equal when they would produce the same monitors.
+    """
+
+    kind: str
+    namespace: str
+    name: str
+    hosts: tuple
+    probe: ProbeSettings
+
+    @property
+    def key(self):
+        return (self.kind, self.namespace, self.name)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            kind=data["kind"],
+            namespace=data["namespace"],
+            name=data["name"],
+            hosts=tuple(tuple(hosts) for hosts in data["hosts"]),
+            probe=ProbeSettings.from_dict(data["probe"]),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class DesiredMonitor:
+    """A monitor as it should exist in Uptime Kuma."""
+
+    name: str
+    url: str
+    interval: int = 60
+    probe_type: str = "http"
+    headers: str | None = None
+    method: str = "GET"
+    parent: str | None = None
+    accepted_statuscodes: tuple | None = None
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        statuscodes = data.get("accepted_statuscodes")
+        return cls(**dict(data, accepted_statuscodes=tuple(statuscodes) if statuscodes is not None else None))
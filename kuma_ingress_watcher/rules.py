@@ -0,0 +1,198 @@
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+HOST_MATCHERS = frozenset({"Host", "HostHeader", "HostSNI"})
+HOST_REGEXP_MATCHERS = frozenset({"HostRegexp", "HostSNIRegexp"})
+PATH_MATCHERS = frozenset({"Path", "PathPrefix"})
+
+# Backtick, double or single quoted strings.
+STRING = r"""`[^`]*`|"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'"""
+# Whole matchers with their arguments, operators, and anything else as an
+# error; whitespace between tokens is skipped.
+TOKEN_PATTERN = re.compile(
+    rf"""([A-Za-z][A-Za-z0-9]*)\s*\(\s*((?:{STRING})(?:\s*,\s*(?:{STRING}))*)?\s*\)|(&&|\|\||[!()])|([A-Za-z][A-Za-z0-9]*|\S)"""
+)
+ARGUMENT_PATTERN = re.compile(r"""`([^`]*)`|"((?:[^"\\]|\\.)*)"|'((?:[^'\\]|\\.)*)'""")
+ESCAPE_PATTERN = re.compile(r"\\(.)")
+# What the parser used to be; kept for rules it cannot parse.
+FALLBACK_HOST_PATTERN = re.compile(r"Host\(`([^`]*)`\)")
+LITERAL_HOST_PATTERN = re.compile(r"[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*")
+
+
+class RuleParseError(ValueError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Matcher:
+    name: str
+    args: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Not:
+    operand: object
+
+
+@dataclass(frozen=True, slots=True)
+class And:
+    operands: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Or:
+    operands: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedRule:
+    """A Traefik router rule: its AST (None when it could not be parsed) and
+    what it routes on. Negated matchers are left out of ``hosts``,
+    ``host_patterns`` and ``path_prefixes``."""
+
+    ast: object
+    hosts: tuple = ()
+    host_patterns: tuple = ()
+    path_prefixes: tuple = ()
+    error: str | None = None
+
+
+def parse_arguments(arguments):
+    values = []
+    for raw, double_quoted, single_quoted in ARGUMENT_PATTERN.findall(arguments):
+        value = raw or double_quoted or single_quoted
+        values.append(ESCAPE_PATTERN.sub(r"\1", value) if "\\" in value and not raw else value)
+    return tuple(values)
+
+
+def tokenize(rule):
+    """Matcher and operator tokens of ``rule``."""
+    tokens = []
+    for name, arguments, operator, unexpected in TOKEN_PATTERN.findall(rule):
+        if name:
+            tokens.append(Matcher(name, parse_arguments(arguments)))
+        elif operator:
+            tokens.append(operator)
+        else:
+            raise RuleParseError(f"unexpected {unexpected!r}")
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the tokens; ``&&`` binds tighter than ``||``
+    and ``!`` tighter than both, as in Traefik."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens + [None]
+        self.position = 0
+
+    def parse(self):
+        node = self.parse_or()
+        if self.tokens[self.position] is not None:
+            raise RuleParseError(f"unexpected {self.tokens[self.position]!r}")
+        return node
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.tokens[self.position] == "||":
+            self.position += 1
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def parse_and(self):
+        operands = [self.parse_unary()]
+        while self.tokens[self.position] == "&&":
+            self.position += 1
+            operands.append(self.parse_unary())
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def parse_unary(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        if isinstance(token, Matcher):
+            return token
+        if token == "!":
+            return Not(self.parse_unary())
+        if token == "(":
+            node = self.parse_or()
+            if self.tokens[self.position] != ")":
+                raise RuleParseError("expected ')'")
+            self.position += 1
+            return node
+        raise RuleParseError(f"expected a matcher, found {token or 'end of rule'!r}")
+
+
+def parse_ast(rule):
+    return _Parser(tokenize(rule)).parse()
+
+
+def literal_host(pattern):
+    """The host a HostRegexp pattern matches when it is a plain name."""
+    host = pattern.removeprefix("^").removesuffix("$").replace(r"\.", ".")
+    return host if LITERAL_HOST_PATTERN.fullmatch(host) else None
+
+
+def collect_targets(node, hosts, host_patterns, path_prefixes):
+    if isinstance(node, (And, Or)):
+        for operand in node.operands:
+            collect_targets(operand, hosts, host_patterns, path_prefixes)
+    elif isinstance(node, Matcher):
+        if node.name in HOST_MATCHERS:
+            hosts.extend(arg for arg in node.args if arg != "*")
+        elif node.name in HOST_REGEXP_MATCHERS:
+            for pattern in node.args:
+                host = literal_host(pattern)
+                if host:
+                    hosts.append(host)
+                else:
+                    host_patterns.append(pattern)
+        elif node.name in PATH_MATCHERS:
+            path_prefixes.extend(node.args)
+
+
+def unique(values):
+    return tuple(dict.fromkeys(values))
+
+
+class RuleParser:
+    """Parses Traefik v2 and v3 router rules, caching results by rule string.
+
+    The same match strings come back on every listing, and are often shared
+    by several routes, so each distinct rule is parsed once while it stays
+    among the ``cache_size`` most recently used.
+
+    A rule that cannot be parsed does not raise: its hosts are found the way
+    they used to be, by looking for ``Host(`...`)``, and a warning is logged
+    the first time it is seen.
+    """
+
+    def __init__(self, cache_size=16384):
+        self._parse = lru_cache(maxsize=cache_size)(self._parse_rule)
+
+    def parse(self, rule):
+        return self._parse(rule)
+
+    def cache_info(self):
+        return self._parse.cache_info()
+
+    def cache_clear(self):
+        self._parse.cache_clear()
+
+    def _parse_rule(self, rule):
+        try:
+            ast = parse_ast(rule)
+        except RuleParseError as e:
+            logger.warning(f"Failed to parse rule {rule!r} ({e}), looking for Host matchers only")
+            return ParsedRule(ast=None, hosts=unique(FALLBACK_HOST_PATTERN.findall(rule)), error=str(e))
+        hosts, host_patterns, path_prefixes = [], [], []
+        collect_targets(ast, hosts, host_patterns, path_prefixes)
+        return ParsedRule(
+            ast=ast,
+            hosts=unique(hosts),
+            host_patterns=unique(host_patterns),
+            path_prefixes=unique(path_prefixes),
+        )
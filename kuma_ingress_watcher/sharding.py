@@ -0,0 +1,143 @@
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from kubernetes.client.rest import ApiException
+
+logger = logging.getLogger(__name__)
+
+SHARD_GROUP_LABEL = "kuma-ingress-watcher/shard-group"
+
+
+def micro_time(moment=None):
+    """Format ``moment`` (default now) as a Lease MicroTime, which requires
+    exactly six fractional digits."""
+    return (moment or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def hash_key(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring assigning keys (namespaces) to members.
+
+    Each member gets ``replicas`` points on the ring, so when a member joins
+    or leaves only about 1/N of the keys move.
+    """
+
+    def __init__(self, members=(), replicas=64):
+        self.members = frozenset(members)
+        self._points = sorted(
+            (hash_key(f"{member}#{index}"), member)
+            for member in self.members
+            for index in range(replicas)
+        )
+        self._hashes = [point for point, _ in self._points]
+
+    def owner(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._hashes, hash_key(key)) % len(self._points)
+        return self._points[index][1]
+
+
+class LeaseMembership:
+    """Shard membership coordinated through one Kubernetes Lease per replica.
+
+    Every replica keeps its own Lease, labelled with the shard group,
+    renewed every ``renew_interval`` seconds. Members are the replicas
+    whose Lease was renewed within its duration. ``on_change(members)`` is
+    called with the sorted member identities whenever they change. A
+    replica that could not renew its own Lease for a whole duration drops
+    itself, since the others already consider it gone.
+    """
+
+    def __init__(self, api, namespace, group, identity, lease_duration=30, renew_interval=10, on_change=None):
+        self.api = api
+        self.namespace = namespace
+        self.group = group
+        self.identity = identity
+        self.lease_duration = lease_duration
+        self.renew_interval = renew_interval
+        self.on_change = on_change
+        self.members = None
+        self._renewed_at = None
+        self._stopped = threading.Event()
+
+    @property
+    def lease_name(self):
+        return f"{self.group}-{self.identity}"
+
+    def renew(self):
+        timestamp = micro_time()
+        body = {
+            "metadata": {"name": self.lease_name, "labels": {SHARD_GROUP_LABEL: self.group}},
+            "spec": {
+                "holderIdentity": self.identity,
+                "leaseDurationSeconds": self.lease_duration,
+                "renewTime": timestamp,
+            },
+        }
+        try:
+            self.api.patch_namespaced_lease(self.lease_name, self.namespace, body)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            body["spec"]["acquireTime"] = timestamp
+            self.api.create_namespaced_lease(self.namespace, body)
+        self._renewed_at = time.monotonic()
+
+    def list_members(self):
+        now = datetime.now(timezone.utc)
+        leases = self.api.list_namespaced_lease(self.namespace, label_selector=f"{SHARD_GROUP_LABEL}={self.group}")
+        members = set()
+        for lease in leases.items:
+            spec = lease.spec
+            if not spec or not spec.holder_identity or not spec.renew_time:
+                continue
+            if spec.renew_time + timedelta(seconds=spec.lease_duration_seconds or self.lease_duration) > now:
+                members.add(spec.holder_identity)
+        return members
+
+    def sync(self):
+        try:
+            self.renew()
+        except Exception as e:
+            logger.error(f"Failed to renew shard lease {self.lease_name}: {e}")
+
+        members = set(self.members or ())
+        try:
+            members = self.list_members()
+        except Exception as e:
+            logger.error(f"Failed to list shard leases: {e}")
+
+        if self._renewed_at is not None and time.monotonic() - self._renewed_at <= self.lease_duration:
+            members.add(self.identity)
+        else:
+            members.discard(self.identity)
+
+        members = sorted(members)
+        if members != self.members:
+            logger.info(f"Shard members changed: {members}")
+            self.members = members
+            if self.on_change:
+                self.on_change(members)
+
+    def run(self):
+        while not self._stopped.wait(self.renew_interval):
+            self.sync()
+
+    def start(self):
+        self.sync()
+        threading.Thread(target=self.run, name="shard-membership", daemon=True).start()
+
+    def leave(self):
+        self._stopped.set()
+        try:
+            self.api.delete_namespaced_lease(self.lease_name, self.namespace)
+        except Exception as e:
+            logger.warning(f"Failed to delete shard lease {self.lease_name}: {e}")
@@ -0,0 +1,26 @@
+import json
+
+import yaml
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without the fast-json extra
+    orjson = None
+
+try:
+    from yaml.cyaml import CParser
+except ImportError:  # pragma: no cover - PyYAML built without libyaml
+    CParser = None
+
+YamlLoader = yaml.CSafeLoader if CParser is not None else yaml.SafeLoader
+
+
+def json_loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def json_dumps(value):
+    """Compact JSON, as bytes."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
@@ -0,0 +1,162 @@
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Global rate limit: ``rate`` tokens per second, up to ``burst`` at once."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class WorkQueue:
+    """Controller-style work queue of keys processed by a pool of workers.
+
+    Adding a key that is already waiting is a no-op, and a key is never
+    handled by two workers at once; if it is added while being handled, it
+    is handled once more afterwards. ``handler(key)`` returns a truthy value
+    on success. On failure or exception the key is retried after a per-key
+    exponential backoff. Every attempt first takes a token from a global
+    token bucket.
+    """
+
+    def __init__(self, handler, workers=1, rate=0, burst=1, base_delay=1.0, max_delay=300.0, name="workqueue"):
+        self._handler = handler
+        self._workers = workers
+        self._bucket = TokenBucket(rate, burst)
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._name = name
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._dirty = set()
+        self._processing = set()
+        self._delayed = []
+        self._failures = {}
+        self._threads = []
+        self._stopped = False
+
+    def add(self, key):
+        with self._condition:
+            self._ensure_started()
+            self._add(key)
+
+    def add_after(self, key, delay):
+        with self._condition:
+            self._ensure_started()
+            heapq.heappush(self._delayed, (time.monotonic() + delay, key))
+            self._condition.notify()
+
+    def add_rate_limited(self, key):
+        with self._condition:
+            failures = self._failures.get(key, 0)
+            self._failures[key] = failures + 1
+        delay = min(self._base_delay * (2 ** failures), self._max_delay)
+        logger.warning(f"Retrying {key} in {delay:.1f}s (attempt {failures + 2})")
+        self.add_after(key, delay)
+
+    def forget(self, key):
+        with self._condition:
+            self._failures.pop(key, None)
+
+    def retries(self, key):
+        with self._condition:
+            return self._failures.get(key, 0)
+
+    def depth(self):
+        """Number of keys waiting to be handled, including those backing off."""
+        with self._condition:
+            return len(self._queue) + len(self._delayed)
+
+    def join(self, timeout=None):
+        """Wait until no key is queued, backing off or being handled."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not (self._queue or self._delayed or self._processing), timeout
+            )
+
+    def shutdown(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        for index in range(self._workers):
+            thread = threading.Thread(target=self._work, name=f"{self._name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _add(self, key):
+        if key in self._dirty:
+            return
+        self._dirty.add(key)
+        if key not in self._processing:
+            self._queue.append(key)
+            self._condition.notify_all()
+
+    def _get(self):
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._add(heapq.heappop(self._delayed)[1])
+                if self._queue:
+                    key = self._queue.popleft()
+                    self._dirty.discard(key)
+                    self._processing.add(key)
+                    return key
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._condition.wait(timeout)
+
+    def _done(self, key):
+        with self._condition:
+            self._processing.discard(key)
+            if key in self._dirty:
+                self._queue.append(key)
+            self._condition.notify_all()
+
+    def _work(self):
+        while True:
+            key = self._get()
+            if key is None:
+                return
+            self._bucket.acquire()
+            try:
+                ok = self._handler(key)
+            except Exception as e:
+                logger.error(f"Failed to handle {key}: {e}")
+                ok = False
+            if ok:
+                self.forget(key)
+            else:
+                self.add_rate_limited(key)
+            self._done(key)
@@ -0,0 +1,12 @@
+def make_item(name, host="example.com", namespace="default", kind="IngressRoute", uid=None, ingress_class=None):
+    """A routing object of ``kind`` with a single route or rule for ``host``."""
+    metadata = {"name": name, "namespace": namespace}
+    if uid:
+        metadata["uid"] = uid
+    if kind == "IngressRoute":
+        spec = {"routes": [{"match": f"Host(`{host}`)"}]}
+    else:
+        spec = {"rules": [{"host": host}]}
+        if ingress_class:
+            spec["ingressClassName"] = ingress_class
+    return {"metadata": metadata, "spec": spec}
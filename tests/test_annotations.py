@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch
+from kuma_ingress_watcher.annotations import AnnotationParser, probe_annotation_schema
+from kuma_ingress_watcher.controller import on_routing_object_added, parse_routing_object
+from kuma_ingress_watcher.records import ProbeSettings
+
+PREFIX = "uptime-kuma.autodiscovery.probe."
+
+
+def new_parser(**defaults):
+    return AnnotationParser(PREFIX, probe_annotation_schema({"http", "keyword"}), defaults=defaults)
+
+
+class TestAnnotationParser(unittest.TestCase):
+    def test_converts_typed_values(self):
+        probe = new_parser().parse({
+            f"{PREFIX}name": "app",
+            f"{PREFIX}interval": "30",
+            f"{PREFIX}type": "Keyword",
+            f"{PREFIX}port": "8080",
+            f"{PREFIX}method": "post",
+            f"{PREFIX}headers": '{"Authorization": "Bearer token"}',
+            f"{PREFIX}accepted-statuscodes": "['200-299', 301]",
+            "app.kubernetes.io/name": "ignored",
+        })
+
+        self.assertEqual(
+            probe,
+            ProbeSettings(
+                monitor_name="app",
+                interval=30,
+                probe_type="keyword",
+                port=8080,
+                method="POST",
+                headers='{"Authorization": "Bearer token"}',
+                accepted_statuscodes=("200-299", 301),
+            ),
+        )
+
+    def test_collects_errors_and_keeps_defaults(self):
+        probe = new_parser(interval=120).parse({
+            f"{PREFIX}interval": "soon",
+            f"{PREFIX}port": "99999",
+            f"{PREFIX}headers": "[]",
+            f"{PREFIX}accepted-statuscodes": "not_a_list",
+            f"{PREFIX}intervall": "30",
+        })
+
+        self.assertEqual(probe.interval, 120)
+        self.assertIsNone(probe.port)
+        self.assertIsNone(probe.headers)
+        self.assertIsNone(probe.accepted_statuscodes)
+        self.assertEqual(
+            [error.split(":")[0] for error in probe.errors],
+            [f"{PREFIX}accepted-statuscodes", f"{PREFIX}headers", f"{PREFIX}interval", f"{PREFIX}intervall", f"{PREFIX}port"],
+        )
+
+    def test_invalid_enabled_disables_monitoring(self):
+        probe = new_parser().parse({f"{PREFIX}enabled": "maybe"})
+
+        self.assertFalse(probe.enabled)
+        self.assertEqual(len(probe.errors), 1)
+
+    def test_identical_annotation_sets_are_parsed_once(self):
+        parser = new_parser()
+        first = parser.parse({f"{PREFIX}interval": "30", f"{PREFIX}path": "/health", "team": "a"})
+        second = parser.parse({f"{PREFIX}path": "/health", f"{PREFIX}interval": "30", "team": "b"})
+
+        self.assertIs(first, second)
+        self.assertEqual(parser.cache_info().hits, 1)
+        self.assertEqual(parser.cache_info().misses, 1)
+
+    def test_objects_share_probe_settings(self):
+        annotations = {f"{PREFIX}interval": "45"}
+        first = parse_routing_object(
+            {"metadata": {"name": "a", "namespace": "one", "annotations": annotations}, "spec": {"routes": []}},
+            "IngressRoute",
+        )
+        second = parse_routing_object(
+            {"metadata": {"name": "b", "namespace": "two", "annotations": dict(annotations)}, "spec": {"routes": []}},
+            "IngressRoute",
+        )
+
+        self.assertIs(first.probe, second.probe)
+        self.assertIsNone(first.probe.monitor_name)
+
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    @patch("kuma_ingress_watcher.controller.set_desired_monitors")
+    @patch("kuma_ingress_watcher.controller.logger")
+    def test_errors_are_reported_once_per_change(self, mock_logger, mock_set_desired_monitors, mock_reconcile):
+        routing_object = parse_routing_object(
+            {"metadata": {"name": "a", "namespace": "one", "annotations": {f"{PREFIX}port": "http"}}, "spec": {}},
+            "IngressRoute",
+        )
+
+        on_routing_object_added(routing_object.key, routing_object)
+
+        mock_logger.warning.assert_called_once()
+        self.assertIn("IngressRoute one/a has invalid annotations", mock_logger.warning.call_args[0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
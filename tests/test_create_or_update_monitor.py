@@ -1,9 +1,14 @@
 import unittest
 from unittest.mock import patch
-from kuma_ingress_watcher.controller import create_or_update_monitor
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import create_or_update_monitor, invalidate_monitor_index, reset_desired_monitors
+from kuma_ingress_watcher.records import DesiredMonitor
 
 
 class TestCreateOrUpdateMonitor(unittest.TestCase):
+    def setUp(self):
+        invalidate_monitor_index()
+
     @patch("kuma_ingress_watcher.controller.kuma")
     @patch("kuma_ingress_watcher.controller.logger")
     def test_create_or_update_monitor_update(self, mock_logger, mock_kuma):
@@ -73,6 +78,50 @@ class TestCreateOrUpdateMonitor(unittest.TestCase):
             accepted_statuscodes=None,
         )
 
+    @patch("kuma_ingress_watcher.controller.kuma")
+    @patch("kuma_ingress_watcher.controller.logger")
+    def test_create_or_update_monitor_waits_for_its_group(self, mock_logger, mock_kuma):
+        mock_kuma.get_monitors.return_value = []
+        reset_desired_monitors()
+        self.addCleanup(reset_desired_monitors)
+        controller.set_desired_monitors(("File", "monitors.yaml"), {
+            "grp": DesiredMonitor(name="grp", url="", probe_type="group"),
+        })
+
+        # The group is queued too, but not written yet: retry later.
+        self.assertFalse(create_or_update_monitor("child", "http://child.com", 60, "http", None, "GET", "grp"))
+        mock_kuma.add_monitor.assert_not_called()
+
+        controller.index_monitor("grp", 5, {"type": "group"})
+        self.assertTrue(create_or_update_monitor("child", "http://child.com", 60, "http", None, "GET", "grp"))
+        self.assertEqual(mock_kuma.add_monitor.call_args.kwargs["parent"], 5)
+
+    @patch("kuma_ingress_watcher.controller.kuma")
+    @patch("kuma_ingress_watcher.controller.logger")
+    def test_create_or_update_monitor_skips_identical_update(self, mock_logger, mock_kuma):
+        mock_kuma.get_monitors.return_value = [
+            {"name": "testgroup", "type": "group", "id": 1},
+            {
+                "name": "test",
+                "id": 2,
+                "type": "http",
+                "url": "http://url.com",
+                "interval": 60,
+                "method": "GET",
+                "headers": '{"Authorization": "Bearer token"}',
+                "parent": 1,
+                "accepted_statuscodes": ["200-299"],
+            },
+        ]
+        skipped = controller.skipped_monitor_writes
+
+        create_or_update_monitor(
+            "test", "http://url.com", 60, "http", {"Authorization": "Bearer token"}, "GET", "testgroup", None
+        )
+
+        mock_kuma.edit_monitor.assert_not_called()
+        self.assertEqual(controller.skipped_monitor_writes, skipped + 1)
+
     @patch("kuma_ingress_watcher.controller.kuma")
     @patch("kuma_ingress_watcher.controller.logger")
     def test_create_or_update_monitor_error(self, mock_logger, mock_kuma):
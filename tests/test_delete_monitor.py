@@ -1,9 +1,12 @@
 import unittest
 from unittest.mock import patch
-from kuma_ingress_watcher.controller import delete_monitor
+from kuma_ingress_watcher.controller import delete_monitor, invalidate_monitor_index
 
 
 class TestDeleteMonitor(unittest.TestCase):
+    def setUp(self):
+        invalidate_monitor_index()
+
     @patch("kuma_ingress_watcher.controller.kuma")
     @patch("kuma_ingress_watcher.controller.logger")
     def test_delete_monitor_exists(self, mock_logger, mock_kuma):
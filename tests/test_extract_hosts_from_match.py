@@ -13,6 +13,11 @@ class TestExtractHostsFromMatch(unittest.TestCase):
         hosts = extract_hosts_from_match(match)
         self.assertEqual(hosts, ["example.com", "example.org"])
 
+    def test_extract_hosts_or_with_path_prefix(self):
+        match = "(Host(`example.com`) || Host(`example.org`, `www.example.org`)) && PathPrefix(`/api`)"
+        hosts = extract_hosts_from_match(match)
+        self.assertEqual(hosts, ["example.com", "example.org", "www.example.org"])
+
     def test_extract_hosts_none(self):
         match = "Path(`/test`)"
         hosts = extract_hosts_from_match(match)
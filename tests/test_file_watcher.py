@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import process_monitor_file, reset_desired_monitors
+from kuma_ingress_watcher.file_watcher import FileWatcher, inotify_fd
+
+
+class TestFileWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "monitors.yaml")
+        self.write(self.path, "- name: a\n")
+        self.on_change = MagicMock()
+        self.watcher = FileWatcher(self.path, self.on_change, poll_interval=0.05)
+        self.watcher.prime()
+
+    def write(self, path, content):
+        with open(path, "w") as file:
+            file.write(content)
+
+    def test_content_change(self):
+        self.write(self.path, "- name: b\n")
+
+        self.assertTrue(self.watcher.check())
+        self.on_change.assert_called_once_with(self.path)
+        self.assertFalse(self.watcher.check())
+
+    def test_same_content_is_not_a_change(self):
+        os.utime(self.path, ns=(1, 1))
+
+        self.assertFalse(self.watcher.check())
+        self.on_change.assert_not_called()
+
+    def test_configmap_symlink_swap(self):
+        # Same layout as a mounted ConfigMap: monitors.yaml -> ..data/monitors.yaml
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for version, content in (("v1", "- name: a\n"), ("v2", "- name: b\n")):
+            os.mkdir(os.path.join(directory, version))
+            self.write(os.path.join(directory, version, "monitors.yaml"), content)
+        os.symlink("v1", os.path.join(directory, "..data"))
+        path = os.path.join(directory, "monitors.yaml")
+        os.symlink(os.path.join("..data", "monitors.yaml"), path)
+        watcher = FileWatcher(path, self.on_change)
+        watcher.prime()
+
+        os.symlink("v2", os.path.join(directory, "..data_tmp"))
+        os.rename(os.path.join(directory, "..data_tmp"), os.path.join(directory, "..data"))
+
+        self.assertTrue(watcher.check())
+        self.on_change.assert_called_once_with(path)
+
+    def test_reload_errors_are_logged(self):
+        self.on_change.side_effect = Exception("boom")
+        self.write(self.path, "- name: b\n")
+
+        with patch("kuma_ingress_watcher.file_watcher.logger") as mock_logger:
+            self.watcher.check()
+
+        mock_logger.error.assert_called_once()
+
+    def test_watch_thread_notices_changes(self):
+        changed = threading.Event()
+        self.on_change.side_effect = lambda path: changed.set()
+        self.watcher.start()
+        self.addCleanup(self.watcher.stop)
+
+        self.write(self.path, "- name: b\n")
+
+        self.assertTrue(changed.wait(5))
+
+    @unittest.skipUnless(inotify_fd("/") is not None, "inotify is not available")
+    def test_inotify(self):
+        fd = inotify_fd(self.directory)
+        self.addCleanup(os.close, fd)
+
+        self.assertIsNotNone(fd)
+
+
+class TestMonitorFileReload(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+        self.addCleanup(reset_desired_monitors)
+
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    @patch("kuma_ingress_watcher.controller.open", new_callable=MagicMock)
+    def load(self, content, mock_open, mock_reconcile):
+        mock_open.side_effect = unittest.mock.mock_open(read_data=content)
+        process_monitor_file("monitors.yaml")
+
+    def test_reload_marks_only_differences(self):
+        self.load("- {name: a, url: http://a}\n- {name: b, url: http://b}\n- {name: c, url: http://c}\n")
+        controller.dirty_monitors.clear()
+
+        self.load("- {name: a, url: http://a}\n- {name: b, url: http://b2}\n- {name: d, url: http://d}\n")
+
+        self.assertEqual(controller.dirty_monitors, {"b", "c", "d"})
+        self.assertEqual(sorted(controller.desired_monitors), ["a", "b", "d"])
+        # c is still managed, so the next reconcile deletes it from Uptime Kuma
+        self.assertIn("c", controller.managed_monitors)
+
+    def test_emptied_file_removes_its_monitors(self):
+        self.load("- {name: a, url: http://a}\n")
+
+        self.load("")
+
+        self.assertEqual(controller.desired_monitors, {})
+        self.assertIn("a", controller.dirty_monitors)
+
+    @patch("kuma_ingress_watcher.controller.process_monitor_file")
+    def test_reload_skipped_when_another_shard_owns_the_file(self, mock_process_monitor_file):
+        ring = MagicMock()
+        ring.owner.return_value = "other-replica"
+        with patch.object(controller, "SHARDING_ENABLED", True), patch.object(controller, "shard_ring", ring):
+            controller.reload_monitor_file("monitors.yaml")
+
+        mock_process_monitor_file.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
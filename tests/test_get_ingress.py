@@ -1,31 +1,94 @@
+import json
 import unittest
 from unittest.mock import patch, MagicMock
 from kuma_ingress_watcher.controller import get_ingress
 
 
+def make_response(names, resource_version="42", _continue=None):
+    # Raw response, as returned with _preload_content=False
+    page = {
+        "apiVersion": "networking.k8s.io/v1",
+        "kind": "IngressList",
+        "metadata": {"resourceVersion": resource_version, "continue": _continue},
+        "items": [
+            {
+                "metadata": {
+                    "name": name,
+                    "namespace": "default",
+                    "uid": f"uid-{name}",
+                    "resourceVersion": "7",
+                    "annotations": {
+                        "uptime-kuma.autodiscovery.probe.interval": "30",
+                        "kubectl.kubernetes.io/last-applied-configuration": "{}",
+                    },
+                    "managedFields": [{"manager": "kubectl"}],
+                },
+                "spec": {
+                    "ingressClassName": "traefik",
+                    "rules": [
+                        {"host": f"{name}.example.com", "http": {"paths": [{"path": "/", "pathType": "Prefix"}]}},
+                        {"http": {"paths": []}},
+                    ],
+                },
+                "status": {"loadBalancer": {}},
+            }
+            for name in names
+        ],
+    }
+    response = MagicMock()
+    response.data = json.dumps(page).encode()
+    return response
+
+
 class TestGetIngress(unittest.TestCase):
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     @patch("kuma_ingress_watcher.controller.networking_api_instance")
     def test_get_ingress_success(self, mock_api_instance, mock_logger):
-        # Mock an ingress object with a 'to_dict' method
-        mock_ingress = MagicMock()
-        mock_ingress.to_dict.return_value = {"metadata": {"name": "test-ingress"}}
-
-        # Set the mocked 'items' list to contain the mocked ingress object
-        mock_api_instance.list_ingress_for_all_namespaces.return_value.items = [
-            mock_ingress
-        ]
+        response = make_response(["test-ingress"])
+        mock_api_instance.list_ingress_for_all_namespaces.return_value = response
 
         # Call the function
-        result = get_ingress(mock_api_instance)
+        result = list(get_ingress(mock_api_instance))
 
-        # Expected result after calling 'to_dict' on the ingress object
-        expected_result = {"items": [{"metadata": {"name": "test-ingress"}}]}
+        # Only the fields the controller reads are kept
+        expected_result = [
+            {
+                "metadata": {"resourceVersion": "42", "continue": None},
+                "items": [
+                    {
+                        "metadata": {
+                            "name": "test-ingress",
+                            "namespace": "default",
+                            "uid": "uid-test-ingress",
+                            "resourceVersion": "7",
+                            "annotations": {"uptime-kuma.autodiscovery.probe.interval": "30"},
+                        },
+                        "spec": {"rules": [{"host": "test-ingress.example.com"}, {}], "ingressClassName": "traefik"},
+                    }
+                ],
+            }
+        ]
 
         # Assert the function's result matches the expected result
         self.assertEqual(result, expected_result)
+        response.release_conn.assert_called_once()
         mock_logger.error.assert_not_called()
 
+    @patch("kuma_ingress_watcher.controller.LIST_PAGE_SIZE", 1)
+    @patch("kuma_ingress_watcher.controller.logger", spec=True)
+    @patch("kuma_ingress_watcher.controller.networking_api_instance")
+    def test_get_ingress_paginated(self, mock_api_instance, mock_logger):
+        mock_api_instance.list_ingress_for_all_namespaces.side_effect = [
+            make_response(["first"], _continue="token"),
+            make_response(["second"]),
+        ]
+
+        pages = list(get_ingress(mock_api_instance))
+
+        self.assertEqual([page["items"][0]["metadata"]["name"] for page in pages], ["first", "second"])
+        mock_api_instance.list_ingress_for_all_namespaces.assert_any_call(limit=1, _continue=None, _preload_content=False)
+        mock_api_instance.list_ingress_for_all_namespaces.assert_any_call(limit=1, _continue="token", _preload_content=False)
+
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     @patch("kuma_ingress_watcher.controller.networking_api_instance")
     def test_get_ingress_failure(self, mock_api_instance, mock_logger):
@@ -34,10 +97,10 @@ class TestGetIngress(unittest.TestCase):
             "Failed to get Ingress"
         )
 
-        result = get_ingress(mock_api_instance)
+        result = list(get_ingress(mock_api_instance))
 
-        # Verify that in case of an exception, an empty list is returned
-        self.assertEqual(result, {"items": []})
+        # Verify that in case of an exception, no page is returned
+        self.assertEqual(result, [])
         mock_logger.error.assert_called_once_with(
             "Failed to get Ingress: Failed to get Ingress"
         )
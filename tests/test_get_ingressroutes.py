@@ -1,33 +1,60 @@
+import json
 import unittest
 from unittest.mock import patch, MagicMock
 from kuma_ingress_watcher.controller import get_ingressroutes
 
 
+def make_response(page):
+    # Raw response, as returned with _preload_content=False
+    response = MagicMock()
+    response.data = json.dumps(page).encode()
+    return response
+
+
 class TestGetIngressroutes(unittest.TestCase):
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     @patch("kuma_ingress_watcher.controller.custom_api_instance")
     def test_get_ingressroutes_success(self, mock_api_instance, mock_logger):
-        # Mock an ingressroute object with a 'to_dict' method
-        mock_ingressroute = MagicMock()
-        mock_ingressroute.to_dict.return_value = {
-            "metadata": {"name": "test-ingressroute"}
-        }
-
-        # Mock the API response to include the mocked ingressroute
-        mock_api_instance.list_cluster_custom_object.return_value = {
-            "items": [mock_ingressroute.to_dict()]
-        }
+        # Mock the API response to include one ingressroute
+        mock_api_instance.list_cluster_custom_object.return_value = make_response({
+            "metadata": {"resourceVersion": "42"},
+            "items": [
+                {
+                    "metadata": {"name": "test-ingressroute", "namespace": "default", "annotations": {"team": "a"}},
+                    "spec": {
+                        "entryPoints": ["websecure"],
+                        "routes": [{"match": "Host(`example.com`)", "kind": "Rule", "services": [{"name": "app"}]}],
+                    },
+                }
+            ],
+        })
 
         # Call the function
-        result = get_ingressroutes(mock_api_instance)
+        result = list(get_ingressroutes(mock_api_instance))
 
         # Assert we call list_cluster_custom_object with expected group
         mock_api_instance.list_cluster_custom_object.assert_called_with(
-            group="traefik.containo.us", version="v1alpha1", plural="ingressroutes"
+            group="traefik.containo.us", version="v1alpha1", plural="ingressroutes", limit=500, _continue=None, _preload_content=False
         )
 
-        # Expected result after calling 'to_dict' on the ingressroute object
-        expected_result = {"items": [{"metadata": {"name": "test-ingressroute"}}]}
+        # Only the fields the controller reads are kept
+        expected_result = [
+            {
+                "metadata": {"resourceVersion": "42", "continue": None},
+                "items": [
+                    {
+                        "metadata": {
+                            "name": "test-ingressroute",
+                            "namespace": "default",
+                            "uid": None,
+                            "resourceVersion": None,
+                            "annotations": {},
+                        },
+                        "spec": {"routes": [{"match": "Host(`example.com`)"}]},
+                    }
+                ],
+            }
+        ]
 
         # Assert the function's result matches the expected result
         self.assertEqual(result, expected_result)
@@ -41,10 +68,10 @@ class TestGetIngressroutes(unittest.TestCase):
             "Failed to get ingressroutes"
         )
 
-        result = get_ingressroutes(mock_api_instance)
+        result = list(get_ingressroutes(mock_api_instance))
 
-        # Verify that in case of an exception, an empty list is returned
-        self.assertEqual(result, {"items": []})
+        # Verify that in case of an exception, no page is returned
+        self.assertEqual(result, [])
         mock_logger.error.assert_called_once_with(
             "Failed to get ingressroutes: Failed to get ingressroutes"
         )
@@ -53,32 +80,39 @@ class TestGetIngressroutes(unittest.TestCase):
     @patch("kuma_ingress_watcher.controller.custom_api_instance")
     def test_get_ingressroutes_empty(self, mock_api_instance, mock_logger):
         # Simulate an empty response from the API
-        mock_api_instance.list_cluster_custom_object.return_value = {"items": []}
+        mock_api_instance.list_cluster_custom_object.return_value = make_response({"metadata": {}, "items": []})
 
-        result = get_ingressroutes(mock_api_instance)
+        result = list(get_ingressroutes(mock_api_instance))
 
-        # Verify that an empty list is returned when there are no ingressroutes
-        self.assertEqual(result, {"items": []})
+        # Verify that an empty page is returned when there are no ingressroutes
+        self.assertEqual(result, [{"metadata": {"resourceVersion": None, "continue": None}, "items": []}])
         mock_logger.error.assert_not_called()
 
+    @patch("kuma_ingress_watcher.controller.LIST_PAGE_SIZE", 2)
+    @patch("kuma_ingress_watcher.controller.custom_api_instance")
+    def test_get_ingressroutes_paginated(self, mock_api_instance):
+        mock_api_instance.list_cluster_custom_object.side_effect = [
+            make_response({"metadata": {"continue": "token"}, "items": [{"metadata": {"name": "a"}}]}),
+            make_response({"metadata": {}, "items": [{"metadata": {"name": "b"}}]}),
+        ]
+
+        pages = list(get_ingressroutes(mock_api_instance))
+
+        self.assertEqual(len(pages), 2)
+        mock_api_instance.list_cluster_custom_object.assert_called_with(
+            group="traefik.containo.us", version="v1alpha1", plural="ingressroutes", limit=2, _continue="token", _preload_content=False
+        )
+
     @patch("kuma_ingress_watcher.controller.custom_api_instance")
     @patch("kuma_ingress_watcher.controller.USE_TRAEFIK_V3_CRD_GROUP", True)
     def test_get_ingressroutes_traefik_v3_crd(self, mock_api_instance):
-        mock_ingressroute = MagicMock()
-        mock_ingressroute.to_dict.return_value = {
-            "metadata": {"name": "test-ingressroute"}
-        }
-
-        # Mock the API response to include the mocked ingressroute
-        mock_api_instance.list_cluster_custom_object.return_value = {
-            "items": [mock_ingressroute.to_dict()]
-        }
+        mock_api_instance.list_cluster_custom_object.return_value = make_response({"items": []})
 
-        get_ingressroutes(mock_api_instance)
+        list(get_ingressroutes(mock_api_instance))
 
         # Assert we call list_cluster_custom_object with expected group
         mock_api_instance.list_cluster_custom_object.assert_called_with(
-            group="traefik.io", version="v1alpha1", plural="ingressroutes"
+            group="traefik.io", version="v1alpha1", plural="ingressroutes", limit=500, _continue=None, _preload_content=False
         )
 
 
@@ -1,44 +1,85 @@
 import unittest
 from unittest.mock import patch
-from kuma_ingress_watcher.controller import handle_changes
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import handle_changes, new_object_store, parse_routing_object, reset_desired_monitors
+from tests.helpers import make_item
+
+
+def make_pages(items, page_size=1):
+    pages = []
+    for start in range(0, len(items), page_size):
+        last = start + page_size >= len(items)
+        metadata = {"resourceVersion": "1", "continue": None if last else "token"}
+        pages.append({"metadata": metadata, "items": items[start:start + page_size]})
+    return pages
 
 
 class TestHandleChanges(unittest.TestCase):
-    @patch("kuma_ingress_watcher.controller.process_routing_object")
-    @patch("kuma_ingress_watcher.controller.delete_monitor")
+    def setUp(self):
+        reset_desired_monitors()
+
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    @patch("kuma_ingress_watcher.controller.process_routes")
     @patch("kuma_ingress_watcher.controller.ingressroute_changed")
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     def test_handle_changes(
         self,
         mock_logger,
         mock_ingressroute_changed,
-        mock_delete_monitor,
-        mock_process_routing_object,
+        mock_process_routes,
+        mock_reconcile,
     ):
-        # Define previous and current items
-        previous_items = {
-            "test1": {"metadata": {"name": "test1", "namespace": "default"}},
-            "test2": {"metadata": {"name": "test2", "namespace": "default"}},
-        }
-        current_items = {
-            "test1": {"metadata": {"name": "test1", "namespace": "default"}},
-            "test3": {"metadata": {"name": "test3", "namespace": "default"}},
+        mock_process_routes.side_effect = lambda routing_object: {
+            f"{routing_object.name}-default": {"url": "https://example.com"}
         }
+        # Define previous and current items
+        previous_items = [make_item("test1", kind="Ingress"), make_item("test2", kind="Ingress")]
+        current_items = [make_item("test1", kind="Ingress"), make_item("test3", kind="Ingress")]
+
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()):
+            handle_changes(make_pages(previous_items), "Ingress")
+            mock_process_routes.reset_mock()
+
+            # Simulate that the items have changed
+            mock_ingressroute_changed.return_value = True
+
+            handle_changes(make_pages(current_items), "Ingress")
+
+        # Verify that process_routes was called for the added item
+        mock_process_routes.assert_any_call(parse_routing_object(current_items[1], "Ingress"))
+
+        # Verify that process_routes was called for the modified item
+        mock_process_routes.assert_any_call(parse_routing_object(current_items[0], "Ingress"))
+
+        # Verify that the monitor of the deleted item is no longer desired
+        self.assertEqual(sorted(controller.desired_monitors), ["test1-default", "test3-default"])
+        mock_reconcile.assert_called_with(full=True)
+
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    def test_handle_changes_same_name_in_different_namespaces(self, mock_reconcile):
+        items = [make_item("test", namespace="team-a", kind="Ingress"), make_item("test", namespace="team-b", kind="Ingress")]
 
-        # Simulate that the items have changed
-        mock_ingressroute_changed.return_value = True
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()):
+            handle_changes(make_pages(items), "Ingress")
+            self.assertEqual(sorted(controller.desired_monitors), ["test-team-a", "test-team-b"])
+            handle_changes(make_pages(items[1:]), "Ingress")
+            self.assertEqual(len(controller.object_store), 1)
 
-        # Call the function under test without storing the result
-        handle_changes(previous_items, current_items, "Ingress")
+        self.assertEqual(list(controller.desired_monitors), ["test-team-b"])
 
-        # Verify that process_routing_object was called for the added item
-        mock_process_routing_object.assert_any_call(current_items["test3"], "Ingress")
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    def test_handle_changes_incomplete_listing_keeps_objects(self, mock_reconcile):
+        items = [make_item("test1", kind="Ingress"), make_item("test2", kind="Ingress")]
 
-        # Verify that process_routing_object was called for the modified item
-        mock_process_routing_object.assert_any_call(current_items["test1"], "Ingress")
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()):
+            self.assertEqual(handle_changes(make_pages(items), "Ingress"), "1")
+            mock_reconcile.reset_mock()
+            # The listing stopped after its first page.
+            self.assertIsNone(handle_changes(make_pages(items)[:1], "Ingress"))
+            self.assertIsNone(handle_changes([], "Ingress"))
 
-        # Verify that delete_monitor was called for the deleted item
-        mock_delete_monitor.assert_called_once_with("test2-default")
+        self.assertEqual(len(controller.desired_monitors), 2)
+        mock_reconcile.assert_not_called()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import patch
+from kubernetes.config import ConfigException
+from kuma_ingress_watcher.controller import init_kubernetes_client
+
+
+class TestInitKubernetesClient(unittest.TestCase):
+    @patch("kuma_ingress_watcher.controller.client")
+    @patch("kuma_ingress_watcher.controller.config.load_kube_config")
+    @patch("kuma_ingress_watcher.controller.config.load_incluster_config")
+    @patch("kuma_ingress_watcher.controller.sys.exit")
+    def test_init_kubernetes_client_in_cluster(self, mock_exit, mock_incluster, mock_kube_config, mock_client):
+        init_kubernetes_client()
+
+        mock_incluster.assert_called_once()
+        mock_kube_config.assert_not_called()
+        mock_exit.assert_not_called()
+
+    @patch("kuma_ingress_watcher.controller.client")
+    @patch("kuma_ingress_watcher.controller.config.load_kube_config")
+    @patch("kuma_ingress_watcher.controller.config.load_incluster_config")
+    @patch("kuma_ingress_watcher.controller.sys.exit")
+    def test_init_kubernetes_client_falls_back_to_kubeconfig(self, mock_exit, mock_incluster, mock_kube_config, mock_client):
+        mock_incluster.side_effect = ConfigException("Service host/port is not set.")
+
+        init_kubernetes_client()
+
+        mock_kube_config.assert_called_once()
+        mock_exit.assert_not_called()
+
+    @patch("kuma_ingress_watcher.controller.client")
+    @patch("kuma_ingress_watcher.controller.logger")
+    @patch("kuma_ingress_watcher.controller.config.load_kube_config")
+    @patch("kuma_ingress_watcher.controller.config.load_incluster_config")
+    @patch("kuma_ingress_watcher.controller.sys.exit")
+    def test_init_kubernetes_client_failure(self, mock_exit, mock_incluster, mock_kube_config, mock_logger, mock_client):
+        mock_incluster.side_effect = ConfigException("Service host/port is not set.")
+        mock_kube_config.side_effect = ConfigException("Invalid kube-config file.")
+
+        init_kubernetes_client()
+
+        mock_exit.assert_called_once_with(1)
+        mock_logger.error.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
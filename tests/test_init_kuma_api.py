@@ -1,9 +1,18 @@
 import unittest
 from unittest.mock import patch, MagicMock
+from kuma_ingress_watcher import controller
 from kuma_ingress_watcher.controller import init_kuma_api
+from kuma_ingress_watcher.kuma_session import KumaSession
 
 
 class TestInitKumaApi(unittest.TestCase):
+    def setUp(self):
+        for name, value in (("kuma", None), ("shutdown_hooks", [])):
+            patcher = patch.object(controller, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: controller.kuma and controller.kuma.close())
+
     @patch("kuma_ingress_watcher.controller.UptimeKumaApi")
     @patch("kuma_ingress_watcher.controller.logger")
     @patch("kuma_ingress_watcher.controller.sys.exit")
@@ -15,6 +24,8 @@ class TestInitKumaApi(unittest.TestCase):
 
         mock_kuma.login.assert_called_once()
         mock_exit.assert_not_called()
+        self.assertIsInstance(controller.kuma, KumaSession)
+        self.assertIn(controller.kuma.close, controller.shutdown_hooks)
 
     @patch("kuma_ingress_watcher.controller.UptimeKumaApi")
     @patch("kuma_ingress_watcher.controller.logger")
@@ -27,6 +38,14 @@ class TestInitKumaApi(unittest.TestCase):
         mock_exit.assert_called_once_with(1)
         mock_logger.error.assert_called_once()
 
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    @patch("kuma_ingress_watcher.controller.invalidate_monitor_index")
+    def test_reconnect_triggers_full_reconcile(self, mock_invalidate, mock_reconcile):
+        controller.on_kuma_reconnected()
+
+        mock_invalidate.assert_called_once()
+        mock_reconcile.assert_called_once_with(full=True)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from socketio.exceptions import BadNamespaceError
+from uptime_kuma_api import UptimeKumaException
+from kuma_ingress_watcher.kuma_session import KumaSession, KumaUnavailable
+
+
+def fake_api():
+    api = MagicMock()
+    api.sio.connected = True
+    api.login.return_value = {"token": "token-1"}
+    return api
+
+
+class TestKumaSession(unittest.TestCase):
+    def setUp(self):
+        self.apis = []
+        self.connect = MagicMock(side_effect=self.new_api)
+        self.on_connect = MagicMock()
+        self.on_reconnect = MagicMock()
+        self.session = KumaSession(
+            self.connect, "user", "password", base_delay=60,
+            on_connect=self.on_connect, on_reconnect=self.on_reconnect,
+        )
+        logger = patch("kuma_ingress_watcher.kuma_session.logger")
+        logger.start()
+        self.addCleanup(logger.stop)
+
+    def new_api(self):
+        api = fake_api()
+        self.apis.append(api)
+        return api
+
+    def test_calls_are_proxied_to_a_logged_in_connection(self):
+        self.session.open()
+        self.apis[0].get_monitors.return_value = [{"id": 1}]
+
+        self.assertEqual(self.session.get_monitors(), [{"id": 1}])
+        self.apis[0].login.assert_called_once_with("user", "password")
+        self.on_connect.assert_called_once_with(self.apis[0])
+        self.assertEqual(self.session.token, "token-1")
+
+    def test_dropped_connection_is_reopened_with_the_token(self):
+        self.session.open()
+        self.apis[0].sio.connected = False
+
+        self.session.delete_monitor(1)
+
+        self.assertEqual(len(self.apis), 2)
+        self.apis[0].disconnect.assert_called_once()
+        self.apis[1].login_by_token.assert_called_once_with("token-1")
+        self.apis[1].login.assert_not_called()
+        self.apis[1].delete_monitor.assert_called_once_with(1)
+        self.on_connect.assert_called_with(self.apis[1])
+
+    def test_rejected_token_falls_back_to_the_password(self):
+        self.session.open()
+        self.apis[0].sio.connected = False
+        self.connect.side_effect = None
+        self.connect.return_value = api = fake_api()
+        api.login_by_token.side_effect = UptimeKumaException("Invalid token")
+
+        self.session.get_monitors()
+
+        api.login.assert_called_once_with("user", "password")
+
+    def test_method_keyword_is_passed_through(self):
+        self.session.open()
+
+        self.session.add_monitor(name="a", method="GET")
+
+        self.apis[0].add_monitor.assert_called_once_with(name="a", method="GET")
+
+    def test_lost_login_is_restored_and_the_call_retried(self):
+        self.session.open()
+        api = self.apis[0]
+        api.edit_monitor.side_effect = [UptimeKumaException("You are not logged in."), {"ok": True}]
+
+        self.assertEqual(self.session.edit_monitor(1, interval=60), {"ok": True})
+        api.login_by_token.assert_called_once_with("token-1")
+        self.assertEqual(api.edit_monitor.call_count, 2)
+
+    def test_connection_errors_are_raised_and_the_connection_dropped(self):
+        self.session.open()
+        self.apis[0].add_monitor.side_effect = BadNamespaceError("/ is not a connected namespace.")
+
+        with self.assertRaises(BadNamespaceError):
+            self.session.add_monitor(name="a")
+
+        # Not retried: the monitor may have been added before the socket broke.
+        self.apis[0].add_monitor.assert_called_once()
+        self.assertIsNone(self.session.connections[0].api)
+
+    def test_other_errors_are_raised_as_is(self):
+        self.session.open()
+        self.apis[0].delete_monitor.side_effect = UptimeKumaException("Monitor not found")
+
+        with self.assertRaises(UptimeKumaException):
+            self.session.delete_monitor(1)
+        self.assertIs(self.session.connections[0].api, self.apis[0])
+
+    def test_failed_reconnects_back_off(self):
+        self.session.open()
+        self.apis[0].sio.connected = False
+        self.connect.side_effect = UptimeKumaException("unable to connect")
+
+        with self.assertRaises(UptimeKumaException):
+            self.session.get_monitors()
+        with self.assertRaises(KumaUnavailable):
+            self.session.get_monitors()
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_heartbeat_reconnects_and_resyncs(self):
+        self.session.open()
+        self.apis[0].get_settings.side_effect = BadNamespaceError("/ is not a connected namespace.")
+
+        self.session.heartbeat()
+        self.on_reconnect.assert_not_called()
+        self.session.heartbeat()
+
+        self.assertEqual(len(self.apis), 2)
+        self.apis[1].get_settings.assert_called_once()
+        self.on_reconnect.assert_called_once()
+
+    def test_socketio_reconnect_requires_a_new_login(self):
+        self.session.open()
+        api = self.apis[0]
+        on_connect = next(call.args[1] for call in api.sio.on.call_args_list if call.args[0] == "connect")
+
+        on_connect()
+        self.session.get_monitors()
+
+        api.login_by_token.assert_called_once_with("token-1")
+        self.assertEqual(len(self.apis), 1)
+
+    def test_pool_spreads_calls_and_registers_events_once(self):
+        session = KumaSession(self.connect, "user", "password", pool_size=3, on_connect=self.on_connect)
+        session.open()
+
+        for monitor_id in range(6):
+            session.delete_monitor(monitor_id)
+
+        self.assertEqual([api.delete_monitor.call_count for api in self.apis], [2, 2, 2])
+        self.on_connect.assert_called_once_with(self.apis[0])
+        # One password login; the other connections reuse its token.
+        self.assertEqual(sum(api.login.call_count for api in self.apis), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
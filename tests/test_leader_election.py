@@ -0,0 +1,167 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+from kubernetes.client.rest import ApiException
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import (
+    on_started_leading,
+    reconcile,
+    reset_desired_monitors,
+    set_desired_monitors,
+    sync_monitor,
+)
+from kuma_ingress_watcher.leader_election import LeaderElector
+from kuma_ingress_watcher.records import DesiredMonitor
+
+FIELDS = DesiredMonitor(name="app", url="https://app.example.com")
+
+
+def make_lease(holder, renew_time=None, transitions=0, resource_version="7"):
+    lease = MagicMock()
+    lease.metadata.resource_version = resource_version
+    lease.spec.holder_identity = holder
+    lease.spec.lease_duration_seconds = 15
+    lease.spec.renew_time = renew_time or datetime.now(timezone.utc)
+    lease.spec.acquire_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    lease.spec.lease_transitions = transitions
+    return lease
+
+
+class TestLeaderElector(unittest.TestCase):
+    def setUp(self):
+        self.api = MagicMock()
+        self.started = MagicMock()
+        self.stopped = MagicMock()
+        self.elector = LeaderElector(
+            self.api, "default", "kiw-leader", "a",
+            on_started_leading=self.started, on_stopped_leading=self.stopped,
+        )
+
+    def test_creates_missing_lease_and_leads(self):
+        self.api.read_namespaced_lease.side_effect = ApiException(status=404)
+
+        self.elector.step()
+
+        namespace, body = self.api.create_namespaced_lease.call_args[0]
+        self.assertEqual(namespace, "default")
+        self.assertEqual(body["spec"]["holderIdentity"], "a")
+        self.assertTrue(self.elector.is_leader)
+        self.started.assert_called_once()
+
+    def test_stays_standby_while_holder_renews(self):
+        self.api.read_namespaced_lease.return_value = make_lease("b")
+
+        self.elector.step()
+
+        self.assertFalse(self.elector.is_leader)
+        self.assertEqual(self.elector.holder, "b")
+        self.api.replace_namespaced_lease.assert_not_called()
+        self.started.assert_not_called()
+
+    @patch("kuma_ingress_watcher.leader_election.time.monotonic")
+    def test_takes_over_lease_unchanged_for_its_duration(self, mock_monotonic):
+        lease = make_lease("b", transitions=2)
+        self.api.read_namespaced_lease.return_value = lease
+        mock_monotonic.return_value = 100
+        self.elector.step()
+
+        mock_monotonic.return_value = 116
+        self.elector.step()
+
+        name, namespace, body = self.api.replace_namespaced_lease.call_args[0]
+        self.assertEqual((name, namespace), ("kiw-leader", "default"))
+        self.assertEqual(body["metadata"]["resourceVersion"], "7")
+        self.assertEqual(body["spec"]["holderIdentity"], "a")
+        self.assertEqual(body["spec"]["leaseTransitions"], 3)
+        self.assertTrue(self.elector.is_leader)
+
+    def test_renewal_keeps_acquire_time_and_transitions(self):
+        self.api.read_namespaced_lease.return_value = make_lease("a", transitions=2)
+
+        self.elector.step()
+
+        body = self.api.replace_namespaced_lease.call_args[0][2]
+        self.assertEqual(body["spec"]["acquireTime"], "2024-01-01T00:00:00.000000Z")
+        self.assertEqual(body["spec"]["leaseTransitions"], 2)
+
+    def test_lost_race_stays_standby(self):
+        self.api.read_namespaced_lease.return_value = make_lease(None)
+        self.api.replace_namespaced_lease.side_effect = ApiException(status=409)
+
+        self.elector.step()
+
+        self.assertFalse(self.elector.is_leader)
+        self.started.assert_not_called()
+
+    @patch("kuma_ingress_watcher.leader_election.time.monotonic")
+    def test_steps_down_when_renewal_fails_for_lease_duration(self, mock_monotonic):
+        self.api.read_namespaced_lease.return_value = make_lease("a")
+        mock_monotonic.return_value = 100
+        self.elector.step()
+
+        self.api.read_namespaced_lease.side_effect = ApiException(status=500)
+        mock_monotonic.return_value = 110
+        self.elector.step()
+        self.assertTrue(self.elector.is_leader)
+
+        mock_monotonic.return_value = 116
+        self.elector.step()
+        self.assertFalse(self.elector.is_leader)
+        self.stopped.assert_called_once()
+
+    def test_release_clears_holder(self):
+        self.api.read_namespaced_lease.return_value = make_lease("a")
+        self.elector.step()
+
+        self.elector.release()
+
+        body = self.api.replace_namespaced_lease.call_args[0][2]
+        self.assertIsNone(body["spec"]["holderIdentity"])
+        self.assertFalse(self.elector.is_leader)
+        self.stopped.assert_called_once()
+
+
+class TestStandby(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+        self.elector = MagicMock(is_leader=False)
+        patcher = patch.object(controller, "leader_elector", self.elector)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(reset_desired_monitors)
+
+    @patch("kuma_ingress_watcher.controller.apply_plan")
+    @patch("kuma_ingress_watcher.controller.ensure_monitor_index")
+    def test_standby_does_not_reconcile(self, mock_ensure, mock_apply):
+        set_desired_monitors("test", {"app": FIELDS})
+
+        self.assertIsNone(reconcile())
+
+        mock_apply.assert_not_called()
+        self.assertIn("app", controller.dirty_monitors)
+
+    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
+    def test_standby_drops_queued_writes(self, mock_create_or_update):
+        set_desired_monitors("test", {"app": FIELDS})
+
+        self.assertTrue(sync_monitor("app"))
+
+        mock_create_or_update.assert_not_called()
+
+    @patch("kuma_ingress_watcher.controller.apply_plan")
+    @patch("kuma_ingress_watcher.controller.ensure_monitor_index")
+    def test_promotion_reconciles_everything_changed_on_standby(self, mock_ensure, mock_apply):
+        set_desired_monitors("test", {"app": FIELDS})
+        self.assertIsNone(reconcile())
+
+        self.elector.is_leader = True
+        with patch.dict(controller.monitor_index, {}, clear=True):
+            on_started_leading()
+
+        plan = mock_apply.call_args[0][0]
+        self.assertEqual(list(plan["create"]), ["app"])
+        self.assertFalse(controller.dirty_monitors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import patch
+from prometheus_client import REGISTRY
+from kuma_ingress_watcher import metrics
+from kuma_ingress_watcher.controller import create_or_update_monitor, invalidate_monitor_index
+
+
+def sample(name, labels=None):
+    return REGISTRY.get_sample_value(f"kuma_ingress_watcher_{name}", labels or {}) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    def test_track_kuma_call_counts_success_and_errors(self):
+        success = sample("kuma_api_calls_total", {"operation": "test_op", "status": "success"})
+        errors = sample("kuma_api_calls_total", {"operation": "test_op", "status": "error"})
+
+        with metrics.track_kuma_call("test_op"):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.track_kuma_call("test_op"):
+                raise ValueError("boom")
+
+        self.assertEqual(sample("kuma_api_calls_total", {"operation": "test_op", "status": "success"}), success + 1)
+        self.assertEqual(sample("kuma_api_calls_total", {"operation": "test_op", "status": "error"}), errors + 1)
+        self.assertGreaterEqual(sample("kuma_api_call_duration_seconds_count", {"operation": "test_op"}), 2)
+
+    @patch("kuma_ingress_watcher.controller.kuma")
+    def test_kuma_wrappers_are_instrumented(self, mock_kuma):
+        invalidate_monitor_index()
+        mock_kuma.get_monitors.return_value = []
+        mock_kuma.add_monitor.return_value = {"monitorID": 1}
+        before = sample("kuma_api_calls_total", {"operation": "add_monitor", "status": "success"})
+
+        create_or_update_monitor("test", "https://example.com", 60, "http", None, "GET")
+
+        self.assertEqual(sample("kuma_api_calls_total", {"operation": "add_monitor", "status": "success"}), before + 1)
+        invalidate_monitor_index()
+
+    def test_noop_metric(self):
+        metric = metrics.NoopMetric()
+
+        metric.labels("a").inc()
+        metric.labels("a").observe(1)
+        metric.set(1)
+        metric.set_function(lambda: 1)
+
+    @patch("kuma_ingress_watcher.metrics.start_http_server", None)
+    def test_start_metrics_server_without_prometheus_client(self):
+        self.assertFalse(metrics.start_metrics_server(9100))
+
+    @patch("kuma_ingress_watcher.metrics.start_http_server")
+    def test_start_metrics_server(self, mock_start_http_server):
+        self.assertTrue(metrics.start_metrics_server(9100))
+        mock_start_http_server.assert_called_once_with(9100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+import yaml
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import load_monitor_files, reload_monitor_file, reset_desired_monitors
+from kuma_ingress_watcher.monitor_file import iter_entries, monitor_files
+
+
+class TestIterEntries(unittest.TestCase):
+    def test_multiple_documents(self):
+        stream = io.StringIO(
+            "- &base {name: a, url: http://a, headers: {X-Team: ops}}\n"
+            "- *base\n"
+            "---\n"
+            "name: b\n"
+            "url: http://b\n"
+            "---\n"
+            "---\n"
+            "- {name: c, url: http://c}\n"
+        )
+
+        self.assertEqual(
+            [entry["name"] for entry in iter_entries(stream)],
+            ["a", "a", "b", "c"],
+        )
+
+    def test_entries_are_yielded_before_the_end_of_the_file(self):
+        entries = iter_entries(io.StringIO("- {name: a, url: http://a}\n- {name: b, url: [\n"))
+
+        self.assertEqual(next(entries)["name"], "a")
+        with self.assertRaises(yaml.YAMLError):
+            list(entries)
+
+    def test_empty_stream(self):
+        self.assertEqual(list(iter_entries(io.StringIO("  \n# nothing\n"))), [])
+
+
+class TestMonitorDirectory(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+        self.addCleanup(reset_desired_monitors)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = patch("kuma_ingress_watcher.controller.reconcile")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_lists_yaml_files_in_order(self):
+        second = self.write("b.yml", "")
+        first = self.write("a.yaml", "")
+        self.write("notes.txt", "")
+        self.write(".hidden.yaml", "")
+
+        self.assertEqual(monitor_files(self.directory), [first, second])
+        self.assertEqual(monitor_files(first), [first])
+
+    def test_each_file_is_a_source(self):
+        first = self.write("a.yaml", "- {name: a, url: http://a}\n")
+        second = self.write("b.yaml", "- {name: b, url: http://b}\n")
+
+        load_monitor_files(self.directory)
+
+        self.assertEqual(set(controller.desired_by_source), {("File", first), ("File", second)})
+
+        # A broken shard keeps its monitors without affecting the others
+        self.write("a.yaml", "- {name: a, url: [\n")
+        self.write("b.yaml", "- {name: b, url: http://b2}\n")
+        load_monitor_files(self.directory)
+
+        self.assertEqual(controller.desired_monitors["a"].url, "http://a")
+        self.assertEqual(controller.desired_monitors["b"].url, "http://b2")
+
+    def test_removed_file_drops_its_monitors(self):
+        first = self.write("a.yaml", "- {name: a, url: http://a}\n")
+        self.write("b.yaml", "- {name: b, url: http://b}\n")
+        load_monitor_files(self.directory)
+
+        os.remove(first)
+        with patch.object(controller, "FILE_MONITOR_PATH", self.directory):
+            reload_monitor_file(first)
+
+        self.assertEqual(sorted(controller.desired_monitors), ["b"])
+        self.assertIn("a", controller.managed_monitors)
+
+
+if __name__ == "__main__":
+    unittest.main()
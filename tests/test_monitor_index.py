@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import (
+    create_or_update_monitor,
+    delete_monitor,
+    invalidate_monitor_index,
+    load_monitor_index,
+    register_monitor_index_events,
+)
+
+
+class TestMonitorIndex(unittest.TestCase):
+    def setUp(self):
+        invalidate_monitor_index()
+
+    @patch("kuma_ingress_watcher.controller.kuma")
+    def test_index_loaded_once_for_many_writes(self, mock_kuma):
+        mock_kuma.get_monitors.return_value = [
+            {"name": "group", "type": "group", "id": 1},
+            {"name": "a", "type": "http", "id": 2},
+        ]
+        mock_kuma.add_monitor.return_value = {"msg": "Added Successfully.", "monitorID": 3}
+
+        create_or_update_monitor("a", "https://a", 60, "http", None, "GET", "group")
+        create_or_update_monitor("b", "https://b", 60, "http", None, "GET")
+        create_or_update_monitor("b", "https://b2", 60, "http", None, "GET")
+        delete_monitor("a")
+
+        mock_kuma.get_monitors.assert_called_once()
+        mock_kuma.edit_monitor.assert_any_call(
+            3,
+            type="http",
+            url="https://b2",
+            interval=60,
+            method="GET",
+            headers=None,
+            parent=None,
+            accepted_statuscodes=None,
+        )
+        mock_kuma.delete_monitor.assert_called_once_with(2)
+        self.assertEqual(controller.monitor_index["b"]["url"], "https://b2")
+        self.assertNotIn("a", controller.monitor_index)
+
+    @patch("kuma_ingress_watcher.controller.MONITOR_INDEX_TTL", 0)
+    @patch("kuma_ingress_watcher.controller.kuma")
+    def test_index_refreshed_after_ttl(self, mock_kuma):
+        mock_kuma.get_monitors.return_value = [{"name": "a", "id": 1}]
+
+        delete_monitor("a")
+        with patch("kuma_ingress_watcher.controller.time.monotonic", return_value=1e12):
+            delete_monitor("a")
+
+        self.assertEqual(mock_kuma.get_monitors.call_count, 2)
+
+    def test_monitor_list_event_updates_index(self):
+        api = MagicMock()
+        handlers = {}
+        api.sio.on.side_effect = lambda event, handler: handlers.__setitem__(event, handler)
+        register_monitor_index_events(api)
+
+        handlers["monitorList"]({"5": {"id": 5, "name": "pushed", "type": "group"}})
+
+        api._event_monitor_list.assert_called_once()
+        self.assertEqual(controller.monitor_index["pushed"]["id"], 5)
+        self.assertEqual(controller.group_index["pushed"], 5)
+
+        handlers["disconnect"]()
+        self.assertIsNone(controller.monitor_index_loaded_at)
+
+    @patch("kuma_ingress_watcher.controller.kuma")
+    def test_late_monitor_list_keeps_recent_writes(self, mock_kuma):
+        mock_kuma.get_monitors.return_value = [{"name": "a", "type": "http", "id": 1}, {"name": "b", "type": "http", "id": 2}]
+        mock_kuma.add_monitor.return_value = {"msg": "Added Successfully.", "monitorID": 3}
+        create_or_update_monitor("c", "https://c", 60, "http", None, "GET")
+        delete_monitor("b")
+
+        # Pushed before both writes completed.
+        load_monitor_index([{"name": "a", "type": "http", "id": 1}, {"name": "b", "type": "http", "id": 2}])
+
+        self.assertEqual(sorted(controller.monitor_index), ["a", "c"])
+        self.assertEqual(controller.monitor_index["c"]["id"], 3)
+
+        # A newer list is trusted: "c" was deleted in Uptime Kuma meanwhile.
+        load_monitor_index([{"name": "a", "type": "http", "id": 1}, {"name": "d", "type": "http", "id": 4}])
+
+        self.assertEqual(sorted(controller.monitor_index), ["a", "d"])
+        self.assertEqual(controller.created_monitor_ids, {})
+        self.assertEqual(controller.deleted_monitor_ids, set())
+
+    def test_load_monitor_index_replaces_previous_content(self):
+        load_monitor_index([{"name": "old", "id": 1}])
+        load_monitor_index([{"name": "new", "id": 2}])
+
+        self.assertEqual(list(controller.monitor_index), ["new"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import MagicMock
+from kuma_ingress_watcher.cache import ObjectStore
+from tests.helpers import make_item
+
+
+def rule_hosts(kind, item):
+    return [rule["host"] for rule in item["spec"].get("rules", [])]
+
+
+class TestObjectStore(unittest.TestCase):
+    def setUp(self):
+        self.on_add = MagicMock()
+        self.on_update = MagicMock()
+        self.on_delete = MagicMock()
+        self.store = ObjectStore(
+            indexers={
+                "namespace": lambda kind, item: [item["metadata"]["namespace"]],
+                "host": rule_hosts,
+            }
+        )
+        self.store.add_event_handler(self.on_add, self.on_update, self.on_delete)
+
+    def test_upsert_add_then_update(self):
+        first = make_item("test", "a.com", kind="Ingress")
+        second = make_item("test", "b.com", kind="Ingress")
+
+        key = self.store.upsert("Ingress", first)
+        self.store.upsert("Ingress", second)
+
+        self.assertEqual(key, ("Ingress", "default", "test"))
+        self.on_add.assert_called_once_with(key, first)
+        self.on_update.assert_called_once_with(key, first, second, second)
+        self.assertEqual(self.store.by_index("host", "a.com"), set())
+        self.assertEqual(self.store.by_index("host", "b.com"), {key})
+        self.assertIs(self.store.get(key), second)
+
+    def test_same_name_different_namespaces(self):
+        self.store.upsert("Ingress", make_item("test", "a.com", "team-a", kind="Ingress"))
+        self.store.upsert("Ingress", make_item("test", "a.com", "team-b", kind="Ingress"))
+
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(
+            self.store.by_index("host", "a.com"),
+            {("Ingress", "team-a", "test"), ("Ingress", "team-b", "test")},
+        )
+        self.assertEqual(self.store.by_index("namespace", "team-b"), {("Ingress", "team-b", "test")})
+
+    def test_recreated_object_with_new_uid(self):
+        old = make_item("test", kind="Ingress", uid="1")
+        new = make_item("test", kind="Ingress", uid="2")
+
+        key = self.store.upsert("Ingress", old)
+        self.store.upsert("Ingress", new)
+
+        self.on_delete.assert_called_once_with(key, old)
+        self.assertEqual(self.on_add.call_count, 2)
+        self.on_update.assert_not_called()
+        self.assertEqual(self.store.get_uid(key), "2")
+
+    def test_replace_only_touches_its_kind(self):
+        self.store.upsert("IngressRoute", make_item("route"))
+        self.store.upsert("Ingress", make_item("stale", kind="Ingress"))
+
+        self.store.replace("Ingress", iter([make_item("fresh", kind="Ingress")]))
+
+        self.assertEqual(
+            sorted(self.store.keys()),
+            [("Ingress", "default", "fresh"), ("IngressRoute", "default", "route")],
+        )
+        self.on_delete.assert_called_once()
+
+    def test_delete_unknown_key(self):
+        self.store.delete(("Ingress", "default", "missing"))
+
+        self.on_delete.assert_not_called()
+
+    def test_transform_keeps_only_compact_value(self):
+        store = ObjectStore(
+            indexers={"host": lambda kind, hosts: hosts},
+            transform=lambda kind, item: tuple(rule_hosts(kind, item)),
+        )
+        on_update = MagicMock()
+        store.add_event_handler(on_update=on_update)
+        item = make_item("test", "a.com", kind="Ingress")
+
+        key = store.upsert("Ingress", item)
+        store.upsert("Ingress", make_item("test", "b.com", kind="Ingress"))
+
+        self.assertEqual(store.get(key), ("b.com",))
+        on_update.assert_called_once_with(key, ("a.com",), ("b.com",), make_item("test", "b.com", kind="Ingress"))
+        self.assertEqual(store.by_index("host", "a.com"), set())
+
+    def test_snapshot_and_restore(self):
+        key = self.store.upsert("Ingress", make_item("test", "a.com", kind="Ingress", uid="1"))
+        restored = ObjectStore(
+            indexers={
+                "namespace": lambda kind, item: [item["metadata"]["namespace"]],
+                "host": rule_hosts,
+            }
+        )
+        on_add = MagicMock()
+        restored.add_event_handler(on_add=on_add)
+
+        for entry in self.store.snapshot():
+            restored.restore(*entry)
+
+        on_add.assert_not_called()
+        self.assertEqual(restored.get(key), make_item("test", "a.com", kind="Ingress", uid="1"))
+        self.assertEqual(restored.get_uid(key), "1")
+        self.assertEqual(restored.by_index("host", "a.com"), {key})
+        self.assertEqual(restored.count("Ingress"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from kuma_ingress_watcher.controller import ingressroute_changed, parse_routing_object
+from kuma_ingress_watcher.records import ProbeSettings, RoutingObject
+from tests.helpers import make_item
+
+
+def make_route_item(match="Host(`example.com`)", annotations=None, **extra):
+    item = make_item("test")
+    item["metadata"]["annotations"] = annotations or {}
+    item["spec"]["routes"][0]["match"] = match
+    item.update(extra)
+    return item
+
+
+class TestParseRoutingObject(unittest.TestCase):
+    def test_parses_hosts_and_probe_settings(self):
+        routing_object = parse_routing_object(
+            make_route_item(annotations={
+                "uptime-kuma.autodiscovery.probe.interval": "30",
+                "uptime-kuma.autodiscovery.probe.accepted-statuscodes": "['200-299', 301]",
+            }),
+            "IngressRoute",
+        )
+
+        self.assertEqual(
+            routing_object,
+            RoutingObject(
+                kind="IngressRoute",
+                namespace="default",
+                name="test",
+                hosts=(("example.com",),),
+                probe=ProbeSettings(interval=30, accepted_statuscodes=("200-299", 301)),
+            ),
+        )
+        self.assertEqual(routing_object.key, ("IngressRoute", "default", "test"))
+        self.assertEqual(len({routing_object, parse_routing_object(make_route_item(), "IngressRoute"), routing_object}), 2)
+
+    def test_ignores_status_and_unrelated_metadata(self):
+        old = make_route_item()
+        new = make_route_item(
+            annotations={"kubectl.kubernetes.io/last-applied-configuration": "{}"},
+            status={"loadBalancer": {}},
+        )
+        new["metadata"]["managedFields"] = [{"manager": "kubectl"}]
+        new["metadata"]["resourceVersion"] = "2"
+
+        self.assertFalse(
+            ingressroute_changed(parse_routing_object(old, "IngressRoute"), parse_routing_object(new, "IngressRoute"))
+        )
+
+    def test_detects_host_change(self):
+        old = parse_routing_object(make_route_item(), "IngressRoute")
+        new = parse_routing_object(make_route_item("Host(`example.org`)"), "IngressRoute")
+
+        self.assertTrue(ingressroute_changed(old, new))
+
+    def test_detects_probe_annotation_change(self):
+        old = parse_routing_object(make_route_item(), "IngressRoute")
+        new = parse_routing_object(
+            make_route_item(annotations={"uptime-kuma.autodiscovery.probe.interval": "30"}), "IngressRoute"
+        )
+
+        self.assertTrue(ingressroute_changed(old, new))
+
+    def test_ingress_without_rules(self):
+        item = {"metadata": {"name": "test", "namespace": "default"}, "spec": {"rules": None}}
+
+        self.assertEqual(parse_routing_object(item, "Ingress").hosts, ())
+
+    def test_round_trips_through_dict(self):
+        routing_object = parse_routing_object(make_route_item(annotations={
+            "uptime-kuma.autodiscovery.probe.accepted-statuscodes": "['200-299']",
+        }), "IngressRoute")
+
+        self.assertEqual(RoutingObject.from_dict(routing_object.to_dict()), routing_object)
+
+
+if __name__ == "__main__":
+    unittest.main()
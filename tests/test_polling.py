@@ -0,0 +1,35 @@
+import random
+import unittest
+from kuma_ingress_watcher.polling import PollScheduler
+
+
+class TestPollScheduler(unittest.TestCase):
+    def test_backs_off_while_idle_and_snaps_back_on_changes(self):
+        scheduler = PollScheduler(10, 60, jitter=0)
+
+        delays = [scheduler.next_delay(0, changed) for changed in (True, False, False, False, False, True)]
+
+        self.assertEqual(delays, [10, 20, 40, 60, 60, 10])
+
+    def test_cycle_duration_is_subtracted(self):
+        scheduler = PollScheduler(10, 60, jitter=0)
+
+        self.assertEqual(scheduler.next_delay(3, True), 7)
+        self.assertEqual(scheduler.next_delay(25, True), 0)
+
+    def test_jitter_stays_within_bounds(self):
+        scheduler = PollScheduler(10, jitter=0.2, rng=random.Random(1))
+
+        delays = {scheduler.next_delay(0, True) for _ in range(200)}
+
+        self.assertTrue(all(8 <= delay <= 12 for delay in delays))
+        self.assertGreater(len(delays), 1)
+
+    def test_max_interval_never_below_interval(self):
+        scheduler = PollScheduler(30, 10, jitter=0)
+
+        self.assertEqual(scheduler.next_delay(0, False), 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,17 +1,19 @@
 import unittest
 from unittest.mock import patch, MagicMock
-import yaml
-from kuma_ingress_watcher.controller import process_monitor_file
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import process_monitor_file, reset_desired_monitors
+from kuma_ingress_watcher.records import DesiredMonitor
 
 
 class TestProcessFileIngress(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     @patch("kuma_ingress_watcher.controller.open", new_callable=MagicMock)
     def test_process_monitor_file_empty_file(self, mock_open, mock_logger):
         mock_file_content = ""
-        mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
-        )
+        mock_open.side_effect = unittest.mock.mock_open(read_data=mock_file_content)
 
         process_monitor_file("empty_file.yaml")
 
@@ -30,15 +32,13 @@ class TestProcessFileIngress(unittest.TestCase):
         - name: invalid-ingress
           url example.com  # Erreur dans le YAML
         """
-        mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
-        )
+        mock_open.side_effect = unittest.mock.mock_open(read_data=mock_file_content)
 
-        with patch("yaml.safe_load", side_effect=yaml.YAMLError("Invalid YAML")):
-            process_monitor_file("mock_file.yaml")
+        process_monitor_file("mock_file.yaml")
 
-        mock_logger.error.assert_called_once_with(
-            "Failed to process file mock_file.yaml: Invalid YAML format (Invalid YAML)"
+        mock_logger.error.assert_called_once()
+        self.assertTrue(
+            mock_logger.error.call_args[0][0].startswith("Failed to process file mock_file.yaml: Invalid YAML format (")
         )
 
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
@@ -49,9 +49,7 @@ class TestProcessFileIngress(unittest.TestCase):
           url: http://example.com
           accepted-statuscodes: not_a_list
         """
-        mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
-        )
+        mock_open.side_effect = unittest.mock.mock_open(read_data=mock_file_content)
 
         process_monitor_file("mock_file.yaml")
 
@@ -59,9 +57,9 @@ class TestProcessFileIngress(unittest.TestCase):
 
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     @patch("kuma_ingress_watcher.controller.open", new_callable=MagicMock)
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor", spec=True)
+    @patch("kuma_ingress_watcher.controller.reconcile", spec=True)
     def test_process_monitor_file_valid_entries(
-        self, mock_create_or_update_monitor, mock_open, mock_logger
+        self, mock_reconcile, mock_open, mock_logger
     ):
         mock_file_content = """
         - name: test-ingress
@@ -74,22 +72,26 @@ class TestProcessFileIngress(unittest.TestCase):
           accepted-statuscodes:
             - 200-299
         """
-        mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
-        )
+        mock_open.side_effect = unittest.mock.mock_open(read_data=mock_file_content)
 
         process_monitor_file("mock_file.yaml")
 
-        mock_create_or_update_monitor.assert_called_once_with(
-            "test-ingress",
-            "http://example.com",
-            30,
-            "http",
-            {"Authorization": "Bearer token"},
-            "POST",
-            "test-parent",
-            ["200-299"]
+        self.assertEqual(
+            controller.desired_monitors,
+            {
+                "test-ingress": DesiredMonitor(
+                    name="test-ingress",
+                    url="http://example.com",
+                    interval=30,
+                    probe_type="http",
+                    headers='{"Authorization": "Bearer token"}',
+                    method="POST",
+                    parent="test-parent",
+                    accepted_statuscodes=("200-299",),
+                )
+            },
         )
+        mock_reconcile.assert_called_once_with()
 
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     @patch("kuma_ingress_watcher.controller.open", new_callable=MagicMock)
@@ -119,9 +121,7 @@ class TestProcessFileIngress(unittest.TestCase):
         mock_file_content = """
         - not_a_dict
         """
-        mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
-        )
+        mock_open.side_effect = unittest.mock.mock_open(read_data=mock_file_content)
 
         process_monitor_file("mock_file.yaml")
 
@@ -131,9 +131,9 @@ class TestProcessFileIngress(unittest.TestCase):
 
     @patch("kuma_ingress_watcher.controller.logger", spec=True)
     @patch("kuma_ingress_watcher.controller.open", new_callable=MagicMock)
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor", spec=True)
+    @patch("kuma_ingress_watcher.controller.reconcile", spec=True)
     def test_process_monitor_file_multiple_valid_entries_with_non_default_values(
-        self, mock_create_or_update_monitor, mock_open, mock_logger
+        self, mock_reconcile, mock_open, mock_logger
     ):
         # Contenu simulé du fichier avec plusieurs entrées valides et des valeurs personnalisées
         mock_file_content = """
@@ -180,15 +180,15 @@ class TestProcessFileIngress(unittest.TestCase):
           type: http
           probe_type: http
         """
-        mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
-        )
+        mock_open.side_effect = unittest.mock.mock_open(read_data=mock_file_content)
 
         process_monitor_file("mock_file.yaml")
 
         mock_logger.warning.assert_not_called()
 
-        assert mock_create_or_update_monitor.call_count == 7
+        # Later entries with the same name replace earlier ones
+        self.assertEqual(sorted(controller.desired_monitors), ["ingress1", "ingress2", "ingress3"])
+        self.assertEqual(controller.desired_monitors["ingress2"].method, "PUT")
 
 
 if __name__ == "__main__":
@@ -1,220 +1,116 @@
 import unittest
-from unittest.mock import patch
-from kuma_ingress_watcher.controller import process_routes
+from kuma_ingress_watcher.controller import parse_routing_object, process_routes
+from kuma_ingress_watcher.records import DesiredMonitor, ProbeSettings, RoutingObject
+from tests.helpers import make_item
+
+
+def routing_object(hosts, **probe):
+    return RoutingObject(
+        kind="IngressRoute",
+        namespace="default",
+        name="test",
+        hosts=tuple(tuple(route_hosts) for route_hosts in hosts),
+        probe=ProbeSettings(monitor_name="test-monitor", **probe),
+    )
+
+
+def monitor(name, url, parent=None, accepted_statuscodes=None):
+    return DesiredMonitor(name=name, url=url, parent=parent, accepted_statuscodes=accepted_statuscodes)
 
 
 class TestProcessRoutes(unittest.TestCase):
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_single_route(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.return_value = ["example.com"]
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[{"match": "Host(`example.com`)"}],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host=None,
-            path=None,
-            port="8080",
-            method="GET",
-            type_obj="IngressRoute",
-            parent="testgroup",
-            accepted_statuscodes=["200-299"]
+    def test_process_routes_single_route(self):
+        monitors = process_routes(
+            routing_object([["example.com"]], port="8080", parent="testgroup", accepted_statuscodes=("200-299",))
         )
 
-        mock_create_or_update_monitor.assert_called_once_with(
-            "test-monitor", "https://example.com:8080", 60, "http", None, "GET", "testgroup", ["200-299"]
+        self.assertEqual(
+            monitors,
+            {"test-monitor": monitor("test-monitor", "https://example.com:8080", "testgroup", ("200-299",))},
         )
 
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_multiple_routes(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.side_effect = [["example.com"], ["example.org"]]
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[
-                {"match": "Host(`example.com`)"},
-                {"match": "Host(`example.org`)"},
-            ],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host=None,
-            path=None,
-            port="8080",
-            method="GET",
-            type_obj="IngressRoute",
-        )
+    def test_process_routes_multiple_routes(self):
+        monitors = process_routes(routing_object([["example.com"], ["example.org"]], port="8080"))
 
-        self.assertEqual(mock_create_or_update_monitor.call_count, 2)
-        calls = [
-            unittest.mock.call(
-                "test-monitor-1", "https://example.com:8080", 60, "http", None, "GET", None, None
-            ),
-            unittest.mock.call(
-                "test-monitor-2", "https://example.org:8080", 60, "http", None, "GET", None, None
-            ),
-        ]
-        mock_create_or_update_monitor.assert_has_calls(calls)
-
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_no_hosts(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.return_value = []
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[{"match": "Path(`/test`)"}],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host=None,
-            path=None,
-            port="8080",
-            method="GET",
-            type_obj="IngressRoute",
+        self.assertEqual(
+            monitors,
+            {
+                "test-monitor-1": monitor("test-monitor-1", "https://example.com:8080"),
+                "test-monitor-2": monitor("test-monitor-2", "https://example.org:8080"),
+            },
         )
 
-        mock_create_or_update_monitor.assert_not_called()
-
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_with_empty_port(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.return_value = ["example.com"]
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[{"match": "Host(`example.com`)"}],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host=None,
-            path=None,
-            port=None,
-            method="GET",
-            type_obj="IngressRoute",
-        )
+    def test_process_routes_several_hosts_in_one_route(self):
+        monitors = process_routes(routing_object([["a.com", "b.com"], ["example.org"]]))
 
-        mock_create_or_update_monitor.assert_called_once_with(
-            "test-monitor", "https://example.com", 60, "http", None, "GET", None, None
+        self.assertEqual(
+            monitors,
+            {
+                "test-monitor-1-1": monitor("test-monitor-1-1", "https://a.com"),
+                "test-monitor-1-2": monitor("test-monitor-1-2", "https://b.com"),
+                "test-monitor-2": monitor("test-monitor-2", "https://example.org"),
+            },
         )
 
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_with_path(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.return_value = ["example.com"]
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[{"match": "Host(`example.com`)"}],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host=None,
-            path="/milou",
-            port=None,
-            method="GET",
-            type_obj="IngressRoute",
-        )
+    def test_process_routes_several_hosts_from_a_rule(self):
+        item = make_item("test")
+        item["spec"]["routes"][0]["match"] = "Host(`a.com`, `b.com`) || HostSNI(`c.com`)"
 
-        mock_create_or_update_monitor.assert_called_once_with(
-            "test-monitor", "https://example.com/milou", 60, "http", None, "GET", None, None
-        )
+        monitors = process_routes(parse_routing_object(item, "IngressRoute"))
 
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_with_hard_host_and_path(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.return_value = ["example.com"]
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[{"match": "Host(`example.com`)"}],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host="tintin",
-            path="/milou",
-            port=None,
-            method="GET",
-            type_obj="IngressRoute",
+        self.assertEqual(
+            {name: monitor.url for name, monitor in monitors.items()},
+            {"test-default-1": "https://a.com", "test-default-2": "https://b.com", "test-default-3": "https://c.com"},
         )
 
-        mock_create_or_update_monitor.assert_called_once_with(
-            "test-monitor", "https://tintin/milou", 60, "http", None, "GET", None, None
-        )
+    def test_process_routes_several_hosts_with_hard_host(self):
+        monitors = process_routes(routing_object([["a.com", "b.com"]], host="tintin"))
 
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_with_hard_host_and_path_and_port(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.return_value = ["example.com"]
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[{"match": "Host(`example.com`)"}],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host="tintin",
-            path="/milou",
-            port=8080,
-            method="GET",
-            type_obj="IngressRoute",
-        )
+        self.assertEqual(monitors, {"test-monitor": monitor("test-monitor", "https://tintin")})
+
+    def test_process_routes_no_hosts(self):
+        monitors = process_routes(routing_object([[]], port="8080"))
 
-        mock_create_or_update_monitor.assert_called_once_with(
-            "test-monitor", "https://tintin/milou:8080", 60, "http", None, "GET", None, None
+        self.assertEqual(monitors, {})
+
+    def test_process_routes_with_empty_port(self):
+        monitors = process_routes(routing_object([["example.com"]]))
+
+        self.assertEqual(monitors, {"test-monitor": monitor("test-monitor", "https://example.com")})
+
+    def test_process_routes_with_path(self):
+        monitors = process_routes(routing_object([["example.com"]], path="/milou"))
+
+        self.assertEqual(monitors, {"test-monitor": monitor("test-monitor", "https://example.com/milou")})
+
+    def test_process_routes_with_hard_host_and_path(self):
+        monitors = process_routes(routing_object([["example.com"]], host="tintin", path="/milou"))
+
+        self.assertEqual(monitors, {"test-monitor": monitor("test-monitor", "https://tintin/milou")})
+
+    def test_process_routes_with_hard_host_and_path_and_port(self):
+        monitors = process_routes(routing_object([["example.com"]], host="tintin", path="/milou", port=8080))
+
+        self.assertEqual(monitors, {"test-monitor": monitor("test-monitor", "https://tintin/milou:8080")})
+
+    def test_process_routes_multiple_routes_with_hard_host_and_path_and_port(self):
+        monitors = process_routes(
+            routing_object([["example.com"], ["example.org"]], host="tintin", path="/milou", port=8080)
         )
 
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.extract_hosts")
-    def test_process_routes_multiple_routes_with_hard_host_and_path_and_port(
-        self, mock_extract_hosts, mock_create_or_update_monitor
-    ):
-        mock_extract_hosts.side_effect = [["example.com"], ["example.org"]]
-
-        process_routes(
-            monitor_name="test-monitor",
-            routes_or_rules=[
-                {"match": "Host(`example.com`)"},
-                {"match": "Host(`example.org`)"},
-            ],
-            interval=60,
-            probe_type="http",
-            headers=None,
-            hard_host="tintin",
-            path="/milou",
-            port=8080,
-            method="GET",
-            type_obj="IngressRoute",
+        self.assertEqual(
+            monitors,
+            {
+                "test-monitor-1": monitor("test-monitor-1", "https://tintin/milou:8080"),
+                "test-monitor-2": monitor("test-monitor-2", "https://tintin/milou:8080"),
+            },
         )
 
-        self.assertEqual(mock_create_or_update_monitor.call_count, 2)
-        calls = [
-            unittest.mock.call(
-                "test-monitor-1", "https://tintin/milou:8080", 60, "http", None, "GET", None, None
-            ),
-            unittest.mock.call(
-                "test-monitor-2", "https://tintin/milou:8080", 60, "http", None, "GET", None, None
-            ),
-        ]
-        mock_create_or_update_monitor.assert_has_calls(calls)
+    def test_process_routes_disabled(self):
+        monitors = process_routes(routing_object([["example.com"]], enabled=False))
+
+        # A None value asks for the monitor to be deleted
+        self.assertEqual(monitors, {"test-monitor": None})
 
 
 if __name__ == "__main__":
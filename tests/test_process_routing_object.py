@@ -1,14 +1,9 @@
 import unittest
-from unittest.mock import patch
 from kuma_ingress_watcher.controller import process_routing_object
 
 
 class TestProcessRoutingObject(unittest.TestCase):
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.delete_monitor")
-    def test_process_routing_object_single_route(
-        self, mock_delete_monitor, mock_create_or_update_monitor
-    ):
+    def test_process_routing_object_single_route(self):
         # Define the test item with a single route
         item = {
             "metadata": {"name": "test", "namespace": "default", "annotations": {}},
@@ -17,19 +12,13 @@ class TestProcessRoutingObject(unittest.TestCase):
         type_obj = "IngressRoute"
 
         # Call the function under test
-        process_routing_object(item, type_obj)
+        monitors = process_routing_object(item, type_obj)
 
-        # Check that create_or_update_monitor was called
-        mock_create_or_update_monitor.assert_called()
-        self.assertEqual(mock_create_or_update_monitor.call_count, 1)
-        # Verify that delete_monitor was not called
-        mock_delete_monitor.assert_not_called()
+        # Check that a single monitor is desired
+        self.assertEqual(list(monitors), ["test-default"])
+        self.assertEqual(monitors["test-default"].url, "https://example.com")
 
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.delete_monitor")
-    def test_process_routing_object_multiple_routes(
-        self, mock_delete_monitor, mock_create_or_update_monitor
-    ):
+    def test_process_routing_object_multiple_routes(self):
         # Define the test item with multiple routes
         item = {
             "metadata": {"name": "test", "namespace": "default", "annotations": {}},
@@ -43,18 +32,12 @@ class TestProcessRoutingObject(unittest.TestCase):
         type_obj = "IngressRoute"
 
         # Call the function under test
-        process_routing_object(item, type_obj)
+        monitors = process_routing_object(item, type_obj)
 
-        # Check that create_or_update_monitor was called for each route
-        self.assertEqual(mock_create_or_update_monitor.call_count, 2)
-        # Verify that delete_monitor was not called
-        mock_delete_monitor.assert_not_called()
+        # Check that a monitor is desired for each route
+        self.assertEqual(sorted(monitors), ["test-default-1", "test-default-2"])
 
-    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
-    @patch("kuma_ingress_watcher.controller.delete_monitor")
-    def test_process_routing_object_empty(
-        self, mock_delete_monitor, mock_create_or_update_monitor
-    ):
+    def test_process_routing_object_empty(self):
         # Define the test item with no routes
         item = {
             "metadata": {"name": "test", "namespace": "default", "annotations": {}},
@@ -63,12 +46,25 @@ class TestProcessRoutingObject(unittest.TestCase):
         type_obj = "IngressRoute"
 
         # Call the function under test
-        process_routing_object(item, type_obj)
+        monitors = process_routing_object(item, type_obj)
 
-        # Verify that create_or_update_monitor was not called
-        mock_create_or_update_monitor.assert_not_called()
-        # Verify that delete_monitor was not called
-        mock_delete_monitor.assert_not_called()
+        # Verify that no monitor is desired
+        self.assertEqual(monitors, {})
+
+    def test_process_routing_object_disabled(self):
+        item = {
+            "metadata": {
+                "name": "test",
+                "namespace": "default",
+                "annotations": {"uptime-kuma.autodiscovery.probe.enabled": "false"},
+            },
+            "spec": {"routes": [{"match": "Host(`example.com`)"}]},
+        }
+
+        monitors = process_routing_object(item, "IngressRoute")
+
+        # A None value asks for the monitor to be deleted
+        self.assertEqual(monitors, {"test-default": None})
 
 
 if __name__ == "__main__":
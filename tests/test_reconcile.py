@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import patch
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.records import DesiredMonitor
+from kuma_ingress_watcher.workers import WorkQueue
+from kuma_ingress_watcher.controller import (
+    invalidate_monitor_index,
+    load_monitor_index,
+    plan_reconcile,
+    reconcile,
+    reset_desired_monitors,
+    set_desired_monitors,
+)
+
+
+def fields(name, url):
+    return DesiredMonitor(name=name, url=url)
+
+
+@patch("kuma_ingress_watcher.controller.ensure_monitor_index")
+class TestReconcile(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+        load_monitor_index([
+            {"name": "existing", "id": 1},
+            {"name": "unmanaged", "id": 2},
+        ])
+
+    def tearDown(self):
+        invalidate_monitor_index()
+
+    def test_plan_creates_and_edits_changed_monitors(self, mock_ensure):
+        set_desired_monitors("a", {"existing": fields("existing", "https://a"), "new": fields("new", "https://b")})
+
+        plan = plan_reconcile()
+
+        self.assertEqual(plan["create"], {"new": fields("new", "https://b")})
+        self.assertEqual(plan["edit"], {"existing": fields("existing", "https://a")})
+        self.assertEqual(plan["delete"], [])
+        # Nothing changed since, so the next plan is empty
+        self.assertEqual(plan_reconcile(), {"create": {}, "edit": {}, "delete": []})
+
+    def test_plan_only_deletes_managed_monitors(self, mock_ensure):
+        set_desired_monitors("a", {"existing": fields("existing", "https://a")})
+        plan_reconcile()
+
+        set_desired_monitors("a", {})
+
+        self.assertEqual(plan_reconcile(full=True)["delete"], ["existing"])
+
+    def test_disabled_monitor_is_deleted(self, mock_ensure):
+        set_desired_monitors("a", {"unmanaged": None})
+
+        self.assertEqual(plan_reconcile()["delete"], ["unmanaged"])
+
+    def test_shared_name_kept_while_another_source_wants_it(self, mock_ensure):
+        set_desired_monitors("a", {"existing": fields("existing", "https://a")})
+        set_desired_monitors("b", {"existing": fields("existing", "https://b")})
+        plan_reconcile()
+
+        set_desired_monitors("b", {})
+
+        self.assertEqual(plan_reconcile()["edit"], {"existing": fields("existing", "https://a")})
+
+    def test_plan_skips_monitors_already_up_to_date(self, mock_ensure):
+        load_monitor_index([
+            {"name": "current", "id": 1, "type": "http", "url": "https://a", "interval": 60, "method": "GET"},
+            {"name": "drifted", "id": 2, "type": "http", "url": "https://old", "interval": 60, "method": "GET"},
+        ])
+        set_desired_monitors("a", {"current": fields("current", "https://a"), "drifted": fields("drifted", "https://b")})
+        skipped = controller.skipped_monitor_writes
+
+        plan = plan_reconcile()
+
+        self.assertEqual(plan["edit"], {"drifted": fields("drifted", "https://b")})
+        self.assertEqual(controller.skipped_monitor_writes, skipped + 1)
+        # A full pass keeps checking for drift without counting skips again
+        self.assertEqual(plan_reconcile(full=True)["edit"], {"drifted": fields("drifted", "https://b")})
+        self.assertEqual(controller.skipped_monitor_writes, skipped + 1)
+
+    def test_full_plan_recreates_missing_monitors(self, mock_ensure):
+        set_desired_monitors("a", {"existing": fields("existing", "https://a")})
+        plan_reconcile()
+        controller.unindex_monitor("existing")
+
+        self.assertEqual(plan_reconcile()["create"], {})
+        self.assertEqual(plan_reconcile(full=True)["create"], {"existing": fields("existing", "https://a")})
+
+    @patch("kuma_ingress_watcher.controller.delete_monitor")
+    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
+    def test_reconcile_applies_plan(self, mock_create_or_update_monitor, mock_delete_monitor, mock_ensure):
+        set_desired_monitors("a", {"new": fields("new", "https://b"), "unmanaged": None})
+
+        reconcile()
+        controller.kuma_work_queue.join(timeout=5)
+
+        mock_create_or_update_monitor.assert_called_once_with(
+            "new", "https://b", 60, "http", None, "GET", None, None
+        )
+        mock_delete_monitor.assert_called_once_with("unmanaged")
+
+    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
+    def test_failed_write_is_retried(self, mock_create_or_update_monitor, mock_ensure):
+        mock_create_or_update_monitor.side_effect = [False, True]
+        queue = WorkQueue(controller.sync_monitor, base_delay=0)
+        set_desired_monitors("a", {"new": fields("new", "https://b")})
+
+        with patch("kuma_ingress_watcher.controller.kuma_work_queue", queue):
+            reconcile()
+            self.assertTrue(queue.join(timeout=5))
+        queue.shutdown()
+
+        self.assertEqual(mock_create_or_update_monitor.call_count, 2)
+
+    @patch("kuma_ingress_watcher.controller.DRY_RUN", True)
+    @patch("kuma_ingress_watcher.controller.create_or_update_monitor")
+    def test_reconcile_dry_run(self, mock_create_or_update_monitor, mock_ensure):
+        set_desired_monitors("a", {"new": fields("new", "https://b")})
+
+        plan = reconcile()
+
+        self.assertEqual(list(plan["create"]), ["new"])
+        mock_create_or_update_monitor.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
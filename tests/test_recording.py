@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.recording import LIST, EventRecorder, RecordedChange, group_listings, read_recording, replay
+from tests.helpers import make_item
+
+
+def make_page(items, last=True):
+    return {"metadata": {"resourceVersion": "1", "continue": None if last else "token"}, "items": items}
+
+
+def listing_page(time, page, last=True, kind="IngressRoute", namespace=None):
+    return RecordedChange(time, kind, LIST, namespace, make_page([], last), page)
+
+
+class TestEventRecorder(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.now = 1000.0
+
+    def recorder(self, name):
+        recorder = EventRecorder(os.path.join(self.directory, name), clock=lambda: self.now)
+        self.addCleanup(recorder.close)
+        return recorder
+
+    def test_round_trip(self):
+        for name in ("events.jsonl", "events.jsonl.gz"):
+            with self.subTest(name=name):
+                self.now = 1000.0
+                recorder = self.recorder(name)
+                pages = [make_page([make_item("a")], last=False), make_page([make_item("b")])]
+                self.assertEqual(list(recorder.record_pages(iter(pages), "IngressRoute", "default")), pages)
+                self.now += 1.5
+                recorder.record_event("Ingress", "DELETED", make_item("c"))
+                recorder.close()
+
+                changes = list(read_recording(recorder.path))
+
+                self.assertEqual([(change.event_type, change.page) for change in changes], [(LIST, 0), (LIST, 1), ("DELETED", None)])
+                self.assertEqual(changes[1].object, pages[1])
+                self.assertEqual(changes[0].namespace, "default")
+                self.assertEqual(changes[2], RecordedChange(1001.5, "Ingress", "DELETED", None, make_item("c")))
+
+    def test_appends_across_runs(self):
+        for run in range(2):
+            recorder = self.recorder("events.jsonl.gz")
+            recorder.record_event("Ingress", "ADDED", make_item(f"run-{run}"))
+            recorder.close()
+
+        changes = list(read_recording(os.path.join(self.directory, "events.jsonl.gz")))
+
+        self.assertEqual([change.object["metadata"]["name"] for change in changes], ["run-0", "run-1"])
+
+    def test_changes_after_close_are_dropped(self):
+        recorder = self.recorder("events.jsonl")
+        recorder.close()
+
+        recorder.record_event("Ingress", "ADDED", make_item("a"))
+
+        self.assertEqual(recorder.changes, 0)
+
+
+class TestReplay(unittest.TestCase):
+    def test_listing_pages_are_grouped(self):
+        event = RecordedChange(2, "Ingress", "ADDED", None, make_item("a"))
+        changes = [
+            listing_page(1, 0, last=False),
+            event,
+            listing_page(3, 1, last=False),
+            listing_page(4, 2),
+        ]
+
+        grouped = list(group_listings(changes))
+
+        self.assertEqual(grouped[0], event)
+        last, pages = grouped[1]
+        self.assertEqual((last.time, len(pages)), (4, 3))
+
+    def test_failed_listing_is_flushed_when_superseded(self):
+        changes = [listing_page(1, 0, last=False), listing_page(2, 0)]
+
+        grouped = list(group_listings(changes))
+
+        self.assertEqual([(last.time, len(pages)) for last, pages in grouped], [(1, 1), (2, 1)])
+
+    def test_speed_and_max_gap(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(round(seconds, 3))
+            now[0] += seconds
+
+        changes = [RecordedChange(t, "Ingress", "ADDED", None, make_item(f"a{t}")) for t in (100, 104, 1000)]
+        fed = replay(changes, MagicMock(), MagicMock(), speed=2, max_gap=10, sleep=sleep, clock=lambda: now[0])
+
+        self.assertEqual(fed, 3)
+        self.assertEqual(sleeps, [2, 5])
+
+    def test_as_fast_as_possible(self):
+        sleep = MagicMock()
+        on_event = MagicMock()
+        on_listing = MagicMock()
+
+        replay([RecordedChange(1, "Ingress", "ADDED", None, {}), listing_page(500, 0)], on_event, on_listing, sleep=sleep)
+
+        sleep.assert_not_called()
+        on_event.assert_called_once()
+        on_listing.assert_called_once()
+
+
+class TestControllerRecording(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "events.jsonl")
+        controller.reset_desired_monitors()
+        self.addCleanup(controller.reset_desired_monitors)
+
+    def run_controller(self, steps):
+        with patch.object(controller, "object_store", controller.new_object_store()):
+            steps()
+            return dict(controller.desired_monitors)
+
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    def test_replay_reproduces_the_recorded_state(self, mock_reconcile):
+        recorder = EventRecorder(self.path)
+
+        def record():
+            controller.handle_changes([make_page([make_item("a", "a.com"), make_item("b", "b.com")])], "IngressRoute")
+            controller.handle_event("MODIFIED", make_item("a", "a2.com"), "IngressRoute")
+            controller.handle_event("DELETED", make_item("b", "b.com"), "IngressRoute")
+
+        with patch.object(controller, "event_recorder", recorder):
+            recorded = self.run_controller(record)
+        recorder.close()
+        controller.reset_desired_monitors()
+
+        def replayed():
+            replay(
+                read_recording(self.path),
+                lambda change: controller.handle_event(change.event_type, change.object, change.kind),
+                lambda change, pages: controller.handle_changes(pages, change.kind, change.namespace),
+            )
+
+        self.assertEqual(self.run_controller(replayed), recorded)
+        self.assertEqual(recorded["a-default"].url, "https://a2.com")
+        self.assertNotIn("b-default", recorded)
+
+
+if __name__ == "__main__":
+    unittest.main()
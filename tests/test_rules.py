@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+from kuma_ingress_watcher.rules import And, Matcher, Not, Or, RuleParseError, RuleParser, parse_ast
+
+
+class TestParseAst(unittest.TestCase):
+    def test_operator_precedence(self):
+        ast = parse_ast("Host(`a.com`) || Host(`b.com`) && !PathPrefix(`/admin`)")
+
+        self.assertEqual(
+            ast,
+            Or((
+                Matcher("Host", ("a.com",)),
+                And((Matcher("Host", ("b.com",)), Not(Matcher("PathPrefix", ("/admin",))))),
+            )),
+        )
+
+    def test_parentheses_and_quoting(self):
+        ast = parse_ast("(Host(\"a.com\") || Host('b.com')) && Headers(`X-Env`, `prod`)")
+
+        self.assertEqual(
+            ast,
+            And((
+                Or((Matcher("Host", ("a.com",)), Matcher("Host", ("b.com",)))),
+                Matcher("Headers", ("X-Env", "prod")),
+            )),
+        )
+
+    def test_invalid_rules(self):
+        for rule in ("Host(`a.com`", "Host(`a.com`) &&", "Host(a.com)", "Host(`a.com`) Path(`/`)", "Host(`a.com`) & Path(`/`)"):
+            with self.subTest(rule=rule):
+                with self.assertRaises(RuleParseError):
+                    parse_ast(rule)
+
+
+class TestRuleParser(unittest.TestCase):
+    def setUp(self):
+        self.parser = RuleParser(cache_size=8)
+
+    def test_v2_multiple_host_arguments(self):
+        parsed = self.parser.parse("Host(`a.com`, `b.com`) && PathPrefix(`/api`, `/v2`)")
+
+        self.assertEqual(parsed.hosts, ("a.com", "b.com"))
+        self.assertEqual(parsed.path_prefixes, ("/api", "/v2"))
+
+    def test_host_regexp_and_sni(self):
+        parsed = self.parser.parse(
+            r"HostRegexp(`^api\.example\.com$`) || HostRegexp(`{sub:[a-z]+}.example.com`) || HostSNI(`tcp.example.com`)"
+        )
+
+        self.assertEqual(parsed.hosts, ("api.example.com", "tcp.example.com"))
+        self.assertEqual(parsed.host_patterns, ("{sub:[a-z]+}.example.com",))
+
+    def test_negated_matchers_are_not_targets(self):
+        parsed = self.parser.parse("Host(`a.com`) && !Host(`b.com`) && !Path(`/metrics`)")
+
+        self.assertEqual(parsed.hosts, ("a.com",))
+        self.assertEqual(parsed.path_prefixes, ())
+
+    def test_cached_by_rule(self):
+        first = self.parser.parse("Host(`a.com`)")
+        second = self.parser.parse("Host(`a.com`)")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.parser.cache_info().hits, 1)
+
+    @patch("kuma_ingress_watcher.rules.logger")
+    def test_unparsable_rule_falls_back_to_host_matchers(self, mock_logger):
+        parsed = self.parser.parse("Host(`a.com`) && Unknown(")
+        self.parser.parse("Host(`a.com`) && Unknown(")
+
+        self.assertIsNone(parsed.ast)
+        self.assertEqual(parsed.hosts, ("a.com",))
+        mock_logger.warning.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
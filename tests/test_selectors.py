@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import (
+    get_ingress,
+    get_ingressroutes,
+    handle_changes,
+    handle_event,
+    list_selectors,
+    new_object_store,
+    reset_desired_monitors,
+    routing_object_selected,
+    watch_scopes,
+)
+from tests.helpers import make_item
+
+
+class TestSelectors(unittest.TestCase):
+    @patch("kuma_ingress_watcher.controller.LABEL_SELECTOR", "team=web")
+    @patch("kuma_ingress_watcher.controller.FIELD_SELECTOR", "metadata.name!=skip")
+    @patch("kuma_ingress_watcher.controller.IGNORE_NAMESPACES", ["kube-system", "other"])
+    def test_list_selectors(self):
+        self.assertEqual(
+            list_selectors(),
+            {
+                "label_selector": "team=web",
+                "field_selector": "metadata.name!=skip,metadata.namespace!=kube-system,metadata.namespace!=other",
+            },
+        )
+
+    def test_list_selectors_empty_by_default(self):
+        self.assertEqual(list_selectors(), {})
+
+    @patch("kuma_ingress_watcher.controller.NAMESPACED_LIST_THRESHOLD", 2)
+    def test_watch_scopes(self):
+        self.assertEqual(watch_scopes(), [None])
+        with patch("kuma_ingress_watcher.controller.WATCH_NAMESPACES", ["a", "b"]):
+            self.assertEqual(watch_scopes(), ["a", "b"])
+        with patch("kuma_ingress_watcher.controller.WATCH_NAMESPACES", ["a", "b", "c"]):
+            self.assertEqual(watch_scopes(), [None])
+
+    @patch("kuma_ingress_watcher.controller.WATCH_NAMESPACES", ["a", "b"])
+    @patch("kuma_ingress_watcher.controller.IGNORE_NAMESPACES", ["b"])
+    @patch("kuma_ingress_watcher.controller.INGRESS_CLASS", ["traefik"])
+    def test_routing_object_selected(self):
+        self.assertTrue(routing_object_selected("Ingress", make_item("test", namespace="a", kind="Ingress", ingress_class="traefik")))
+        self.assertFalse(routing_object_selected("Ingress", make_item("test", namespace="a", kind="Ingress", ingress_class="nginx")))
+        self.assertFalse(routing_object_selected("Ingress", make_item("test", namespace="a", kind="Ingress")))
+        self.assertFalse(routing_object_selected("Ingress", make_item("test", namespace="b", kind="Ingress", ingress_class="traefik")))
+        self.assertFalse(routing_object_selected("Ingress", make_item("test", namespace="c", kind="Ingress", ingress_class="traefik")))
+
+        item = make_item("test", namespace="a", kind="Ingress")
+        item["metadata"]["annotations"] = {"kubernetes.io/ingress.class": "traefik"}
+        self.assertTrue(routing_object_selected("IngressRoute", item))
+
+    @patch("kuma_ingress_watcher.controller.LABEL_SELECTOR", "team=web")
+    def test_namespaced_lists(self):
+        networking_api = MagicMock()
+        networking_api.list_namespaced_ingress.return_value.data = b'{"metadata": {}, "items": []}'
+        custom_api = MagicMock()
+        custom_api.list_namespaced_custom_object.return_value.data = b'{"metadata": {}, "items": []}'
+
+        list(get_ingress(networking_api, "team-a"))
+        list(get_ingressroutes(custom_api, "team-a"))
+
+        networking_api.list_namespaced_ingress.assert_called_once_with(
+            "team-a", limit=controller.LIST_PAGE_SIZE, _continue=None, _preload_content=False, label_selector="team=web"
+        )
+        networking_api.list_ingress_for_all_namespaces.assert_not_called()
+        _, kwargs = custom_api.list_namespaced_custom_object.call_args
+        self.assertEqual(kwargs["namespace"], "team-a")
+        self.assertEqual(kwargs["label_selector"], "team=web")
+        custom_api.list_cluster_custom_object.assert_not_called()
+
+
+@patch("kuma_ingress_watcher.controller.reconcile")
+class TestSelectedObjects(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+        controller.resource_versions.clear()
+
+    def tearDown(self):
+        reset_desired_monitors()
+        controller.resource_versions.clear()
+
+    def test_namespaced_listing_only_prunes_its_namespace(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()) as store:
+            item = make_item("a", namespace="team-a", kind="Ingress")
+            handle_changes([{"metadata": {"resourceVersion": "1"}, "items": [item]}], "Ingress", "team-a")
+            item = make_item("b", namespace="team-b", kind="Ingress")
+            handle_changes([{"metadata": {"resourceVersion": "2"}, "items": [item]}], "Ingress", "team-b")
+            handle_changes([{"metadata": {"resourceVersion": "3"}, "items": []}], "Ingress", "team-b")
+
+            self.assertEqual(store.keys("Ingress"), [("Ingress", "team-a", "a")])
+        self.assertEqual(controller.resource_versions, {"Ingress/team-a": "1", "Ingress/team-b": "3"})
+
+    @patch("kuma_ingress_watcher.controller.INGRESS_CLASS", ["traefik"])
+    def test_unselected_objects_are_dropped(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()) as store:
+            items = [make_item("a", kind="Ingress", ingress_class="traefik"), make_item("b", kind="Ingress", ingress_class="nginx")]
+            handle_changes([{"metadata": {"resourceVersion": "1"}, "items": items}], "Ingress")
+            self.assertEqual(store.keys("Ingress"), [("Ingress", "default", "a")])
+
+            # Moving to another class reads as a deletion.
+            handle_event("MODIFIED", make_item("a", kind="Ingress", ingress_class="nginx"), "Ingress")
+            self.assertEqual(len(store), 0)
+
+        self.assertEqual(controller.desired_monitors, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
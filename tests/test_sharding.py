@@ -0,0 +1,122 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+from kubernetes.client.rest import ApiException
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import (
+    handle_event,
+    new_object_store,
+    on_shard_members_changed,
+    reset_desired_monitors,
+)
+from kuma_ingress_watcher.sharding import HashRing, LeaseMembership
+from tests.helpers import make_item
+
+NAMESPACES = [f"team-{index}" for index in range(1000)]
+
+
+def make_lease(identity, renewed_seconds_ago, duration=30):
+    lease = MagicMock()
+    lease.spec.holder_identity = identity
+    lease.spec.lease_duration_seconds = duration
+    lease.spec.renew_time = datetime.now(timezone.utc) - timedelta(seconds=renewed_seconds_ago)
+    return lease
+
+
+class TestHashRing(unittest.TestCase):
+    def test_owner_is_deterministic_and_balanced(self):
+        ring = HashRing(["a", "b", "c"])
+        owners = [ring.owner(namespace) for namespace in NAMESPACES]
+
+        self.assertEqual(owners, [HashRing(["c", "b", "a"]).owner(namespace) for namespace in NAMESPACES])
+        for member in "abc":
+            self.assertGreater(owners.count(member), 200)
+
+    def test_joining_member_moves_few_keys(self):
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+
+        moved = [namespace for namespace in NAMESPACES if before.owner(namespace) != after.owner(namespace)]
+
+        self.assertLess(len(moved), 400)
+        self.assertTrue(all(after.owner(namespace) == "d" for namespace in moved))
+
+    def test_empty_ring(self):
+        self.assertIsNone(HashRing().owner("team-a"))
+
+
+class TestLeaseMembership(unittest.TestCase):
+    def setUp(self):
+        self.api = MagicMock()
+        self.on_change = MagicMock()
+        self.membership = LeaseMembership(self.api, "default", "kiw", "a", on_change=self.on_change)
+
+    def test_renew_creates_missing_lease(self):
+        self.api.patch_namespaced_lease.side_effect = ApiException(status=404)
+
+        self.membership.renew()
+
+        namespace, body = self.api.create_namespaced_lease.call_args[0]
+        self.assertEqual(namespace, "default")
+        self.assertEqual(body["metadata"]["name"], "kiw-a")
+        self.assertEqual(body["spec"]["holderIdentity"], "a")
+
+    def test_sync_tracks_live_members(self):
+        self.api.list_namespaced_lease.return_value.items = [
+            make_lease("a", 1),
+            make_lease("b", 5),
+            make_lease("c", 120),
+        ]
+
+        self.membership.sync()
+        self.membership.sync()
+
+        self.on_change.assert_called_once_with(["a", "b"])
+        self.api.list_namespaced_lease.assert_called_with("default", label_selector="kuma-ingress-watcher/shard-group=kiw")
+
+    def test_replica_drops_itself_when_it_cannot_renew(self):
+        self.api.list_namespaced_lease.return_value.items = [make_lease("b", 1)]
+        self.api.patch_namespaced_lease.side_effect = ApiException(status=500)
+
+        self.membership.sync()
+
+        self.on_change.assert_called_once_with(["b"])
+
+
+@patch("kuma_ingress_watcher.controller.SHARD_IDENTITY", "a")
+@patch("kuma_ingress_watcher.controller.reconcile")
+class TestShardRebalance(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+
+    def tearDown(self):
+        controller.shard_ring = None
+        reset_desired_monitors()
+
+    @patch("kuma_ingress_watcher.controller.relist_routing_objects")
+    def test_rebalance_hands_over_without_deleting(self, mock_relist, mock_reconcile):
+        ring = HashRing(["a", "b"])
+        kept = next(namespace for namespace in NAMESPACES if ring.owner(namespace) == "a")
+        handed_over = next(namespace for namespace in NAMESPACES if ring.owner(namespace) == "b")
+
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()) as store:
+            on_shard_members_changed(["a"])
+            handle_event("ADDED", make_item("web", f"{kept}.example.com", kept), "IngressRoute")
+            handle_event("ADDED", make_item("web", f"{handed_over}.example.com", handed_over), "IngressRoute")
+            mock_relist.assert_not_called()
+
+            on_shard_members_changed(["a", "b"])
+
+            self.assertEqual(store.keys(), [("IngressRoute", kept, "web")])
+            mock_relist.assert_called_once()
+            # Events for namespaces owned by the other replica are ignored.
+            handle_event("MODIFIED", make_item("web", f"{handed_over}.example.com", handed_over), "IngressRoute")
+            self.assertEqual(len(store), 1)
+
+        self.assertEqual(list(controller.desired_monitors), [f"web-{kept}"])
+        self.assertNotIn(f"web-{handed_over}", controller.managed_monitors)
+        self.assertNotIn(f"web-{handed_over}", controller.dirty_monitors)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import (
+    handle_event,
+    invalidate_monitor_index,
+    load_monitor_index,
+    load_state,
+    new_object_store,
+    reset_desired_monitors,
+    save_state,
+)
+from tests.helpers import make_item
+
+
+@patch("kuma_ingress_watcher.controller.reconcile")
+class TestState(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+        invalidate_monitor_index()
+        controller.resource_versions.clear()
+        self.path = os.path.join(tempfile.mkdtemp(), "state.json")
+
+    def tearDown(self):
+        reset_desired_monitors()
+        invalidate_monitor_index()
+        controller.resource_versions.clear()
+
+    def test_restart_resumes_without_reprocessing(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()):
+            handle_event("ADDED", make_item("test", uid="uid-1"), "IngressRoute")
+            controller.record_resource_version("IngressRoute", "42")
+            load_monitor_index([{"id": 7, "name": "test-default", "type": "http", "url": "https://example.com"}])
+            save_state(self.path)
+
+        reset_desired_monitors()
+        controller.resource_versions.clear()
+        store = new_object_store()
+        with patch("kuma_ingress_watcher.controller.object_store", store), \
+                patch("kuma_ingress_watcher.controller.process_routes", wraps=controller.process_routes) as mock_process:
+            self.assertTrue(load_state(self.path))
+
+            self.assertEqual(controller.resource_versions, {"IngressRoute": "42"})
+            self.assertEqual(controller.desired_monitors["test-default"].url, "https://example.com")
+            self.assertEqual(controller.monitor_index["test-default"]["id"], 7)
+            self.assertIn("test-default", controller.managed_monitors)
+            self.assertEqual(controller.dirty_monitors, set())
+
+            # Replaying an unchanged object is a no-op, a changed one is reprocessed.
+            handle_event("MODIFIED", make_item("test", uid="uid-1"), "IngressRoute")
+            mock_process.assert_not_called()
+            handle_event("MODIFIED", make_item("test", "example.org", uid="uid-1"), "IngressRoute")
+            mock_process.assert_called_once()
+
+        self.assertEqual(controller.desired_monitors["test-default"].url, "https://example.org")
+        self.assertEqual(store.by_index("host", "example.org"), {("IngressRoute", "default", "test")})
+
+    def test_restored_object_deleted_while_down(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()):
+            handle_event("ADDED", make_item("test", uid="uid-1"), "IngressRoute")
+            save_state(self.path)
+
+        reset_desired_monitors()
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()):
+            load_state(self.path)
+            controller.handle_changes([{"metadata": {"resourceVersion": "50"}, "items": []}], "IngressRoute")
+
+        self.assertEqual(controller.desired_monitors, {})
+        self.assertIn("test-default", controller.dirty_monitors)
+
+    @patch.object(controller, "LOAD_MONITOR_FROM_FILE", True)
+    def restart_with_monitor_file(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.open", new_callable=MagicMock) as mock_open:
+            mock_open.side_effect = unittest.mock.mock_open(read_data="- {name: a, url: http://a}\n- {name: b, url: http://b}\n")
+            controller.process_monitor_file("monitors.yaml")
+        # As if both had been written to Uptime Kuma.
+        for monitor_id, name in enumerate(("a", "b"), 1):
+            controller.managed_monitors.add(name)
+            controller.index_monitor(name, monitor_id, controller.desired_monitor_fields(controller.desired_monitors[name]))
+        save_state(self.path)
+
+        reset_desired_monitors()
+        invalidate_monitor_index()
+        self.assertTrue(load_state(self.path))
+
+    def test_restart_keeps_monitor_file_monitors(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()), \
+                patch("kuma_ingress_watcher.controller.kuma") as mock_kuma:
+            self.restart_with_monitor_file(mock_reconcile)
+            mock_kuma.get_monitors.return_value = [
+                dict(controller.monitor_index[name], name=name) for name in ("a", "b")
+            ]
+
+            # The full reconcile after startup runs before the file is read again.
+            plan = controller.plan_reconcile(full=True)
+
+        self.assertEqual(plan, {"create": {}, "edit": {}, "delete": []})
+        self.assertEqual(sorted(controller.desired_monitors), ["a", "b"])
+
+    def test_restored_monitor_index_is_refreshed(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()), \
+                patch("kuma_ingress_watcher.controller.kuma") as mock_kuma:
+            self.restart_with_monitor_file(mock_reconcile)
+            # "b" was deleted and "a" edited in Uptime Kuma while the controller was down.
+            mock_kuma.get_monitors.return_value = [dict(controller.monitor_index["a"], name="a", id=3, interval=30)]
+
+            plan = controller.plan_reconcile(full=True)
+
+        mock_kuma.get_monitors.assert_called_once()
+        self.assertEqual(sorted(plan["create"]), ["b"])
+        self.assertEqual(list(plan["edit"]), ["a"])
+        self.assertEqual(controller.monitor_index["a"]["id"], 3)
+
+    @patch.object(controller, "SHARDING_ENABLED", True)
+    @patch.object(controller, "LOAD_MONITOR_FROM_FILE", True)
+    @patch("kuma_ingress_watcher.controller.shard_owns", return_value=False)
+    def test_restart_on_a_shard_not_owning_the_file(self, mock_shard_owns, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()), \
+                patch.object(controller, "shard_ring", None):
+            self.restart_with_monitor_file(mock_reconcile)
+
+            controller.on_shard_members_changed(["this-replica", "other-replica"])
+
+        # Left to the owning replica rather than deleted from Uptime Kuma.
+        self.assertEqual(controller.desired_monitors, {})
+        self.assertEqual(controller.managed_monitors, set())
+
+    def test_concurrent_checkpoints_are_serialized(self, mock_reconcile):
+        writers = []
+        errors = []
+        dump = json.dump
+
+        def slow_dump(*args, **kwargs):
+            writers.append(threading.current_thread())
+            time.sleep(0.05)
+            dump(*args, **kwargs)
+            # Nobody else started writing meanwhile.
+            self.assertIs(writers[-1], threading.current_thread())
+
+        def checkpoint():
+            try:
+                save_state(self.path)
+            except Exception as e:
+                errors.append(e)
+
+        # As the periodic checkpoint and the SIGTERM hook may.
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()), \
+                patch("kuma_ingress_watcher.controller.json.dump", side_effect=slow_dump):
+            threads = [threading.Thread(target=checkpoint) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(writers), 2)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        self.assertTrue(load_state(self.path))
+
+    def test_missing_or_invalid_state_file(self, mock_reconcile):
+        self.assertFalse(load_state(self.path))
+
+        with open(self.path, "w") as file:
+            file.write("{not json")
+        self.assertFalse(load_state(self.path))
+
+        with open(self.path, "w") as file:
+            file.write('{"version": 0}')
+        self.assertFalse(load_state(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+from kubernetes.client import NetworkingV1Api
+from kubernetes.client.rest import ApiException
+from kuma_ingress_watcher import controller
+from kuma_ingress_watcher.controller import (
+    handle_event,
+    new_object_store,
+    process_routes,
+    project_routing_object,
+    reset_desired_monitors,
+    stream_routing_object_events,
+    watch_ingress_resources,
+    watch_routing_objects,
+)
+from tests.helpers import make_item
+
+
+class StopWatching(BaseException):
+    pass
+
+
+class TestHandleEvent(unittest.TestCase):
+    def setUp(self):
+        reset_desired_monitors()
+
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    @patch("kuma_ingress_watcher.controller.process_routes", wraps=process_routes)
+    def test_added_modified_deleted(self, mock_process_routes, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()) as store:
+            handle_event("ADDED", make_item("test"), "IngressRoute")
+            handle_event("MODIFIED", make_item("test"), "IngressRoute")
+            handle_event("MODIFIED", make_item("test", "example.org"), "IngressRoute")
+            self.assertEqual(store.by_index("host", "example.org"), {("IngressRoute", "default", "test")})
+            self.assertEqual(controller.desired_monitors["test-default"].url, "https://example.org")
+            handle_event("DELETED", make_item("test", "example.org"), "IngressRoute")
+            self.assertEqual(len(store), 0)
+
+        self.assertEqual(mock_process_routes.call_count, 2)
+        self.assertEqual(mock_reconcile.call_count, 3)
+        self.assertEqual(controller.desired_monitors, {})
+
+    @patch("kuma_ingress_watcher.controller.reconcile")
+    def test_deleted_unknown_object(self, mock_reconcile):
+        with patch("kuma_ingress_watcher.controller.object_store", new_object_store()):
+            handle_event("DELETED", make_item("test"), "IngressRoute")
+
+        mock_reconcile.assert_not_called()
+
+
+class TestStreamRoutingObjectEvents(unittest.TestCase):
+    @patch("kuma_ingress_watcher.controller.handle_event")
+    @patch("kuma_ingress_watcher.controller.custom_api_instance")
+    @patch("kuma_ingress_watcher.controller.watch.Watch")
+    def test_stream_skips_bookmarks_and_tracks_resource_version(self, MockWatch, mock_api, mock_handle_event):
+        item = make_item("test")
+        mock_watch = MockWatch.return_value
+        item["metadata"]["resourceVersion"] = "11"
+        mock_watch.stream.return_value = iter([
+            {"type": "ADDED", "object": item},
+            {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "12"}}},
+        ])
+        mock_watch.resource_version = None
+
+        resource_version = stream_routing_object_events("IngressRoute", "10")
+
+        self.assertEqual(resource_version, "12")
+        mock_handle_event.assert_called_once_with("ADDED", project_routing_object("IngressRoute", item), "IngressRoute")
+        _, kwargs = mock_watch.stream.call_args
+        self.assertEqual(kwargs["resource_version"], "10")
+        self.assertTrue(kwargs["allow_watch_bookmarks"])
+        self.assertFalse(kwargs["deserialize"])
+
+    @patch("kuma_ingress_watcher.controller.handle_event")
+    @patch("kuma_ingress_watcher.controller.networking_api_instance")
+    @patch("kuma_ingress_watcher.controller.watch.Watch")
+    def test_stream_projects_raw_ingress(self, MockWatch, mock_api, mock_handle_event):
+        raw_object = {
+            "metadata": {"name": "test", "namespace": "default", "managedFields": [{"manager": "kubectl"}]},
+            "spec": {"rules": [{"host": "example.com", "http": {"paths": []}}]},
+        }
+        MockWatch.return_value.stream.return_value = iter([{"type": "ADDED", "object": raw_object}])
+
+        stream_routing_object_events("Ingress", "10")
+
+        item = mock_handle_event.call_args[0][1]
+        self.assertEqual(item["spec"], {"rules": [{"host": "example.com"}]})
+        self.assertNotIn("managedFields", item["metadata"])
+
+    @patch("kuma_ingress_watcher.controller.handle_event")
+    @patch("kuma_ingress_watcher.controller.networking_api_instance")
+    def test_expired_watch_raises_gone(self, mock_api, mock_handle_event):
+        self.addCleanup(controller.resource_versions.clear)
+        lines = [
+            json.dumps({"type": "ADDED", "object": {"metadata": {"name": "test", "namespace": "default", "resourceVersion": "11"}}}),
+            json.dumps({"type": "ERROR", "object": {"kind": "Status", "code": 410, "reason": "Expired", "message": "too old"}}),
+        ]
+        # A real Watch, so the events are not deserialized; only the response is faked.
+        mock_api.list_ingress_for_all_namespaces = MagicMock(__doc__=NetworkingV1Api.list_ingress_for_all_namespaces.__doc__)
+        mock_api.list_ingress_for_all_namespaces.return_value.status = 200
+
+        with patch("kubernetes.watch.watch.iter_resp_lines", return_value=iter(lines)), \
+                self.assertRaises(ApiException) as raised:
+            stream_routing_object_events("Ingress", "10")
+
+        self.assertEqual(raised.exception.status, 410)
+        mock_handle_event.assert_called_once()
+        self.assertIsInstance(mock_handle_event.call_args[0][1], dict)
+        self.assertEqual(controller.resource_versions["Ingress"], "11")
+
+
+class TestWatchRoutingObjects(unittest.TestCase):
+    def setUp(self):
+        controller.resource_versions.clear()
+
+    @patch("kuma_ingress_watcher.controller.time.sleep")
+    @patch("kuma_ingress_watcher.controller.handle_changes")
+    @patch("kuma_ingress_watcher.controller.stream_routing_object_events")
+    @patch("kuma_ingress_watcher.controller.list_routing_objects")
+    def test_relist_on_gone(self, mock_list, mock_stream, mock_handle_changes, mock_sleep):
+        mock_handle_changes.return_value = "1"
+        mock_stream.side_effect = [ApiException(status=410), StopWatching()]
+        mock_sleep.side_effect = StopWatching()
+
+        with self.assertRaises(StopWatching):
+            watch_routing_objects("IngressRoute")
+
+        self.assertEqual(mock_list.call_count, 2)
+        self.assertEqual(mock_handle_changes.call_count, 2)
+
+    @patch("kuma_ingress_watcher.controller.poll_routing_objects")
+    @patch("kuma_ingress_watcher.controller.time.sleep")
+    @patch("kuma_ingress_watcher.controller.handle_changes")
+    @patch("kuma_ingress_watcher.controller.stream_routing_object_events")
+    @patch("kuma_ingress_watcher.controller.list_routing_objects")
+    def test_forbidden_watch_falls_back_to_polling(self, mock_list, mock_stream, mock_handle_changes, mock_sleep, mock_poll):
+        mock_handle_changes.return_value = "1"
+        mock_stream.side_effect = ApiException(status=403)
+
+        watch_routing_objects("IngressRoute")
+
+        # Each refused watch is followed by a relist, so changes are still seen.
+        self.assertEqual(mock_list.call_count, controller.WATCH_FORBIDDEN_LIMIT)
+        mock_poll.assert_called_once_with("IngressRoute", None)
+
+    @patch("kuma_ingress_watcher.controller.time.sleep")
+    @patch("kuma_ingress_watcher.controller.handle_changes")
+    @patch("kuma_ingress_watcher.controller.list_routing_objects")
+    def test_failed_list_is_retried(self, mock_list, mock_handle_changes, mock_sleep):
+        mock_handle_changes.return_value = None
+        mock_sleep.side_effect = [None, StopWatching()]
+
+        with self.assertRaises(StopWatching):
+            watch_routing_objects("IngressRoute")
+
+        self.assertEqual(mock_list.call_count, 2)
+
+
+class TestWatchIngressResources(unittest.TestCase):
+    @patch.object(controller, "WATCH_JITTER", 0)
+    @patch.object(controller, "WATCH_MAX_INTERVAL", 40)
+    @patch.object(controller, "WATCH_INTERVAL", 10)
+    @patch.object(controller, "WATCH_INGRESS", False)
+    @patch.object(controller, "WATCH_INGRESSROUTES", True)
+    @patch("kuma_ingress_watcher.controller.time.sleep")
+    @patch("kuma_ingress_watcher.controller.get_ingressroutes")
+    @patch("kuma_ingress_watcher.controller.handle_changes")
+    def test_poll_interval_adapts_to_churn(self, mock_handle_changes, mock_get_ingressroutes, mock_sleep):
+        churn = iter([True, False, False, False, True])
+        mock_handle_changes.side_effect = lambda *args: next(churn) and controller.count_routing_object_change()
+        mock_sleep.side_effect = [None] * 4 + [StopWatching()]
+
+        with self.assertRaises(StopWatching):
+            watch_ingress_resources()
+
+        delays = [round(call.args[0]) for call in mock_sleep.call_args_list]
+        self.assertEqual(delays, [10, 20, 40, 40, 10])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from kuma_ingress_watcher.workers import TokenBucket, WorkQueue
+
+
+class TestWorkQueue(unittest.TestCase):
+    def test_repeated_adds_are_deduplicated(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def handler(key):
+            started.set()
+            release.wait(5)
+            calls.append(key)
+            return True
+
+        queue = WorkQueue(handler, workers=1)
+        queue.add("blocker")
+        started.wait(5)
+        for _ in range(5):
+            queue.add("monitor")
+        self.assertEqual(queue.depth(), 1)
+        release.set()
+        self.assertTrue(queue.join(timeout=5))
+        queue.shutdown()
+
+        self.assertEqual(calls, ["blocker", "monitor"])
+
+    def test_key_added_while_processing_runs_again_without_overlap(self):
+        started = threading.Event()
+        release = threading.Event()
+        running = []
+        overlaps = []
+        calls = []
+
+        def handler(key):
+            if running:
+                overlaps.append(key)
+            running.append(key)
+            started.set()
+            release.wait(5)
+            calls.append(key)
+            running.remove(key)
+            return True
+
+        queue = WorkQueue(handler, workers=4)
+        queue.add("monitor")
+        started.wait(5)
+        queue.add("monitor")
+        queue.add("monitor")
+        release.set()
+        self.assertTrue(queue.join(timeout=5))
+        queue.shutdown()
+
+        self.assertEqual(calls, ["monitor", "monitor"])
+        self.assertEqual(overlaps, [])
+
+    def test_failures_retry_with_exponential_backoff(self):
+        results = [False, False, True]
+        calls = []
+
+        def handler(key):
+            calls.append(key)
+            return results.pop(0)
+
+        queue = WorkQueue(handler, workers=1, base_delay=0.01, max_delay=0.02)
+        with patch.object(queue, "add_after", wraps=queue.add_after) as mock_add_after:
+            queue.add("monitor")
+            self.assertTrue(queue.join(timeout=5))
+        queue.shutdown()
+
+        self.assertEqual(calls, ["monitor"] * 3)
+        self.assertEqual([c.args[1] for c in mock_add_after.call_args_list], [0.01, 0.02])
+        self.assertEqual(queue.retries("monitor"), 0)
+
+    def test_exception_is_retried(self):
+        calls = []
+
+        def handler(key):
+            calls.append(key)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return True
+
+        queue = WorkQueue(handler, workers=1, base_delay=0)
+        queue.add("monitor")
+        self.assertTrue(queue.join(timeout=5))
+        queue.shutdown()
+
+        self.assertEqual(len(calls), 2)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate_limited(self):
+        bucket = TokenBucket(rate=100, burst=2)
+
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+
+    def test_disabled(self):
+        bucket = TokenBucket(rate=0, burst=1)
+
+        for _ in range(100):
+            bucket.acquire()
+
+
+if __name__ == "__main__":
+    unittest.main()